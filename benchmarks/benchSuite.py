@@ -0,0 +1,252 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from benchmarks import importTimeBench
+from include.diagramFile import loadDiagram, saveDiagram
+from include.growth import GrowthEngine
+from include.planigonData import Diagram, Vertex, describeProblems, getCatalogue, getPlanigonVertices, iterate, planigons
+
+## --- Benchmark suite --- ##
+# Grows a tiling of every size from every catalogue planigon and times the hot paths
+# on it: growth, Diagram.add_planigon, the vertex and face indexes, placement lookup
+# and geometry (getPlanigonVertices and the catalogue place/placeBatch that replaced it
+# on the hot paths), and (Qt offscreen) the EditorController item and selection handlers.
+# Cold import time of the core modules is recorded too, as import/<module>.
+# growth.frontier_run regrows from the tiling's frontier next to untyped faces, as the
+# editor's growth job does, and fails if the result does not validate;
+# controller.grow_into_arrays runs that job on the tiling saved and reopened as an
+# ArrayDiagram, as --open gives it, and fails the same way.
+# Each entry records the best per-operation time of a few untraced runs and the peak
+# memory traced during one more run. Results go to a JSON file; --compare checks a run
+# against such a baseline and exits 1 if anything got slower or bigger than the
+# tolerance allows. Run from the repo root:
+#   python -m benchmarks.benchSuite --save baseline.json
+#   python -m benchmarks.benchSuite --compare baseline.json --sizes 1000
+# Planigons that cannot tile on their own stop early; "faces" records how far they got.
+
+SUITE_VERSION = 1
+SECONDS_FLOOR = 5e-6  # per-operation differences below this are noise
+PEAK_KB_FLOOR = 64.0
+
+def measure(fn, count: int, repeat: int = 5, memory: bool = True) -> dict:
+    # fn() performs count operations
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    result = {"seconds": min(times) / max(count, 1), "count": count}
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        fn()
+        result["peak_kb"] = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+    return result
+
+def diagramCases(diagram: Diagram, planigonIdx: int, rng, queries: int, repeat: int, memory: bool) -> dict:
+    cat = getCatalogue()
+    faces = list(diagram.faces.values())
+    rings = [[he.origin.pos for he in iterate(face.edge)] for face in faces]
+    edgeIdxs = [face.edge_idx for face in faces]
+    results = {}
+
+    def replay():
+        fresh = Diagram()
+        for ring, edgeIdx in zip(rings, edgeIdxs):
+            fresh.add_planigon(ring, planigonIdx, edgeIdx)
+    results["diagram.add_planigon"] = measure(replay, len(rings), repeat, memory)
+
+    index = diagram.vertex_index
+    eps = diagram.snap_tolerance()
+    positions = np.array([v.pos for v in diagram.vertices.values()])
+    picks = positions[rng.integers(0, len(positions), queries)] + rng.normal(0.0, 0.1 * eps, (queries, 2))
+    pickList = picks.tolist()
+    results["vertex_index.find_near"] = measure(lambda: [index.find_near(p, eps) for p in pickList], queries, repeat, memory)
+    results["vertex_index.find_near_slots"] = measure(lambda: index.find_near_slots(picks, eps), queries, repeat, memory)
+
+    # overlapping placements: existing faces nudged by a fraction of an edge
+    shift = 0.3 * float(cat.minLength)
+    moved = [[(x + shift, y + 0.5 * shift) for x, y in rings[i]] for i in rng.integers(0, len(rings), queries).tolist()]
+    results["diagram.intersects_existing"] = measure(lambda: [diagram.intersects_existing(r) for r in moved], queries, repeat, memory)
+
+    boundary = diagram.boundary_edges()
+    results["diagram.frontier_placements"] = measure(lambda: diagram.frontier_placements(), len(boundary), repeat, memory)
+
+    hosts = [boundary[i] for i in rng.integers(0, len(boundary), queries).tolist()]
+    placements = [(he, diagram.fitting_placements(he)) for he in hosts]
+    calls = [((he.next.origin.pos, he.origin.pos), p, e) for he, fits in placements for p, e in fits[:1]]
+    # the per-Vertex original next to the catalogue paths that replaced it, same placements
+    objectCalls = [(Vertex(a), Vertex(b), e, planigons[p].lengths, planigons[p].angles) for (a, b), p, e in calls]
+    results["geometry.getPlanigonVertices"] = measure(lambda: [getPlanigonVertices(*args) for args in objectCalls],
+                                                      len(calls), repeat, memory)
+    results["catalogue.place"] = measure(lambda: [cat.place(edge, p, e) for edge, p, e in calls], len(calls), repeat, memory)
+    if calls:
+        hostEdges = np.array([edge for edge, _, _ in calls], dtype=np.float64)
+        types = np.array([p for _, p, _ in calls])
+        edges = np.array([e for _, _, e in calls])
+        results["catalogue.placeBatch"] = measure(lambda: cat.placeBatch(hostEdges, types, edges), len(calls), repeat, memory)
+    return results
+
+def frontierGrowth(diagram: Diagram, planigonIdx: int, count: int) -> GrowthEngine:
+    # grows count faces outward from the frontier of diagram the way the editor's growth
+    # job does, with every third frontier face adopted untyped as an obstacle
+    boundary = diagram.boundary
+    faces = {he.face.id: he.face for he in boundary}
+    engine = GrowthEngine(planigon_types=(planigonIdx,), max_faces=count)
+    for k, face in enumerate(faces.values()):
+        edges = list(iterate(face.edge))
+        engine.adopt([he.origin.pos for he in edges], None if k % 3 == 0 else face.planigon_type, face.edge_idx,
+                     [i for i, he in enumerate(edges) if he in boundary])
+    engine.run()
+    engine.check()
+    return engine
+
+def growIntoFile(diagram: Diagram, planigonIdx: int, count: int) -> str:
+    # saves diagram, opens it as an ArrayDiagram the way --open does and runs the
+    # editor's growth job on it in this thread; raises ValueError if the result is broken
+    from PySide6.QtWidgets import QGraphicsScene
+    import main
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "grow.plgn")
+        saveDiagram(diagram, path)
+        mesh = loadDiagram(path)
+        controller = main.EditorController(QGraphicsScene(), mesh, render_mode="culled")
+        job = main.DiagramJob("grow", main.growWork(controller.frontierSnapshot(), planigonIdx, count, objects=False))
+        message = controller.mergeDiagram(job.work(job))
+        problems = mesh.validate()
+        del controller, mesh
+    if problems:
+        raise ValueError(f"growing into a loaded ArrayDiagram broke it: {describeProblems(problems)}")
+    return message
+
+def controllerCases(diagram: Diagram, planigonIdx: int, clicks: int, repeat: int, memory: bool) -> dict:
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtWidgets import QApplication, QGraphicsScene
+    import main
+    app = QApplication.instance() or QApplication([])
+    results = {}
+    scenes = []
+
+    def addItems():
+        scene = QGraphicsScene()
+        controller = main.EditorController(scene, diagram)
+        controller.flushFaceItems()
+        scenes.append((scene, controller))
+        app.processEvents()
+    results["controller.add_items"] = measure(addItems, len(diagram.faces), repeat, memory)
+
+    scene, controller = scenes[0]
+    controller.set_state(mode=main.Mode.IDLE)
+    face = next(f for f in diagram.faces.values() if diagram.face_open_edges(f))
+    item = controller.polygon_items[face.id]
+
+    def selectCycle():
+        for _ in range(clicks):
+            controller.on_polygon_selected(item)
+            controller.on_edge_selected(controller.edge_items[0])
+            controller.on_deselect_all()
+    app.processEvents()
+    results["controller.select_cycle"] = measure(selectCycle, clicks, repeat, memory)
+    grown = min(len(diagram.faces), 1000)
+    results["controller.grow_into_arrays"] = measure(lambda: growIntoFile(diagram, planigonIdx, grown), grown, 1, memory)
+    for scene, _ in scenes:
+        scene.clear()
+    app.processEvents()
+    return results
+
+def run(sizes=(1000, 10000), planigons=None, queries: int = 1000, clicks: int = 50, repeat: int = 5,
+        memory: bool = True, qt: bool = True, log=None) -> dict:
+    cat = getCatalogue()
+    planigons = range(len(cat)) if planigons is None else planigons
+    results = {f"import/{module}": {"seconds": seconds, "count": 1}
+               for module, seconds in importTimeBench.run(repeat=repeat).items()}
+    for size in sizes:
+        for p in planigons:
+            key = f"p{p}/{size}"
+            rng = np.random.default_rng(p * 7919 + size)
+            engines = []
+
+            def grow():
+                engine = GrowthEngine(planigon_types=(p,), max_faces=size)
+                engine.run()
+                engines.append(engine)
+            entry = {"growth.run": measure(grow, size, 1, memory)}
+            diagram = engines[0].diagram
+            entry["growth.run"]["seconds"] *= size / max(len(diagram.faces), 1)  # per face grown
+            entry["growth.run"]["count"] = len(diagram.faces)
+            if diagram.boundary:
+                frontier = min(size, 1000)
+                entry["growth.frontier_run"] = measure(lambda: frontierGrowth(diagram, p, frontier), frontier, 1, memory)
+                entry.update(diagramCases(diagram, p, rng, queries, repeat, memory))
+                if qt:
+                    entry.update(controllerCases(diagram, p, clicks, repeat, memory))
+            for name, row in entry.items():
+                results[f"{name}/{key}"] = row
+            if log is not None:
+                log(f"{key}: {len(diagram.faces)} faces, {len(entry)} cases")
+    return {"version": SUITE_VERSION, "catalogue": cat.key,
+            "meta": {"python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine(),
+                     "platform": platform.platform(), "time": time.strftime("%Y-%m-%dT%H:%M:%S")},
+            "results": results}
+
+def compare(baseline: dict, current: dict, tolerance: float = 0.25) -> list[str]:
+    # regressions of current against baseline, as printable lines
+    regressions = []
+    if baseline.get("catalogue") != current.get("catalogue"):
+        print("note: the planigon catalogue changed since the baseline, tilings may differ")
+    for key, new in current["results"].items():
+        old = baseline["results"].get(key)
+        if old is None:
+            continue
+        if new["seconds"] > old["seconds"] * (1 + tolerance) and new["seconds"] - old["seconds"] > SECONDS_FLOOR:
+            regressions.append(f"{key}: {old['seconds'] * 1e6:.2f} -> {new['seconds'] * 1e6:.2f} us/op "
+                               f"({new['seconds'] / old['seconds']:.2f}x)")
+        if ("peak_kb" in new and "peak_kb" in old and new["peak_kb"] > old["peak_kb"] * (1 + tolerance)
+                and new["peak_kb"] - old["peak_kb"] > PEAK_KB_FLOOR):
+            regressions.append(f"{key}: peak {old['peak_kb']:.0f} -> {new['peak_kb']:.0f} KB")
+    return regressions
+
+def summary(report: dict) -> str:
+    lines = []
+    for key, row in report["results"].items():
+        peak = f"{row['peak_kb']:>10.0f} KB" if "peak_kb" in row else ""
+        lines.append(f"{key:<48} {row['seconds'] * 1e6:>12.2f} us/op x{row['count']:<7} {peak}")
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Planigon editor benchmark suite")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000], help="faces per tiling, e.g. 1000 10000 100000")
+    parser.add_argument("--planigons", type=int, nargs="+", default=None, help="catalogue indexes, default all")
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced runs")
+    parser.add_argument("--no-qt", action="store_true", help="skip the EditorController cases")
+    parser.add_argument("--save", default=None, help="write the results to this JSON file")
+    parser.add_argument("--compare", default=None, help="baseline JSON to check against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown/growth, 0.25 = 25%%")
+    args = parser.parse_args(argv)
+    report = run(args.sizes, args.planigons, args.queries, repeat=args.repeat, memory=not args.no_memory,
+                 qt=not args.no_qt, log=lambda line: print(line, file=sys.stderr))
+    print(summary(report))
+    if args.save:
+        with open(args.save, "w") as fh:
+            json.dump(report, fh, indent=1)
+    if args.compare:
+        with open(args.compare) as fh:
+            regressions = compare(json.load(fh), report, args.tolerance)
+        for line in regressions:
+            print("REGRESSION", line)
+        print(f"{len(regressions)} regression(s) against {args.compare}")
+        sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import argparse
+import os
+import time
+from benchmarks.faceIndexBench import hexCenters, hexRing
+from include.planigonData import Diagram
+
+## --- Chunked renderer benchmark --- ##
+# Fills a chunked- or culled-mode editor with a hexagonal tiling and times full frames of a
+# 1280x800 view at three zoom levels (whole tiling, ~2k faces, ~200 faces visible),
+# cold (paths built on first paint) and warm, plus a pan at the closest zoom.
+# Run from the repo root:
+#   python -m benchmarks.chunkRenderBench --faces 200000 --mode culled
+
+def run(faces: int = 200_000, size=(1280, 800), mode: str = "chunked") -> dict:
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtWidgets import QApplication, QGraphicsScene, QGraphicsView
+    from PySide6.QtGui import QImage, QPainter
+    import main
+    app = QApplication.instance() or QApplication([])
+
+    diagram = Diagram()
+    for cx, cy in hexCenters(faces):
+        diagram.add_planigon(hexRing(10 * cx, 10 * cy, 10.0), 0)
+    scene = QGraphicsScene()
+    scene.setItemIndexMethod(QGraphicsScene.NoIndex)
+    controller = main.EditorController(scene, diagram, render_mode=mode)
+    start = time.perf_counter()
+    for face in diagram.faces.values():
+        controller.addFaceItem(face)
+    layerSeconds = time.perf_counter() - start
+
+    view = QGraphicsView(scene)
+    view.resize(*size)
+    image = QImage(size[0], size[1], QImage.Format_ARGB32_Premultiplied)
+
+    def frame() -> float:
+        image.fill(0)
+        painter = QPainter(image)
+        t = time.perf_counter()
+        view.render(painter)
+        painter.end()
+        return (time.perf_counter() - t) * 1e3
+
+    results = {"faces": len(diagram.faces), "layer_seconds": layerSeconds}
+    bounds = scene.itemsBoundingRect()
+    center = bounds.center()
+    for name, visibleFaces in (("all", faces), ("2k", 2000), ("200", 200)):
+        view.resetTransform()
+        # a face covers about 260 square units
+        scale = min(size[0] * size[1] / (visibleFaces * 260.0), 1e3) ** 0.5
+        if visibleFaces >= faces:
+            view.fitInView(bounds)
+        else:
+            view.scale(scale, scale)
+        view.centerOn(center)
+        app.processEvents()
+        results[f"{name}_cold_ms"] = frame()
+        results[f"{name}_warm_ms"] = frame()
+    view.centerOn(center.x() + 300.0, center.y())
+    app.processEvents()
+    results["pan_ms"] = frame()
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chunked renderer frame times")
+    parser.add_argument("--faces", type=int, default=200_000)
+    parser.add_argument("--mode", choices=("chunked", "culled"), default="chunked")
+    args = parser.parse_args()
+    for name, value in run(args.faces, mode=args.mode).items():
+        print(f"{name:>14}: {value:.3f}" if isinstance(value, float) else f"{name:>14}: {value}")
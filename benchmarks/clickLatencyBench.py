@@ -0,0 +1,59 @@
+import argparse
+import os
+import time
+import numpy as np
+from benchmarks.faceIndexBench import hexCenters, hexRing
+from include.planigonData import Diagram
+
+## --- Editor click latency benchmark --- ##
+# Times a full select polygon -> select edge -> deselect cycle in EditorController on
+# scenes of growing size, next to one pass over scene.items() (what every handler
+# used to do several times). The cycle time should stay flat as the scene grows.
+# Run from the repo root:
+#   python -m benchmarks.clickLatencyBench --sizes 1000 5000 20000
+
+def run(sizes=(1000, 5000, 20000), clicks: int = 50) -> dict:
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtWidgets import QApplication, QGraphicsScene
+    import main
+    app = QApplication.instance() or QApplication([])
+
+    results = {}
+    for size in sizes:
+        diagram = Diagram()
+        for cx, cy in hexCenters(size):
+            diagram.add_planigon(hexRing(10 * cx, 10 * cy, 10.0), 0)
+        scene = QGraphicsScene()
+        controller = main.EditorController(scene, diagram)
+        for face in diagram.faces.values():
+            controller.addFaceItem(face)
+        controller.set_state(mode=main.Mode.IDLE)
+        # faces on the bottom row have open edges
+        item = controller.polygon_items[0]
+
+        times = np.empty(clicks)
+        for k in range(clicks):
+            # let the scene flush its deferred index updates, like the event loop would
+            app.processEvents()
+            t = time.perf_counter()
+            controller.on_polygon_selected(item)
+            controller.on_edge_selected(controller.edge_items[0])
+            controller.on_deselect_all()
+            times[k] = time.perf_counter() - t
+
+        t = time.perf_counter()
+        sum(isinstance(i, main.SelectablePolygon) for i in scene.items())
+        scanSeconds = time.perf_counter() - t
+
+        results[size] = {"click_ms": float(np.median(times) * 1e3), "scene_scan_ms": scanSeconds * 1e3}
+        scene.clear()
+    app.processEvents()
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EditorController click latency")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--clicks", type=int, default=50)
+    args = parser.parse_args()
+    for size, row in run(args.sizes, args.clicks).items():
+        print(f"{size:>8} faces: cycle {row['click_ms']:.3f} ms, one scene scan {row['scene_scan_ms']:.3f} ms")
@@ -0,0 +1,93 @@
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+from benchmarks.faceIndexBench import hexCenters, hexRing
+from include.diagramFile import loadDiagram, saveDiagram, toDiagram
+from include.meshArrays import ArrayDiagram
+from include.planigonData import getCatalogue
+
+## --- Diagram file benchmark --- ##
+# Builds a hexagonal ArrayDiagram of n faces straight from columns (adding a million
+# faces one at a time would dominate the run), saves it, and times loading it back
+# memory-mapped and read in full, plus a first pass over every half-edge after the
+# mapped load. Checks the round trip is exact. With --objects it also times toDiagram,
+# the conversion the editor's Make Editable runs. Run from the repo root:
+#   python -m benchmarks.diagramFileBench --faces 1000000
+
+def hexMesh(faces: int) -> ArrayDiagram:
+    # planigon 0 hexagons on hexCenters, vertices merged by rounded position
+    centers = np.array(hexCenters(faces), dtype=np.float64)
+    offsets = np.array(hexRing(0.0, 0.0), dtype=np.float64)
+    rings = (centers[:, None, :] + offsets[None, :, :]).reshape(-1, 2)
+    positions, origin = np.unique(np.round(rings, 6), axis=0, return_inverse=True)
+    origin = origin.ravel().astype(np.int32)
+    E = len(origin)
+    V = len(positions)
+    edges = np.arange(E, dtype=np.int32)
+    k = edges % 6
+    nxt = edges - k + (k + 1) % 6
+    prv = edges - k + (k + 5) % 6
+    # the twin of a -> b is the half-edge b -> a
+    keys = origin.astype(np.int64) * V + origin[nxt]
+    order = np.argsort(keys)
+    reverse = origin[nxt].astype(np.int64) * V + origin
+    at = np.minimum(np.searchsorted(keys, reverse, sorter=order), E - 1)
+    twin = np.where(keys[order[at]] == reverse, order[at], -1).astype(np.int32)
+    outgoing = np.full(V, -1, dtype=np.int32)
+    outgoing[origin] = edges
+    units = getCatalogue().angleUnits[0, :6]
+    columns = {
+        "positions": positions, "vertex_outgoing": outgoing,
+        "vertex_angle": np.bincount(origin, units[k], minlength=V).astype(np.int32),
+        "origin": origin, "twin": twin, "next": nxt, "prev": prv,
+        "face_of": (edges // 6).astype(np.int32), "face_edge": edges[::6].copy(),
+        "face_type": np.zeros(faces, dtype=np.int32), "face_edge_idx": np.zeros(faces, dtype=np.int32),
+    }
+    return ArrayDiagram.from_columns(columns, {0: "seed", faces - 1: "last"}, cell_size=0.5)
+
+def run(faces: int = 1_000_000, directory: str = None, objects: bool = False) -> dict:
+    mesh = hexMesh(faces)
+    path = os.path.join(directory or tempfile.gettempdir(), "diagramFileBench.plgn")
+    start = time.perf_counter()
+    saveDiagram(mesh, path)
+    saveSeconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    mapped = loadDiagram(path)
+    mappedMs = (time.perf_counter() - start) * 1e3
+    start = time.perf_counter()
+    boundary = int(mapped.boundary_mask().sum())
+    sizes = mapped.face_sizes()
+    firstPassMs = (time.perf_counter() - start) * 1e3
+
+    start = time.perf_counter()
+    read = loadDiagram(path, mmap=False)
+    readMs = (time.perf_counter() - start) * 1e3
+
+    exact = all(np.array_equal(getattr(mesh, name)[:getattr(mesh, count)], getattr(loaded, name)[:getattr(loaded, count)])
+                for loaded in (mapped, read) for name, count in ArrayDiagram.columns.items())
+    exact = exact and mapped.face_names == read.face_names == mesh.face_names
+    results = {"faces": mesh.num_faces, "vertices": mesh.num_vertices, "file_mb": os.path.getsize(path) / 2**20,
+               "save_seconds": saveSeconds, "load_mmap_ms": mappedMs, "first_pass_ms": firstPassMs,
+               "load_read_ms": readMs, "boundary_edges": boundary, "max_face_size": int(sizes.max()),
+               "round_trip_exact": float(exact)}
+    if objects:
+        start = time.perf_counter()
+        diagram = toDiagram(mapped)
+        results["objects_seconds"] = time.perf_counter() - start
+        results["objects_valid"] = float(not diagram.validate())
+        del diagram
+    del mapped, read
+    os.remove(path)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--faces", type=int, default=1_000_000)
+    parser.add_argument("--dir", default=None, help="where to write the temporary file")
+    parser.add_argument("--objects", action="store_true", help="also time converting to an object Diagram")
+    args = parser.parse_args()
+    for name, value in run(args.faces, args.dir, args.objects).items():
+        print(f"{name:>16}: {value:.3f}" if isinstance(value, float) else f"{name:>16}: {value}")
@@ -0,0 +1,76 @@
+import argparse
+import math
+import time
+import numpy as np
+from include.planigonData import Diagram, ringsOverlap
+
+## --- Face index benchmark --- ##
+# Builds a hexagonal tiling of n faces and times Diagram.intersects_existing for
+# placements that fit the boundary and for ones that overlap, against a brute-force
+# pairwise check over every face. Run from the repo root:
+#   python -m benchmarks.faceIndexBench --faces 100000
+
+def hexRing(cx: float, cy: float, r: float = 1.0) -> list[tuple[float, float]]:
+    # clockwise, like getPlanigonVertices
+    return [(cx + r * math.cos(math.radians(90 - 60 * k)), cy + r * math.sin(math.radians(90 - 60 * k))) for k in range(6)]
+
+def hexCenters(n: int, r: float = 1.0) -> list[tuple[float, float]]:
+    side = math.ceil(math.sqrt(n))
+    w, h = math.sqrt(3) * r, 1.5 * r
+    return [(col * w + (row % 2) * w * 0.5, row * h) for row in range(side) for col in range(side)][:n]
+
+def run(faces: int = 100_000, queries: int = 1000, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    diagram = Diagram()
+    centers = hexCenters(faces)
+    start = time.perf_counter()
+    for cx, cy in centers:
+        diagram.add_planigon(hexRing(cx, cy), 0)
+    buildSeconds = time.perf_counter() - start
+
+    # overlapping: shifted copies of existing faces; free: one row above the tiling
+    picks = rng.integers(0, len(centers), queries)
+    overlapping = [hexRing(centers[i][0] + 0.3, centers[i][1] + 0.2) for i in picks.tolist()]
+    side = math.ceil(math.sqrt(faces))
+    row = math.ceil(faces / side)
+    free = [hexRing(col * math.sqrt(3) + (row % 2) * math.sqrt(3) * 0.5, row * 1.5) for col in rng.integers(0, side, queries).tolist()]
+
+    def timeQueries(rings):
+        times = np.empty(len(rings))
+        hits = 0
+        for k, ring in enumerate(rings):
+            t = time.perf_counter()
+            hits += diagram.intersects_existing(ring)
+            times[k] = time.perf_counter() - t
+        return times, hits
+
+    overlapTimes, overlapHits = timeQueries(overlapping)
+    freeTimes, freeHits = timeQueries(free)
+
+    # brute force over every face, a handful of queries is enough to see the gap
+    index = diagram.face_index
+    allRings = index.rings[:index.size][index.alive[:index.size]]
+    t = time.perf_counter()
+    for ring in overlapping[:5]:
+        ringsOverlap(ring, allRings).any()
+    bruteSeconds = (time.perf_counter() - t) / 5
+
+    return {
+        "faces": len(diagram.faces),
+        "build_seconds": buildSeconds,
+        "overlap_mean_us": overlapTimes.mean() * 1e6,
+        "overlap_p99_us": np.percentile(overlapTimes, 99) * 1e6,
+        "overlap_detected": overlapHits / queries,
+        "free_mean_us": freeTimes.mean() * 1e6,
+        "free_p99_us": np.percentile(freeTimes, 99) * 1e6,
+        "free_false_positives": freeHits / queries,
+        "brute_force_us": bruteSeconds * 1e6,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Diagram.intersects_existing timing")
+    parser.add_argument("--faces", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=1000)
+    args = parser.parse_args()
+    for name, value in run(args.faces, args.queries).items():
+        print(f"{name:>22}: {value:.3f}" if isinstance(value, float) else f"{name:>22}: {value}")
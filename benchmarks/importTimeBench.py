@@ -0,0 +1,59 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+## --- Cold import benchmark --- ##
+# Starts a fresh interpreter per sample and times importing each core module, less
+# the time of an interpreter that imports nothing, so the number is what a batch job
+# pays per process. A warm-up import writes the bytecode caches first, as an installed
+# package or any second run would have them. --top lists the slowest imports under a
+# module (python -X importtime), --budget-ms fails the run if any module takes longer.
+# Run from the repo root:
+#   python -m benchmarks.importTimeBench --top include.growth --budget-ms 150
+
+CORE_MODULES = ("include", "include.planigonData", "include.growth", "include.diagramFile", "include.diagramExport")
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_ENV = {name: value for name, value in os.environ.items() if name != "PYTHONDONTWRITEBYTECODE"}
+
+def _wallSeconds(code: str) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=REPO_ROOT, env=_ENV)
+    return time.perf_counter() - start
+
+def run(modules=CORE_MODULES, repeat: int = 7) -> dict:
+    # best of repeat fresh processes per module, in seconds
+    _wallSeconds("; ".join(f"import {module}" for module in modules))
+    bare = min(_wallSeconds("pass") for _ in range(repeat))
+    return {module: max(min(_wallSeconds(f"import {module}") for _ in range(repeat)) - bare, 0.0)
+            for module in modules}
+
+def slowestImports(module: str, top: int = 10) -> list[tuple[float, str]]:
+    # (cumulative ms, name) of the slowest imports under module
+    _wallSeconds(f"import {module}")
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            check=True, cwd=REPO_ROOT, env=_ENV, capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]) / 1e3, parts[2].rstrip()))
+    return sorted(rows, reverse=True)[:top]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold import time of the core modules")
+    parser.add_argument("--modules", nargs="+", default=list(CORE_MODULES))
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--top", default=None, help="module to break down with -X importtime")
+    parser.add_argument("--budget-ms", type=float, default=None, help="exit 1 if any module takes longer")
+    args = parser.parse_args()
+    results = run(args.modules, args.repeat)
+    for module, seconds in results.items():
+        print(f"{module:>24}: {seconds * 1e3:8.1f} ms")
+    if args.top:
+        for ms, name in slowestImports(args.top):
+            print(f"{ms:8.1f} ms {name}")
+    if args.budget_ms is not None and max(results.values()) * 1e3 > args.budget_ms:
+        print(f"over the {args.budget_ms:.0f} ms budget")
+        sys.exit(1)
@@ -0,0 +1,61 @@
+import argparse
+import time
+import numpy as np
+from include.diagramFile import _diagramColumns
+from include.growth import GrowthEngine
+from include.meshArrays import ArrayDiagram
+from include.planigonData import Diagram, iterate
+
+## --- Merge benchmark --- ##
+# Grows --faces faces of a planigon, splits them into a left and a right patch along
+# x = 0, and stitches the right patch onto the left one with Diagram.merge and
+# ArrayDiagram.merge, against re-adding its faces one by one with add_planigon. Checks
+# each merge has the grown diagram's face, vertex and open edge counts. Run from the
+# repo root:
+#   python -m benchmarks.mergeBench --planigon 3 --faces 20000
+
+def patches(diagram: Diagram) -> tuple[list, list]:
+    left, right = [], []
+    for face in diagram.faces.values():
+        ring = [he.origin.pos for he in iterate(face.edge)]
+        (left if np.mean(ring, axis=0)[0] < 0 else right).append((ring, face.planigon_type, face.edge_idx))
+    return left, right
+
+def build(cls, faces):
+    diagram = cls()
+    for ring, planigonType, edgeIdx in faces:
+        diagram.add_planigon(ring, planigonType, edgeIdx)
+    return diagram
+
+def run(planigonIdx: int = 0, faces: int = 20000) -> dict:
+    engine = GrowthEngine(planigon_types=(planigonIdx,), max_faces=faces)
+    engine.run()
+    grown = engine.diagram
+    expected = (len(grown.faces), len(grown.vertices), len(grown.boundary))
+    left, right = patches(grown)
+    results = {"left_faces": len(left), "right_faces": len(right)}
+
+    diagram = build(Diagram, left)
+    start = time.perf_counter()
+    for ring, planigonType, edgeIdx in right:
+        diagram.add_planigon(ring, planigonType, edgeIdx)
+    results["reinsert_seconds"] = time.perf_counter() - start
+
+    for cls in (Diagram, ArrayDiagram):
+        diagram, other = build(cls, left), build(cls, right)
+        start = time.perf_counter()
+        diagram.merge(other)
+        seconds = time.perf_counter() - start
+        counts = ((len(diagram.faces), len(diagram.vertices), len(diagram.boundary)) if cls is Diagram
+                  else (diagram.num_faces, diagram.num_vertices, len(diagram.open_edges)))
+        results[f"{cls.__name__}_merge"] = (f"{seconds:.3f} s, {results['reinsert_seconds'] / seconds:.1f}x reinsert, "
+                                            f"{'matches' if counts == expected else 'DIFFERS FROM'} grown")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--planigon", type=int, default=0)
+    parser.add_argument("--faces", type=int, default=20000)
+    args = parser.parse_args()
+    for name, value in run(args.planigon, args.faces).items():
+        print(f"{name:>18}: {value:.3f}" if isinstance(value, float) else f"{name:>18}: {value}")
@@ -0,0 +1,48 @@
+import argparse
+import os
+import time
+import numpy as np
+from include.diagramFile import _diagramColumns
+from include.growth import GrowthEngine
+from include.meshArrays import ArrayDiagram
+from include.parallelGrowth import growParallel, radiusForFaces
+
+## --- Parallel growth scaling benchmark --- ##
+# Grows the same disk serially and with growParallel on each worker count, and checks
+# every parallel result has the serial run's faces (by centroid), vertex count and
+# twinned half-edge count. Speedup is serial seconds over parallel seconds; it cannot
+# exceed the cores the machine has (cpu_count is printed). Run from the repo root:
+#   python -m benchmarks.parallelGrowthBench --planigon 3 --faces 20000 --workers 1 2 4 8
+
+def signature(mesh: ArrayDiagram) -> tuple[np.ndarray, int, int]:
+    rings, _ = mesh.face_rings()
+    centroids = np.nanmean(rings, axis=1)
+    rounded = centroids.round(6)
+    return centroids[np.lexsort((rounded[:, 1], rounded[:, 0]))], mesh.num_vertices, int((mesh.twin[:mesh.num_edges] >= 0).sum())
+
+def run(planigonIdx: int = 0, faces: int = 20000, workers=(1, 2, 4, 8)) -> dict:
+    radius = radiusForFaces(planigonIdx, faces)
+    start = time.perf_counter()
+    engine = GrowthEngine(planigon_types=(planigonIdx,), max_faces=10 * faces, max_radius=radius)
+    engine.run()
+    serialSeconds = time.perf_counter() - start
+    columns, _ = _diagramColumns(engine.diagram)
+    centroids, vertices, twinned = signature(ArrayDiagram.from_columns(columns))
+    results = {"cpu_count": os.cpu_count(), "faces": len(centroids), "serial_seconds": serialSeconds}
+    for count in workers:
+        mesh, stats = growParallel(planigonIdx, radius, workers=count)
+        other, otherVertices, otherTwinned = signature(mesh)
+        match = (len(other) == len(centroids) and np.allclose(other, centroids, atol=1e-6)
+                 and otherVertices == vertices and otherTwinned == twinned)
+        results[f"workers_{count}"] = (f"{stats.seconds:.2f} s, speedup {serialSeconds / stats.seconds:.2f}x, "
+                                       f"{'matches' if match else 'DIFFERS FROM'} serial")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--planigon", type=int, default=0)
+    parser.add_argument("--faces", type=int, default=20000, help="about this many faces, as a disk")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+    for name, value in run(args.planigon, args.faces, args.workers).items():
+        print(f"{name:>16}: {value:.3f}" if isinstance(value, float) else f"{name:>16}: {value}")
@@ -0,0 +1,67 @@
+import argparse
+import math
+import time
+import numpy as np
+from include.growth import GrowthEngine
+from include.periodic import periodicTiling
+from include.planigonData import iterate
+
+## --- Periodic tiling benchmark --- ##
+# Grows --grow faces of a planigon face by face and instances --faces of the same
+# tiling from its lattice period with PeriodicTiling.region, then times point and
+# viewport queries far from the origin, where nothing was ever grown. Checks every
+# grown face is a face of the periodic tiling. Run from the repo root:
+#   python -m benchmarks.periodicBench --planigon 3 --faces 1000000
+
+def run(planigonIdx: int = 0, grow: int = 5000, faces: int = 1_000_000, queries: int = 1000) -> dict:
+    start = time.perf_counter()
+    tiling = periodicTiling(planigonIdx)
+    detectSeconds = time.perf_counter() - start
+
+    engine = GrowthEngine(planigon_types=(planigonIdx,), max_faces=grow)
+    stats = engine.run()
+
+    half = 0.5 * math.sqrt(faces * tiling.cell_area / tiling.num_faces)
+    start = time.perf_counter()
+    mesh = tiling.region(-half, -half, half, half)
+    regionSeconds = time.perf_counter() - start
+
+    # every grown face, looked up by a point inside it, has the same corners
+    matched = 0
+    for face in engine.diagram.faces.values():
+        ring = np.array([he.origin.pos for he in iterate(face.edge)])
+        key = tiling.face_at(tuple(ring.mean(axis=0)))
+        if key is not None:
+            found = tiling.face_rings([key])[0, :tiling.sizes[key[2]]]
+            matched += len(ring) == len(found) and bool(np.all(np.min(np.hypot(*(ring[:, None] - found[None]).T), axis=0) < 1e-6))
+
+    rng = np.random.default_rng(planigonIdx)
+    far = rng.uniform(1e5, 1e6, (queries, 2)).tolist()
+    start = time.perf_counter()
+    keys = [tiling.face_at(p) for p in far]
+    faceAtUs = (time.perf_counter() - start) / queries * 1e6
+    start = time.perf_counter()
+    for x, y in far[:100]:
+        tiling.faces_in_rect(x, y, x + 40.0, y + 25.0)
+    viewportMs = (time.perf_counter() - start) / 100 * 1e3
+    start = time.perf_counter()
+    for key in keys:
+        tiling.neighbors(key)
+        tiling.face_vertices(key)
+    walkUs = (time.perf_counter() - start) / queries * 1e6
+
+    return {"faces_per_cell": tiling.num_faces, "detect_seconds": detectSeconds,
+            "grow_faces_per_sec": stats.faces_per_sec, "region_faces": mesh.num_faces,
+            "region_faces_per_sec": mesh.num_faces / regionSeconds, "region_mb": mesh.nbytes() / 2**20,
+            "motif_bytes": tiling.nbytes(), "face_at_us": faceAtUs, "viewport_ms": viewportMs,
+            "neighbors_vertices_us": walkUs, "grown_faces_matched": f"{matched}/{len(engine.diagram.faces)}"}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--planigon", type=int, default=0)
+    parser.add_argument("--grow", type=int, default=5000, help="faces grown face by face, for comparison")
+    parser.add_argument("--faces", type=int, default=1_000_000, help="faces instanced from the period")
+    parser.add_argument("--queries", type=int, default=1000)
+    args = parser.parse_args()
+    for name, value in run(args.planigon, args.grow, args.faces, args.queries).items():
+        print(f"{name:>22}: {value:.3f}" if isinstance(value, float) else f"{name:>22}: {value}")
@@ -0,0 +1,24 @@
+import importlib
+
+## --- Planigon core --- ##
+# Headless geometry and mesh code, no Qt. Submodules load on first attribute access,
+# so `import include` is free and each tool only pays for what it uses:
+#   planigonData   planigon catalogue, Diagram, spatial indexes, undo history
+#   meshArrays     struct-of-arrays Diagram backend
+#   growth         headless tiling growth
+#   parallelGrowth growth split over worker processes
+#   periodic       one lattice period of a tiling, instanced on demand
+#   diagramFile    memory-mapped save / load
+#   diagramExport  streaming SVG / GeoJSON / JSON Lines export
+#   perfStats      switchable hot-path timers
+#   cli            python -m include
+
+_submodules = ("planigonData", "meshArrays", "growth", "parallelGrowth", "periodic", "diagramFile", "diagramExport", "perfStats", "cli")
+
+def __getattr__(name):
+    if name in _submodules:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(set(globals()) | set(_submodules))
@@ -0,0 +1,3 @@
+from include.cli import main
+
+main()
@@ -0,0 +1,131 @@
+import argparse
+import math
+import os
+import sys
+
+## --- Command line --- ##
+#   python -m include generate --planigons 0 --faces 10000 -o tiling.plgn
+#   python -m include generate --planigons 3 --faces 1000000 --periodic -o big.plgn
+#   python -m include export tiling.plgn tiling.svg
+#   python -m include info tiling.plgn --validate
+#   python -m include bench --sizes 1000 --no-qt
+# Subcommands import the core modules they need when they run, so --help and argument
+# errors never load numpy. Output is written by extension: .plgn saves a diagram file,
+# .svg / .geojson / .jsonl export (see diagramExport).
+
+def _periodicRegion(args):
+    # a square around the origin holding about args.faces faces, or of half side args.radius
+    import time
+    from include.periodic import periodicTiling
+    if len(args.planigons) != 1:
+        sys.exit("--periodic tiles a single planigon")
+    start = time.perf_counter()
+    try:
+        tiling = periodicTiling(args.planigons[0], args.scale)
+    except ValueError as exc:
+        sys.exit(str(exc))
+    half = args.radius if args.radius is not None else 0.5 * math.sqrt(args.faces * tiling.cell_area / tiling.num_faces)
+    diagram = tiling.region(-half, -half, half, half)
+    print(f"{diagram.num_faces} faces in {time.perf_counter() - start:.2f} s, "
+          f"{tiling.num_faces} per lattice cell", file=sys.stderr)
+    return diagram
+
+def _reportProblems(diagram):
+    # validate() on either backend, exits non-zero if the mesh is broken
+    import time
+    from include.planigonData import describeProblems
+    start = time.perf_counter()
+    problems = diagram.validate()
+    print(f"validated in {time.perf_counter() - start:.2f} s: {describeProblems(problems) or 'no problems'}", file=sys.stderr)
+    if problems:
+        sys.exit(1)
+
+def _generate(args):
+    from include.growth import GrowthEngine
+    from include.diagramExport import exportDiagram
+    from include.diagramFile import DIAGRAM_EXTENSION, saveDiagram
+    if args.periodic:
+        diagram = _periodicRegion(args)
+    elif args.workers is not None:
+        from include.parallelGrowth import growParallel, radiusForFaces
+        if len(args.planigons) != 1:
+            sys.exit("--workers grows a single planigon")
+        radius = args.radius if args.radius is not None else radiusForFaces(args.planigons[0], args.faces, args.scale)
+        diagram, stats = growParallel(args.planigons[0], radius, args.workers, args.scale)
+        print(f"{stats.faces} faces in {stats.seconds:.2f} s ({stats.faces_per_sec:.0f}/s) "
+              f"on {args.workers} workers, {stats.dead_edges} dead edges", file=sys.stderr)
+    else:
+        engine = GrowthEngine(planigon_types=args.planigons, scale=args.scale, max_faces=args.faces, max_radius=args.radius)
+        stats = engine.run()
+        print(f"{stats.faces} faces in {stats.seconds:.2f} s ({stats.faces_per_sec:.0f}/s), "
+              f"{stats.dead_edges} dead edges{', stalled' if stats.stalled else ''}", file=sys.stderr)
+        diagram = engine.diagram
+    if args.validate:
+        _reportProblems(diagram)
+    if args.output.endswith(DIAGRAM_EXTENSION):
+        saveDiagram(diagram, args.output)
+    else:
+        exportDiagram(diagram, args.output, args.format)
+
+def _info(args):
+    from include.diagramFile import readHeader
+    header, _ = readHeader(args.input)
+    columns = header["columns"]
+    print(f"{args.input}: {os.path.getsize(args.input) / 2**20:.1f} MB")
+    print(f"  faces {columns['face_edge'][1][0]}, half-edges {columns['origin'][1][0]}, "
+          f"vertices {columns['positions'][1][0]}, named faces {columns['name_faces'][1][0]}")
+    print(f"  catalogue {header['catalogue'][:12]}, vertex cell size {header['cell_size']:.6g}")
+    if args.validate:
+        from include.diagramFile import loadDiagram
+        _reportProblems(loadDiagram(args.input))
+
+def _export(args):
+    from include.diagramExport import main as exportMain
+    exportMain(args.rest)
+
+def _bench(args):
+    try:
+        from benchmarks.benchSuite import main as benchMain
+    except ImportError:
+        sys.exit("bench needs the benchmarks package, run it from the repository root")
+    benchMain(args.rest)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m include", description="Headless planigon tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="grow a tiling and save or export it")
+    generate.add_argument("--planigons", type=int, nargs="+", default=[0], help="catalogue indexes to grow from")
+    generate.add_argument("--faces", type=int, default=1000)
+    generate.add_argument("--radius", type=float, default=None, help="stop at this distance from the seed")
+    generate.add_argument("--scale", type=float, default=1.0)
+    generate.add_argument("--periodic", action="store_true",
+                          help="instance one lattice period over the region instead of growing face by face")
+    generate.add_argument("--workers", type=int, default=None,
+                          help="grow the disk of --radius (or about --faces) in this many processes")
+    generate.add_argument("--format", default=None, help="export format if the extension doesn't say")
+    generate.add_argument("--validate", action="store_true", help="check the mesh before writing it")
+    generate.add_argument("-o", "--output", required=True)
+    generate.set_defaults(run=_generate)
+
+    info = commands.add_parser("info", help="summarise a diagram file without loading it")
+    info.add_argument("input")
+    info.add_argument("--validate", action="store_true", help="also load it and check the mesh")
+    info.set_defaults(run=_info)
+
+    # listed for --help, main() hands their arguments on untouched
+    export = commands.add_parser("export", help="export a diagram file (diagramExport)", add_help=False)
+    export.add_argument("rest", nargs=argparse.REMAINDER)
+    export.set_defaults(run=_export)
+    bench = commands.add_parser("bench", help="run the benchmark suite (benchmarks.benchSuite)", add_help=False)
+    bench.add_argument("rest", nargs=argparse.REMAINDER)
+    bench.set_defaults(run=_bench)
+
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0] in ("export", "bench"):
+        # argparse would take leading options for its own, so these skip it
+        args = argparse.Namespace(rest=argv[1:])
+        (_export if argv[0] == "export" else _bench)(args)
+        return
+    args = parser.parse_args(argv)
+    args.run(args)
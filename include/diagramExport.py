@@ -0,0 +1,183 @@
+import argparse
+import json
+import os
+import sys
+import numpy as np
+from typing import Iterator, Optional, TextIO
+from include.diagramFile import loadDiagram
+from include.meshArrays import ArrayDiagram
+from include.planigonData import Diagram, iterate
+
+## --- Streaming export --- ##
+# Exporters walk the faces a chunk at a time and write each chunk's text before
+# reading the next, so memory stays bounded by the chunk size however large the
+# tiling; for a memory-mapped ArrayDiagram (diagramFile.loadDiagram) only the pages
+# of the current chunk are touched. Coordinates are scene units, y pointing down
+# as in the editor, except GeoJSON which wants y up and counterclockwise rings.
+#
+#   python -m include.diagramExport tiling.plgn tiling.svg
+#   python -m include.diagramExport tiling.plgn - --format jsonl | head
+
+EXPORT_CHUNK = 4096  # faces per chunk
+
+class FaceChunk:
+    # faces [i] of a chunk: rings[i, :sizes[i]] is the vertex ring
+    __slots__ = ("ids", "types", "edge_idxs", "names", "rings", "sizes")
+
+    def __init__(self, ids, types, edge_idxs, names, rings, sizes):
+        self.ids = ids
+        self.types = types  # planigon index, -1 if none
+        self.edge_idxs = edge_idxs
+        self.names = names
+        self.rings = rings
+        self.sizes = sizes
+
+    def __len__(self):
+        return len(self.ids)
+
+    def ring_lists(self) -> list[list[list[float]]]:
+        return [ring[:n] for ring, n in zip(self.rings.tolist(), self.sizes.tolist())]
+
+def _meshChunks(mesh: ArrayDiagram, chunk: int) -> Iterator[FaceChunk]:
+    # steps every face of the chunk round its cycle in lockstep
+    for start in range(0, mesh.num_faces, chunk):
+        stop = min(start + chunk, mesh.num_faces)
+        first = np.asarray(mesh.face_edge[start:stop])
+        curr = first
+        sizes = np.zeros(len(first), dtype=np.int64)
+        live = np.ones(len(first), dtype=bool)
+        steps = []
+        while live.any():
+            steps.append(np.where(live[:, None], mesh.positions[mesh.origin[curr]], np.nan))
+            sizes += live
+            curr = mesh.next[curr]
+            live &= curr != first
+        names = mesh.face_names
+        yield FaceChunk(np.arange(start, stop), np.asarray(mesh.face_type[start:stop]),
+                        np.asarray(mesh.face_edge_idx[start:stop]), [names.get(f, "") for f in range(start, stop)],
+                        np.stack(steps, axis=1), sizes)
+
+def _diagramChunks(diagram: Diagram, chunk: int) -> Iterator[FaceChunk]:
+    faces = iter(diagram.faces.values())
+    while True:
+        batch = [face for _, face in zip(range(chunk), faces)]
+        if not batch:
+            return
+        rings = [[he.origin.pos for he in iterate(face.edge)] for face in batch]
+        sizes = np.array([len(ring) for ring in rings], dtype=np.int64)
+        padded = np.full((len(batch), int(sizes.max()), 2), np.nan)
+        for i, ring in enumerate(rings):
+            padded[i, :len(ring)] = ring
+        yield FaceChunk(np.array([face.id for face in batch]),
+                        np.array([-1 if face.planigon_type is None else face.planigon_type for face in batch]),
+                        np.array([face.edge_idx for face in batch]), [face.name for face in batch], padded, sizes)
+
+def faceChunks(diagram, chunk: int = EXPORT_CHUNK) -> Iterator[FaceChunk]:
+    # diagram is a planigonData.Diagram or a meshArrays.ArrayDiagram
+    if isinstance(diagram, ArrayDiagram):
+        return _meshChunks(diagram, chunk)
+    return _diagramChunks(diagram, chunk)
+
+def diagramBounds(diagram) -> Optional[tuple[float, float, float, float]]:
+    if isinstance(diagram, ArrayDiagram):
+        # straight from the position column, a loaded mesh has no face index yet
+        if diagram.num_vertices == 0:
+            return None
+        positions = diagram.positions[:diagram.num_vertices]
+        (xmin, ymin), (xmax, ymax) = positions.min(axis=0).tolist(), positions.max(axis=0).tolist()
+        return (xmin, ymin, xmax, ymax)
+    return diagram.bounding_box()
+
+## --- Writers --- ##
+
+def writeSVG(diagram, out: TextIO, chunk: int = EXPORT_CHUNK, stroke_width: Optional[float] = None):
+    # one <path> per face, planigon index and name as data attributes
+    bounds = diagramBounds(diagram) or (0.0, 0.0, 1.0, 1.0)
+    width, height = bounds[2] - bounds[0], bounds[3] - bounds[1]
+    stroke = 1e-3 * max(width, height) if stroke_width is None else stroke_width
+    pad = 2 * stroke
+    out.write('<svg xmlns="http://www.w3.org/2000/svg" '
+              f'viewBox="{bounds[0] - pad!r} {bounds[1] - pad!r} {width + 2 * pad!r} {height + 2 * pad!r}">\n'
+              f'<g fill="lightgray" stroke="black" stroke-width="{stroke!r}" stroke-linejoin="round">\n')
+    for faces in faceChunks(diagram, chunk):
+        lines = []
+        for ring, t, name in zip(faces.ring_lists(), faces.types.tolist(), faces.names):
+            d = "M" + "L".join(f"{x!r} {y!r}" for x, y in ring) + "Z"
+            attrs = "" if t < 0 else f' data-planigon="{t}"'
+            if name:
+                attrs += ' data-name="' + name.replace("&", "&amp;").replace('"', "&quot;").replace("<", "&lt;") + '"'
+            lines.append(f'<path d="{d}"{attrs}/>\n')
+        out.write("".join(lines))
+    out.write("</g>\n</svg>\n")
+
+def _properties(faces: FaceChunk, i: int, face_id: int, t: int, edge_idx: int) -> dict:
+    properties = {"id": face_id, "planigon_type": None if t < 0 else t, "edge_idx": edge_idx}
+    if faces.names[i]:
+        properties["name"] = faces.names[i]
+    return properties
+
+def writeGeoJSON(diagram, out: TextIO, chunk: int = EXPORT_CHUNK):
+    # a FeatureCollection of closed polygons; y is negated so the rings read the right
+    # way up, which also makes the editor's clockwise rings counterclockwise
+    out.write('{"type": "FeatureCollection", "features": [\n')
+    separator = ""
+    for faces in faceChunks(diagram, chunk):
+        lines = []
+        flipped = faces.rings * (1.0, -1.0) + 0.0  # + 0.0 so 0 doesn't print as -0.0
+        # shoelace area of every ring at once, clockwise ones are walked backwards
+        k = np.arange(flipped.shape[1])
+        sizes = faces.sizes[:, None]
+        step = np.take_along_axis(flipped, ((k + 1) % sizes)[:, :, None], axis=1)
+        area = np.nansum(flipped[:, :, 0] * step[:, :, 1] - step[:, :, 0] * flipped[:, :, 1], axis=1)
+        order = np.where((area < 0)[:, None] & (k < sizes), sizes - 1 - k, k)
+        flipped = np.take_along_axis(flipped, order[:, :, None], axis=1)
+        rings = [ring[:n] + ring[:1] for ring, n in zip(flipped.tolist(), faces.sizes.tolist())]
+        for i, (face_id, t, edge_idx) in enumerate(zip(faces.ids.tolist(), faces.types.tolist(), faces.edge_idxs.tolist())):
+            ring = rings[i]
+            feature = {"type": "Feature", "geometry": {"type": "Polygon", "coordinates": [ring]},
+                       "properties": _properties(faces, i, face_id, t, edge_idx)}
+            lines.append(separator + json.dumps(feature))
+            separator = ",\n"
+        out.write("".join(lines))
+    out.write("\n]}\n")
+
+def writeJSONL(diagram, out: TextIO, chunk: int = EXPORT_CHUNK):
+    # one JSON object per face and line: id, planigon_type, edge_idx, name, ring
+    for faces in faceChunks(diagram, chunk):
+        rings = faces.ring_lists()
+        lines = []
+        for i, (face_id, t, edge_idx) in enumerate(zip(faces.ids.tolist(), faces.types.tolist(), faces.edge_idxs.tolist())):
+            record = _properties(faces, i, face_id, t, edge_idx)
+            record["ring"] = rings[i]
+            lines.append(json.dumps(record) + "\n")
+        out.write("".join(lines))
+
+WRITERS = {"svg": writeSVG, "geojson": writeGeoJSON, "jsonl": writeJSONL}
+_EXTENSIONS = {".svg": "svg", ".geojson": "geojson", ".json": "geojson", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+def exportDiagram(diagram, path: str, format: Optional[str] = None, chunk: int = EXPORT_CHUNK):
+    # format defaults from the extension; path "-" writes to stdout
+    if format is None:
+        format = _EXTENSIONS.get(os.path.splitext(path)[1].lower())
+        if format is None:
+            raise ValueError(f"can't tell the export format of {path}, pass one of {', '.join(WRITERS)}")
+    writer = WRITERS[format]
+    if path == "-":
+        writer(diagram, sys.stdout, chunk)
+        return
+    tmpPath = path + ".tmp"
+    with open(tmpPath, "w", encoding="utf-8", newline="\n") as out:
+        writer(diagram, out, chunk)
+    os.replace(tmpPath, path)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export a saved planigon diagram")
+    parser.add_argument("input", help="diagram file written by the editor or diagramFile.saveDiagram")
+    parser.add_argument("output", help="output path, - for stdout")
+    parser.add_argument("--format", choices=sorted(WRITERS), default=None, help="defaults from the output extension")
+    parser.add_argument("--chunk", type=int, default=EXPORT_CHUNK, help="faces per write")
+    args = parser.parse_args(argv)
+    exportDiagram(loadDiagram(args.input), args.output, args.format, args.chunk)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+import gc
+import json
+import os
+import numpy as np
+from typing import Optional
+from include.meshArrays import ArrayDiagram
+from include.planigonData import Diagram, Face, HalfEdge, Vertex, fitVertexIndex, getCatalogue, iterate
+
+## --- Diagram files --- ##
+# A diagram is saved as the ArrayDiagram columns, raw little-endian arrays one after
+# another behind a JSON header giving each column's dtype, shape and offset:
+#   b"PLGNDIAG" | uint32 version | uint32 header bytes | header JSON | columns
+# Columns start on 64-byte boundaries so loadDiagram can np.memmap each one in place:
+# a million-face file opens without reading its columns or building an object per
+# element, and pages come in as they are touched. Face names are sparse, stored as
+# the rows of named faces plus their UTF-8 text end to end.
+#
+# Every face's half-edges are consecutive rows starting at face_edge, whichever
+# backend wrote the file, so corner angles can be recomputed from the columns alone.
+
+DIAGRAM_MAGIC = b"PLGNDIAG"
+DIAGRAM_EXTENSION = ".plgn"
+DIAGRAM_FILE_VERSION = 1
+_ALIGN = 64
+
+def _aligned(offset: int) -> int:
+    return -(-offset // _ALIGN) * _ALIGN
+
+def _meshColumns(mesh: ArrayDiagram) -> tuple[dict[str, np.ndarray], dict[int, str]]:
+    columns = {name: getattr(mesh, name)[:getattr(mesh, count)] for name, count in ArrayDiagram.columns.items()}
+    return columns, dict(mesh.face_names)
+
+def _diagramColumns(diagram: Diagram) -> tuple[dict[str, np.ndarray], dict[int, str]]:
+    # renumbers vertices, half-edges and faces densely, in id order
+    vertexRow = {vid: i for i, vid in enumerate(diagram.vertices)}
+    faces = list(diagram.faces.values())
+    edgeRow = {}
+    halfedges = []
+    sizes = []
+    for face in faces:
+        cycle = iterate(face.edge)
+        for he in cycle:
+            edgeRow[he] = len(halfedges)
+            halfedges.append(he)
+        sizes.append(len(cycle))
+    sizes = np.array(sizes, dtype=np.int32)
+    columns = {
+        "positions": np.array([v.pos for v in diagram.vertices.values()], dtype=np.float64).reshape(-1, 2),
+        "vertex_outgoing": np.array([edgeRow.get(v.outgoing, -1) for v in diagram.vertices.values()], dtype=np.int32),
+        "vertex_angle": np.array([diagram.vertex_angle.get(vid, 0) for vid in diagram.vertices], dtype=np.int32),
+        "origin": np.array([vertexRow[he.origin.id] for he in halfedges], dtype=np.int32),
+        "twin": np.array([edgeRow.get(he.twin, -1) for he in halfedges], dtype=np.int32),
+        "next": np.array([edgeRow[he.next] for he in halfedges], dtype=np.int32),
+        "prev": np.array([edgeRow[he.prev] for he in halfedges], dtype=np.int32),
+        "face_of": np.repeat(np.arange(len(faces), dtype=np.int32), sizes),
+        "face_edge": (np.cumsum(sizes) - sizes).astype(np.int32),
+        "face_type": np.array([-1 if f.planigon_type is None else f.planigon_type for f in faces], dtype=np.int32),
+        "face_edge_idx": np.array([f.edge_idx for f in faces], dtype=np.int32),
+    }
+    return columns, {row: f.name for row, f in enumerate(faces) if f.name}
+
+def _vertexAngles(columns: dict[str, np.ndarray]) -> np.ndarray:
+    # angle units used around every vertex, from the current catalogue
+    cat = getCatalogue()
+    face_of = columns["face_of"]
+    types = columns["face_type"][face_of]
+    typed = types >= 0
+    k = np.arange(len(face_of)) - columns["face_edge"][face_of]
+    sizes = cat.sizes[np.where(typed, types, 0)]
+    corners = (columns["face_edge_idx"][face_of] + k) % sizes
+    units = np.where(typed, cat.angleUnits[np.where(typed, types, 0), corners], 0)
+    return np.bincount(columns["origin"], units, minlength=len(columns["positions"])).astype(np.int32)
+
+def saveDiagram(diagram, path: str):
+    # diagram is a planigonData.Diagram or a meshArrays.ArrayDiagram
+    if isinstance(diagram, ArrayDiagram):
+        columns, names = _meshColumns(diagram)
+        cellSize = diagram.index_cell_size  # a loaded mesh may not have built its index yet
+    else:
+        columns, names = _diagramColumns(diagram)
+        cellSize = diagram.vertex_index.cell_size
+    rows = sorted(names)
+    text = [names[row].encode("utf-8") for row in rows]
+    columns["name_faces"] = np.array(rows, dtype=np.int32)
+    columns["name_offsets"] = np.cumsum([0] + [len(t) for t in text], dtype=np.int64)
+    columns["name_text"] = np.frombuffer(b"".join(text), dtype=np.uint8)
+
+    layout = {}
+    offset = 0
+    for name, column in columns.items():
+        column = np.ascontiguousarray(column, dtype=column.dtype.newbyteorder("<"))
+        columns[name] = column
+        layout[name] = [column.dtype.str, list(column.shape), offset]
+        offset = _aligned(offset + column.nbytes)
+    header = json.dumps({"catalogue": getCatalogue().key, "cell_size": cellSize,
+                         "columns": layout}).encode("utf-8")
+    start = _aligned(len(DIAGRAM_MAGIC) + 8 + len(header))
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmpPath = path + ".tmp"
+    with open(tmpPath, "wb") as fh:
+        fh.write(DIAGRAM_MAGIC)
+        fh.write(np.array([DIAGRAM_FILE_VERSION, len(header)], dtype="<u4").tobytes())
+        fh.write(header)
+        for name, column in columns.items():
+            fh.seek(start + layout[name][2])
+            fh.write(column.tobytes())
+    os.replace(tmpPath, path)
+
+def readHeader(path: str) -> tuple[dict, int]:
+    # (header, byte offset of the column data)
+    with open(path, "rb") as fh:
+        if fh.read(len(DIAGRAM_MAGIC)) != DIAGRAM_MAGIC:
+            raise ValueError(f"{path} is not a diagram file")
+        version, size = np.frombuffer(fh.read(8), dtype="<u4").tolist()
+        if version > DIAGRAM_FILE_VERSION:
+            raise ValueError(f"{path} is diagram file version {version}, newer than {DIAGRAM_FILE_VERSION}")
+        header = json.loads(fh.read(size))
+    return header, _aligned(len(DIAGRAM_MAGIC) + 8 + size)
+
+def loadDiagram(path: str, mmap: bool = True) -> ArrayDiagram:
+    # with mmap the columns are copy-on-write maps of the file, edits never reach it
+    header, start = readHeader(path)
+    columns = {}
+    for name, (dtype, shape, offset) in header["columns"].items():
+        count = int(np.prod(shape))
+        if count == 0:
+            columns[name] = np.zeros(shape, dtype=dtype)
+        elif mmap:
+            columns[name] = np.asarray(np.memmap(path, dtype=dtype, mode="c", offset=start + offset, shape=tuple(shape)))
+        else:
+            columns[name] = np.fromfile(path, dtype=dtype, count=count, offset=start + offset).reshape(shape)
+    if header["catalogue"] != getCatalogue().key:
+        # planigon angles changed since the file was written
+        columns["vertex_angle"] = _vertexAngles(columns)
+    text = columns["name_text"].tobytes()
+    offsets = columns["name_offsets"].tolist()
+    names = {row: text[offsets[i]:offsets[i + 1]].decode("utf-8")
+             for i, row in enumerate(columns["name_faces"].tolist())}
+    return ArrayDiagram.from_columns(columns, names, header["cell_size"])
+
+def toArrays(diagram: Diagram) -> ArrayDiagram:
+    # ArrayDiagram with the same faces, e.g. to merge an object Diagram into one
+    columns, names = _diagramColumns(diagram)
+    return ArrayDiagram.from_columns(columns, names, diagram.vertex_index.cell_size)
+
+def toDiagram(mesh: ArrayDiagram, snap_eps: Optional[float] = None) -> Diagram:
+    # object Diagram with the same faces, for editing with undo. The objects are linked
+    # straight from the columns: nothing is snapped or intersected again, and each
+    # spatial index is filled by one add_many. Still an object per element, so viewing
+    # a file is cheaper on the ArrayDiagram itself
+    diagram = Diagram(snap_eps=snap_eps)
+    if mesh.num_faces == 0:
+        return diagram
+    # nothing built here is garbage, collections would only rescan it (half the time)
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        _linkObjects(mesh, diagram)
+    finally:
+        if enabled:
+            gc.enable()
+    return diagram
+
+def _linkObjects(mesh: ArrayDiagram, diagram: Diagram):
+    V, E, F = mesh.num_vertices, mesh.num_edges, mesh.num_faces
+    positions = mesh.positions[:V]
+    origin = mesh.origin[:E].tolist()
+    vertices = [Vertex(pos, id=v) for v, pos in enumerate(map(tuple, positions.tolist()))]
+    halfedges = [HalfEdge(vertices[o]) for o in origin]
+    faces = [Face(halfedges[e], None if t < 0 else t, k, f, mesh.face_names.get(f, ""))
+             for f, (e, t, k) in enumerate(zip(mesh.face_edge[:F].tolist(), mesh.face_type[:F].tolist(),
+                                               mesh.face_edge_idx[:F].tolist()))]
+    twin = mesh.twin[:E].tolist()
+    for he, t, n, p, f in zip(halfedges, twin, mesh.next[:E].tolist(), mesh.prev[:E].tolist(), mesh.face_of[:E].tolist()):
+        he.next, he.prev, he.face = halfedges[n], halfedges[p], faces[f]
+        if t >= 0:
+            he.twin = halfedges[t]
+        else:
+            he.boundary = True
+    for v, e in zip(vertices, mesh.vertex_outgoing[:V].tolist()):
+        if e >= 0:
+            v.outgoing = halfedges[e]
+
+    diagram.vertices = dict(enumerate(vertices))
+    diagram.faces = dict(enumerate(faces))
+    diagram._next_vertex_id, diagram._next_face_id = V, F
+    diagram.edge_map = dict(zip(zip(origin, mesh.destination().tolist()), halfedges))
+    diagram.boundary = {halfedges[e]: None for e, t in enumerate(twin) if t < 0}
+    diagram.vertex_angle = {v: a for v, a in enumerate(mesh.vertex_angle[:V].tolist()) if a}
+    degree = np.bincount(mesh.origin[:E], minlength=V).tolist()
+    diagram._vertex_degree = {v: d for v, d in enumerate(degree) if d}
+    rings, sizes = mesh.face_rings(repeat_last=True)
+    if mesh.index_cell_size is not None:
+        diagram.vertex_index.resize(mesh.index_cell_size)
+    else:
+        fitVertexIndex(diagram.vertex_index, rings[0, :sizes[0]], faces[0].planigon_type)
+    diagram.vertex_index.add_many(vertices, positions)
+    diagram.face_index.add_many(faces, rings)
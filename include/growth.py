@@ -0,0 +1,296 @@
+import heapq
+import logging
+import math
+import time
+import numpy as np
+from dataclasses import dataclass
+from typing import Optional
+from include.planigonData import Diagram, Face, HalfEdge, describeProblems, getCatalogue, iterate
+
+## --- Headless tiling growth --- ##
+# Grows a Diagram outward from a seed face. Open half-edges wait in a priority queue
+# ordered by distance from the seed and are filled one at a time. A placement must
+# match the open edge's length, keep every touched vertex's angle sum at or below a
+# full turn with a remainder other planigon corners can still fill, and must not
+# overlap or T-junction what is already there. Angle sums are exact integer counts of
+# catalogue angle units, so closure never depends on a float tolerance however long
+# the run.
+#
+# In the dual (Laves) tilings the catalogue describes, every corner around a vertex
+# has the same angle (360 / vertex degree), which uniform_vertices enforces. Growing a
+# single planigon type, the engine also looks for an edge pairing: edge i of a face
+# is always shared with edge pairing[i] of its neighbour. A pairing is valid when
+# walking round every vertex returns to the starting corner after a full turn, and
+# then each open edge has exactly one placement, so growth never paints itself into
+# a corner. Without one it asks the diagram which (planigon, edgeIdx) fit the edge's
+# length and the angles left at both its ends, and keeps the valid placement that
+# reuses the most existing vertices.
+#
+# Placements are rotated copies of the catalogue ring, never mirrored ones (a face
+# has no handedness in the Diagram). Planigons whose tilings need both hands, the
+# scalene or chiral ones such as V4.6.12, run out of placements after a few faces;
+# run() then flags the stats as stalled and logs a warning instead of stopping
+# silently.
+
+log = logging.getLogger(__name__)
+
+LENGTH_TOL = 1e-6  # relative
+
+def edgePairings(catalogue, planigonIdx: int) -> list[tuple[int, ...]]:
+    # every involution p of the planigon's edges such that edge i can be glued to edge
+    # p[i] of a rotated copy, and the corners met walking round each vertex (corner c is
+    # followed by corner p[c] + 1) cycle back to the start within one full turn
+    n = int(catalogue.sizes[planigonIdx])
+    units = catalogue.angleUnits[planigonIdx, :n].tolist()
+    fullTurn = catalogue.fullTurn
+    lengths = catalogue.lengths[planigonIdx, :n]
+
+    def glues(i, j):
+        return (abs(lengths[i] - lengths[j]) <= LENGTH_TOL * lengths[i]
+                and units[j] == units[(i + 1) % n]
+                and units[(j + 1) % n] == units[i])
+
+    options = [[j for j in range(n) if glues(i, j) and glues(j, i)] for i in range(n)]
+    results = []
+
+    def closes(pairing):
+        for c in range(n):
+            if fullTurn % units[c] != 0:
+                return False
+            steps, curr = 1, (pairing[c] + 1) % n
+            while curr != c:
+                steps, curr = steps + 1, (pairing[curr] + 1) % n
+            if (fullTurn // units[c]) % steps != 0:
+                return False
+        return True
+
+    def search(pairing, i):
+        if i == n:
+            if closes(pairing):
+                results.append(tuple(pairing))
+            return
+        if pairing[i] >= 0:
+            search(pairing, i + 1)
+            return
+        for j in options[i]:
+            if pairing[j] < 0 or j == i:
+                pairing[i], pairing[j] = j, i
+                search(pairing, i + 1)
+                pairing[i] = pairing[j] = -1
+
+    search([-1] * n, 0)
+    return results
+
+@dataclass
+class GrowthStats:
+    faces: int = 0
+    attempts: int = 0
+    rejected: int = 0
+    dead_edges: int = 0
+    seconds: float = 0.0
+    stalled: bool = False  # the frontier ran out of placements before max_faces
+
+    @property
+    def faces_per_sec(self) -> float:
+        return self.faces / self.seconds if self.seconds > 0 else 0.0
+
+class GrowthEngine:
+    def __init__(self, diagram: Optional[Diagram] = None, planigon_types=(0,), scale: float = 1.0,
+                 max_faces: int = 1000, max_radius: Optional[float] = None, snap_eps: Optional[float] = None,
+                 uniform_vertices: bool = True, use_pairing: bool = True, validate_every: Optional[int] = None):
+        self.diagram = Diagram() if diagram is None else diagram
+        self.catalogue = getCatalogue()
+        self.planigon_types = list(planigon_types)
+        self.scale = scale
+        self.max_faces = max_faces
+        self.max_radius = max_radius
+        if snap_eps is not None:
+            self.diagram.snap_eps = snap_eps
+        self.uniform_vertices = uniform_vertices
+        self.validate_every = validate_every  # debug: Diagram.validate() every this many faces
+        self.center = np.zeros(2)
+        self.corner = {}  # vertex id -> angle units of the first corner placed there
+        self.layout = {}  # face id -> (planigonIdx, edgeIdx of its first half-edge)
+        self.orientation = {}  # face id -> direction of its planigon edge 0, degrees
+        self.stats = GrowthStats()
+        self._queue = []
+        self._counter = 0
+        cat = self.catalogue
+        # fits[remaining, p, k]: corner k of planigon p fits a vertex with remaining units free
+        self._fits = cat.cornerFitTable(self.planigon_types)
+        # direction of every planigon edge relative to its edge 0, degrees; new faces are
+        # oriented from these and their parent's orientation rather than from the drifting
+        # positions of the shared edge, so rounding error adds up instead of compounding
+        self._edge_direction = {p: self._edge_directions(p) for p in self.planigon_types}
+        self.pairing = None
+        if use_pairing and len(self.planigon_types) == 1:
+            pairings = edgePairings(cat, self.planigon_types[0])
+            self.pairing = pairings[0] if pairings else None
+
+    # -- bookkeeping -- #
+    def _edge_directions(self, planigonIdx: int) -> np.ndarray:
+        cat = self.catalogue
+        return np.concatenate(([0.0], -np.cumsum(180.0 - cat.angles[planigonIdx, 1:cat.sizes[planigonIdx]])))
+
+    def _push_open_edges(self, face: Face, edges=None):
+        # edges: ring positions of the half-edges that may be queued, None for all
+        planigonIdx, edgeIdx = self.layout[face.id]
+        n = self.catalogue.sizes[planigonIdx]
+        boundary = self.diagram.boundary
+        for k, he in enumerate(iterate(face.edge)):
+            if he not in boundary or (edges is not None and k not in edges):
+                continue
+            a, b = he.origin.pos, he.next.origin.pos
+            distance = float(np.hypot((a[0] + b[0]) * 0.5 - self.center[0], (a[1] + b[1]) * 0.5 - self.center[1]))
+            self._counter += 1
+            heapq.heappush(self._queue, (distance, self._counter, he, (edgeIdx + k) % n))
+
+    def _place(self, anchor, direction: float, planigonIdx: int, edgeIdx: int) -> np.ndarray:
+        # ring with planigon vertex edgeIdx at anchor and edge edgeIdx pointing along direction
+        length = self.scale * self.catalogue.lengths[planigonIdx, edgeIdx]
+        theta = math.radians(direction)
+        end = (anchor[0] + length * math.cos(theta), anchor[1] + length * math.sin(theta))
+        return self.catalogue.place((anchor, end), planigonIdx, edgeIdx)
+
+    def _commit(self, ring: np.ndarray, planigonIdx: int, edgeIdx: int, orientation: float) -> Face:
+        face = self.diagram.add_planigon([tuple(p) for p in ring.tolist()], planigonIdx, edgeIdx)
+        cat = self.catalogue
+        n = cat.sizes[planigonIdx]
+        for k, he in enumerate(iterate(face.edge)):
+            vid = he.origin.id
+            self.corner.setdefault(vid, int(cat.angleUnits[planigonIdx, (edgeIdx + k) % n]))
+        self.layout[face.id] = (planigonIdx, edgeIdx)
+        self.orientation[face.id] = orientation % 360.0
+        self.stats.faces += 1
+        self._push_open_edges(face)
+        return face
+
+    def adopt(self, ring, planigonIdx: Optional[int], edgeIdx: int = 0, open_edges=None) -> Face:
+        # adds a face placed elsewhere (e.g. the frontier of an edited diagram) for run()
+        # to grow from, only across the half-edges at ring positions open_edges if given;
+        # the first one sets the scale. Untyped faces are only obstacles
+        ring = np.asarray(ring, dtype=np.float64)
+        face = self.diagram.add_planigon([tuple(p) for p in ring.tolist()], planigonIdx, edgeIdx)
+        if planigonIdx is None:
+            return face
+        cat = self.catalogue
+        if not self.layout:
+            self.scale = float(np.hypot(*(ring[1] - ring[0]))) / cat.lengths[planigonIdx, edgeIdx]
+        if planigonIdx not in self._edge_direction:
+            self._edge_direction[planigonIdx] = self._edge_directions(planigonIdx)
+        n = cat.sizes[planigonIdx]
+        for k, he in enumerate(iterate(face.edge)):
+            self.corner.setdefault(he.origin.id, int(cat.angleUnits[planigonIdx, (edgeIdx + k) % n]))
+        # the face's first half-edge is its planigon edge edgeIdx
+        direction = math.degrees(math.atan2(ring[1, 1] - ring[0, 1], ring[1, 0] - ring[0, 0]))
+        self.layout[face.id] = (planigonIdx, edgeIdx)
+        self.orientation[face.id] = (direction - self._edge_direction[planigonIdx][edgeIdx]) % 360.0
+        self._push_open_edges(face, None if open_edges is None else set(open_edges))
+        return face
+
+    # -- placement checks -- #
+    def _fit_score(self, ring: np.ndarray, planigonIdx: int, edgeIdx: int) -> int:
+        # -1 if the placement is invalid, otherwise how many existing vertices it reuses
+        cat = self.catalogue
+        n = len(ring)
+        items = self.diagram.vertex_index.items
+        slots = self.diagram.vertex_index.find_near_slots(ring, self.diagram.snap_tolerance()).tolist()
+        vids = [items[s].id if s >= 0 else None for s in slots]
+        # angle closure at every vertex the face would share, one table lookup each
+        fullTurn = cat.fullTurn
+        used = self.diagram.vertex_angle
+        fits = self._fits
+        for k, vid in enumerate(vids):
+            corner = (edgeIdx + k) % n
+            if vid is None:
+                remaining = fullTurn
+            elif self.uniform_vertices and self.corner.get(vid, cat.angleUnits[planigonIdx, corner]) != cat.angleUnits[planigonIdx, corner]:
+                return -1
+            else:
+                remaining = fullTurn - used.get(vid, 0)  # untyped faces claim no angle
+            if not fits[remaining, planigonIdx, corner]:
+                return -1
+        # an existing edge running the same way means the faces would overlap
+        edge_map = self.diagram.edge_map
+        for k in range(n):
+            a, b = vids[k], vids[(k + 1) % n]
+            if a is not None and b is not None and (a, b) in edge_map:
+                return -1
+        if self.diagram.intersects_existing(ring):
+            return -1
+        return n - vids.count(None)
+
+    # -- growth -- #
+    def seed(self, planigonIdx: Optional[int] = None, origin=(0.0, 0.0), direction=(1.0, 0.0)) -> Face:
+        planigonIdx = self.planigon_types[0] if planigonIdx is None else planigonIdx
+        origin = np.asarray(origin, dtype=np.float64)
+        direction = np.asarray(direction, dtype=np.float64)
+        direction = direction / np.hypot(*direction)
+        orientation = math.degrees(math.atan2(direction[1], direction[0]))
+        ring = self._place(origin, orientation, planigonIdx, 0)
+        self.center = ring.mean(axis=0)
+        return self._commit(ring, planigonIdx, 0, orientation)
+
+    def try_fill(self, he: HalfEdge, hostEdgeIdx: int) -> Optional[Face]:
+        # attaches a face on the open side of he, or returns None if nothing fits;
+        # hostEdgeIdx is he's edge index within its own planigon
+        hostPlanigon = self.layout[he.face.id][0]
+        # the new face walks the shared edge the other way round
+        direction = self.orientation[he.face.id] + self._edge_direction[hostPlanigon][hostEdgeIdx] + 180.0
+        if self.pairing is not None and hostPlanigon == self.planigon_types[0]:
+            candidates = [(self.planigon_types[0], self.pairing[hostEdgeIdx])]
+        else:
+            candidates = self.diagram.fitting_placements(he, self.planigon_types)
+        anchor = he.next.origin.pos
+        best = None
+        bestScore = -1
+        for planigonIdx, edgeIdx in candidates:
+            self.stats.attempts += 1
+            ring = self._place(anchor, direction, planigonIdx, edgeIdx)
+            score = self._fit_score(ring, planigonIdx, edgeIdx)
+            if score < 0:
+                self.stats.rejected += 1
+            elif score > bestScore:
+                orientation = direction - self._edge_direction[planigonIdx][edgeIdx]
+                best, bestScore = (ring, planigonIdx, edgeIdx, orientation), score
+        return None if best is None else self._commit(*best)
+
+    def fills(self, he: HalfEdge) -> bool:
+        # open edges within max_radius that run() may fill; subclasses that grow part
+        # of the plane (parallelGrowth) leave the rest open
+        return True
+
+    def run(self) -> GrowthStats:
+        start = time.perf_counter()
+        if not self.diagram.faces:
+            self.seed()
+        boundary = self.diagram.boundary
+        while self._queue and self.stats.faces < self.max_faces:
+            distance, _, he, hostEdgeIdx = heapq.heappop(self._queue)
+            if self.max_radius is not None and distance > self.max_radius:
+                break
+            if he not in boundary or not self.fills(he):
+                continue
+            if self.try_fill(he, hostEdgeIdx) is None:
+                self.stats.dead_edges += 1
+            elif self.validate_every and self.stats.faces % self.validate_every == 0:
+                self.check()
+        self.stats.seconds += time.perf_counter() - start
+        # a queue emptied before max_faces means every open edge left was dead
+        self.stats.stalled = not self._queue and self.stats.faces < self.max_faces and self.stats.dead_edges > 0
+        if self.stats.stalled:
+            log.warning("growth of planigons %s stalled after %d faces: none of the %d open edges left takes a "
+                        "rotated placement (mirrored ones are not tried)", self.planigon_types, self.stats.faces,
+                        len(self.diagram.boundary))
+        return self.stats
+
+    def check(self):
+        # raises ValueError naming whatever Diagram.validate() finds wrong
+        problems = self.diagram.validate()
+        if problems:
+            raise ValueError(f"mesh broken after {self.stats.faces} faces: {describeProblems(problems)}")
+
+def grow(planigonIdx: int = 0, max_faces: int = 1000, max_radius: Optional[float] = None, scale: float = 1.0) -> tuple[Diagram, GrowthStats]:
+    engine = GrowthEngine(planigon_types=(planigonIdx,), scale=scale, max_faces=max_faces, max_radius=max_radius)
+    stats = engine.run()
+    return engine.diagram, stats
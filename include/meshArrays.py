@@ -0,0 +1,523 @@
+import numpy as np
+from typing import Optional
+from include import perfStats
+from include.planigonData import (SNAP_CELL_FRACTION, FaceIndex, VertexIndex, affineMatrix, applyAffine, fitVertexIndex,
+                                  getCatalogue, meshProblems)
+
+## --- Struct-of-arrays half-edge mesh --- ##
+# Alternative Diagram backend: every element is an int32 row in a column array
+# instead of a Python object. -1 marks a missing reference (no twin, no face, ...).
+#   vertices:   positions (N, 2) float64, vertex_outgoing, vertex_angle (N,)
+#   half-edges: origin, twin, next, prev, face (E,)
+#   faces:      face_edge, face_type, face_edge_idx (F,)
+# Face names are sparse, a dict from face row to text for the faces that have one.
+# The view classes below wrap a row index and expose the same attributes as
+# planigonData.Vertex / HalfEdge / Face, so UI code can walk either backend.
+
+class VertexView:
+    __slots__ = ("mesh", "idx")
+
+    def __init__(self, mesh: 'ArrayDiagram', idx: int):
+        self.mesh = mesh
+        self.idx = idx
+
+    def __eq__(self, other):
+        return type(other) is VertexView and other.idx == self.idx and other.mesh is self.mesh
+
+    def __hash__(self):
+        return hash((id(self.mesh), 0, self.idx))
+
+    @property
+    def pos(self) -> tuple[float, float]:
+        x, y = self.mesh.positions[self.idx].tolist()
+        return (x, y)
+
+    @property
+    def outgoing(self) -> Optional['HalfEdgeView']:
+        return self.mesh.edge(self.mesh.vertex_outgoing[self.idx])
+
+class HalfEdgeView:
+    __slots__ = ("mesh", "idx")
+
+    def __init__(self, mesh: 'ArrayDiagram', idx: int):
+        self.mesh = mesh
+        self.idx = idx
+
+    def __eq__(self, other):
+        return type(other) is HalfEdgeView and other.idx == self.idx and other.mesh is self.mesh
+
+    def __hash__(self):
+        return hash((id(self.mesh), 1, self.idx))
+
+    @property
+    def origin(self) -> VertexView:
+        return VertexView(self.mesh, int(self.mesh.origin[self.idx]))
+
+    @property
+    def twin(self) -> Optional['HalfEdgeView']:
+        return self.mesh.edge(self.mesh.twin[self.idx])
+
+    @property
+    def next(self) -> Optional['HalfEdgeView']:
+        return self.mesh.edge(self.mesh.next[self.idx])
+
+    @property
+    def prev(self) -> Optional['HalfEdgeView']:
+        return self.mesh.edge(self.mesh.prev[self.idx])
+
+    @property
+    def face(self) -> Optional['FaceView']:
+        return self.mesh.face(self.mesh.face_of[self.idx])
+
+    @property
+    def boundary(self) -> bool:
+        return bool(self.mesh.twin[self.idx] < 0)
+
+class FaceView:
+    __slots__ = ("mesh", "idx")
+
+    def __init__(self, mesh: 'ArrayDiagram', idx: int):
+        self.mesh = mesh
+        self.idx = idx
+
+    def __eq__(self, other):
+        return type(other) is FaceView and other.idx == self.idx and other.mesh is self.mesh
+
+    def __hash__(self):
+        return hash((id(self.mesh), 2, self.idx))
+
+    @property
+    def edge(self) -> Optional[HalfEdgeView]:
+        return self.mesh.edge(self.mesh.face_edge[self.idx])
+
+    @property
+    def planigon_type(self) -> Optional[int]:
+        t = int(self.mesh.face_type[self.idx])
+        return None if t < 0 else t
+
+    @property
+    def edge_idx(self) -> int:
+        return int(self.mesh.face_edge_idx[self.idx])
+
+    @property
+    def id(self) -> int:
+        return self.idx
+
+    @property
+    def name(self) -> str:
+        return self.mesh.face_names.get(self.idx, "")
+
+    @name.setter
+    def name(self, value: str):
+        if value:
+            self.mesh.face_names[self.idx] = value
+        else:
+            self.mesh.face_names.pop(self.idx, None)
+
+def _grown(column: np.ndarray, size: int, fill) -> np.ndarray:
+    capacity = max(len(column), 1)
+    while capacity < size:
+        capacity *= 2
+    result = np.full((capacity,) + column.shape[1:], fill, dtype=column.dtype)
+    result[:len(column)] = column
+    return result
+
+class ArrayDiagram:
+    columns = {"positions": "num_vertices", "vertex_outgoing": "num_vertices", "vertex_angle": "num_vertices",
+               "origin": "num_edges", "twin": "num_edges", "next": "num_edges", "prev": "num_edges",
+               "face_of": "num_edges", "face_edge": "num_faces", "face_type": "num_faces",
+               "face_edge_idx": "num_faces"}  # column -> count of rows in use
+
+    def __init__(self, capacity: int = 1024):
+        self.num_vertices = 0
+        self.num_edges = 0
+        self.num_faces = 0
+        self.positions = np.empty((capacity, 2), dtype=np.float64)
+        self.vertex_outgoing = np.full(capacity, -1, dtype=np.int32)
+        self.vertex_angle = np.zeros(capacity, dtype=np.int32)  # catalogue angle units used
+        self.origin = np.full(capacity, -1, dtype=np.int32)
+        self.twin = np.full(capacity, -1, dtype=np.int32)
+        self.next = np.full(capacity, -1, dtype=np.int32)
+        self.prev = np.full(capacity, -1, dtype=np.int32)
+        self.face_of = np.full(capacity, -1, dtype=np.int32)
+        self.face_edge = np.full(capacity, -1, dtype=np.int32)
+        self.face_type = np.full(capacity, -1, dtype=np.int32)
+        self.face_edge_idx = np.zeros(capacity, dtype=np.int32)
+        self.face_names = {}  # face row -> name
+        self._vertex_index = VertexIndex()
+        self._face_index = FaceIndex()
+        self._index_cell_size = None  # vertex cell size to rebuild with, see from_columns
+        self.open_edges = {}  # dict[(origin id, destination id)] -> twinless half-edge id
+
+    @classmethod
+    def from_columns(cls, columns: dict[str, np.ndarray], face_names=None, cell_size: Optional[float] = None) -> 'ArrayDiagram':
+        # wraps existing columns (e.g. memory-mapped from a file) without copying them;
+        # the spatial indexes are only rebuilt when something first asks for them
+        mesh = cls(capacity=1)
+        for name in cls.columns:
+            setattr(mesh, name, columns[name])
+        mesh.num_vertices = len(mesh.positions)
+        mesh.num_edges = len(mesh.origin)
+        mesh.num_faces = len(mesh.face_edge)
+        mesh.face_names = dict(face_names or {})
+        mesh._vertex_index = None
+        mesh._face_index = None
+        mesh._index_cell_size = cell_size
+        boundary = np.nonzero(mesh.twin < 0)[0]
+        ends = zip(mesh.origin[boundary].tolist(), mesh.origin[mesh.next[boundary]].tolist())
+        mesh.open_edges = dict(zip(ends, boundary.tolist()))
+        return mesh
+
+    # -- spatial indexes -- #
+    @property
+    def vertex_index(self) -> VertexIndex:
+        if self._vertex_index is None:
+            V = self.num_vertices
+            self._vertex_index = VertexIndex() if self._index_cell_size is None else VertexIndex(self._index_cell_size)
+            self._vertex_index.add_many(range(V), self.positions[:V])
+        return self._vertex_index
+
+    @property
+    def index_cell_size(self) -> Optional[float]:
+        # vertex cell size in use, or to rebuild with, without building the index
+        return self._index_cell_size if self._vertex_index is None else self._vertex_index.cell_size
+
+    @property
+    def face_index(self) -> FaceIndex:
+        if self._face_index is None:
+            self._face_index = FaceIndex()
+            rings, _ = self.face_rings(repeat_last=True)
+            self._face_index.add_many([FaceView(self, f) for f in range(self.num_faces)], rings)
+        return self._face_index
+
+    # -- views -- #
+    def vertex(self, idx) -> Optional[VertexView]:
+        return None if idx < 0 else VertexView(self, int(idx))
+
+    def edge(self, idx) -> Optional[HalfEdgeView]:
+        return None if idx < 0 else HalfEdgeView(self, int(idx))
+
+    def face(self, idx) -> Optional[FaceView]:
+        return None if idx < 0 else FaceView(self, int(idx))
+
+    @property
+    def vertices(self) -> list[VertexView]:
+        return [VertexView(self, i) for i in range(self.num_vertices)]
+
+    @property
+    def edges(self) -> list[HalfEdgeView]:
+        return [HalfEdgeView(self, i) for i in range(self.num_edges)]
+
+    @property
+    def faces(self) -> list[FaceView]:
+        return [FaceView(self, i) for i in range(self.num_faces)]
+
+    # -- storage -- #
+    def _reserve(self, vertices: int, edges: int, faces: int):
+        if vertices > len(self.positions):
+            self.positions = _grown(self.positions, vertices, 0.0)
+            self.vertex_outgoing = _grown(self.vertex_outgoing, vertices, -1)
+            self.vertex_angle = _grown(self.vertex_angle, vertices, 0)
+        if edges > len(self.origin):
+            self.origin = _grown(self.origin, edges, -1)
+            self.twin = _grown(self.twin, edges, -1)
+            self.next = _grown(self.next, edges, -1)
+            self.prev = _grown(self.prev, edges, -1)
+            self.face_of = _grown(self.face_of, edges, -1)
+        if faces > len(self.face_edge):
+            self.face_edge = _grown(self.face_edge, faces, -1)
+            self.face_type = _grown(self.face_type, faces, -1)
+            self.face_edge_idx = _grown(self.face_edge_idx, faces, 0)
+
+    def nbytes(self) -> int:
+        # bytes held by the used part of every column
+        V, E, F = self.num_vertices, self.num_edges, self.num_faces
+        return (V * (self.positions.itemsize * 2 + self.vertex_outgoing.itemsize + self.vertex_angle.itemsize)
+                + E * 5 * self.origin.itemsize
+                + F * (self.face_edge.itemsize + self.face_type.itemsize + self.face_edge_idx.itemsize))
+
+    def snap_tolerance(self) -> float:
+        return SNAP_CELL_FRACTION * self.vertex_index.cell_size
+
+    @perfStats.timed("diagram.intersects_existing")
+    def intersects_existing(self, vertices_pos) -> bool:
+        return self.face_index.intersects(vertices_pos, self.snap_tolerance())
+
+    def face_at(self, pos) -> Optional[FaceView]:
+        return self.face_index.find_containing(pos)
+
+    def bounding_box(self) -> Optional[tuple[float, float, float, float]]:
+        return self.face_index.bounds
+
+    def remaining_angle(self, v: VertexView) -> int:
+        return getCatalogue().fullTurn - int(self.vertex_angle[v.idx])
+
+    def fitting_corners(self, v: VertexView, planigon_types=None) -> list[tuple[int, int]]:
+        return getCatalogue().fittingCorners(self.remaining_angle(v), planigon_types)
+
+    def edge_corner(self, he: HalfEdgeView) -> Optional[tuple[int, int]]:
+        f = self.face_of[he.idx]
+        t = int(self.face_type[f]) if f >= 0 else -1
+        if t < 0:
+            return None
+        k = 0
+        curr = self.face_edge[f]
+        while curr != he.idx:
+            curr = self.next[curr]
+            k += 1
+        return t, (int(self.face_edge_idx[f]) + k) % int(getCatalogue().sizes[t])
+
+    def fitting_placements(self, he: HalfEdgeView, planigon_types=None) -> list[tuple[int, int]]:
+        cat = getCatalogue()
+        corner = self.edge_corner(he)
+        lengthClass = None if corner is None else int(cat.lengthClass[corner])
+        a = self.origin[he.idx]
+        b = self.origin[self.next[he.idx]]
+        return cat.attachments(lengthClass, cat.fullTurn - int(self.vertex_angle[b]),
+                               cat.fullTurn - int(self.vertex_angle[a]), planigon_types)
+
+    def frontier_placements(self, planigon_types=None) -> dict[HalfEdgeView, list[tuple[int, int]]]:
+        return {HalfEdgeView(self, e): self.fitting_placements(HalfEdgeView(self, e), planigon_types)
+                for e in self.open_edges.values()}
+
+    @perfStats.timed("diagram.add_planigon")
+    def add_planigon(self, vertices_pos, planigon_type: Optional[int] = None, edge_idx: int = 0) -> FaceView:
+        ring = np.asarray(vertices_pos, dtype=np.float64).reshape(-1, 2)
+        face_index = self.face_index  # built before this face is in the columns
+        n = len(ring)
+        fitVertexIndex(self.vertex_index, ring, planigon_type)
+        slots = self.vertex_index.find_near_slots(ring, eps=self.snap_tolerance()).tolist()
+        self._reserve(self.num_vertices + n, self.num_edges + n, self.num_faces + 1)
+
+        verts = []
+        for i, slot in enumerate(slots):
+            if slot < 0:
+                v = self.num_vertices
+                self.positions[v] = ring[i]
+                self.vertex_index.add(v, ring[i])
+                self.num_vertices += 1
+            else:
+                v = self.vertex_index.items[slot]
+            verts.append(v)
+
+        f = self.num_faces
+        e0 = self.num_edges
+        ids = np.arange(e0, e0 + n, dtype=np.int32)
+        self.origin[e0:e0 + n] = verts
+        self.next[e0:e0 + n - 1] = ids[1:]
+        self.next[e0 + n - 1] = e0
+        self.prev[e0 + 1:e0 + n] = ids[:-1]
+        self.prev[e0] = e0 + n - 1
+        self.face_of[e0:e0 + n] = f
+        self.vertex_outgoing[verts] = ids
+        for i in range(n):
+            a, b = verts[i], verts[(i + 1) % n]
+            twin = self.open_edges.pop((b, a), None)
+            if twin is None:
+                self.open_edges[(a, b)] = e0 + i
+            else:
+                self.twin[e0 + i] = twin
+                self.twin[twin] = e0 + i
+
+        self.face_edge[f] = e0
+        self.face_type[f] = -1 if planigon_type is None else planigon_type
+        self.face_edge_idx[f] = edge_idx
+        if planigon_type is not None:
+            cat = getCatalogue()
+            corners = (edge_idx + np.arange(n)) % cat.sizes[planigon_type]
+            self.vertex_angle[verts] += cat.angleUnits[planigon_type, corners].astype(np.int32)
+        self.num_edges += n
+        self.num_faces += 1
+        view = FaceView(self, f)
+        face_index.add(view, ring)
+        return view
+
+    # -- vectorized traversals -- #
+    def boundary_mask(self) -> np.ndarray:
+        return self.twin[:self.num_edges] < 0
+
+    def boundary_edges(self) -> np.ndarray:
+        return np.nonzero(self.boundary_mask())[0]
+
+    def face_open_edges(self, face: FaceView) -> list[HalfEdgeView]:
+        start = self.face_edge[face.idx]
+        result = []
+        curr = start
+        while True:
+            if self.twin[curr] < 0:
+                result.append(HalfEdgeView(self, int(curr)))
+            curr = self.next[curr]
+            if curr == start:
+                return result
+
+    def destination(self, edges=None) -> np.ndarray:
+        edges = np.arange(self.num_edges) if edges is None else edges
+        return self.origin[self.next[edges]]
+
+    def face_sizes(self) -> np.ndarray:
+        return np.bincount(self.face_of[:self.num_edges], minlength=self.num_faces)
+
+    def face_rings(self, faces=None, repeat_last: bool = False) -> tuple[np.ndarray, np.ndarray]:
+        # (F, maxN, 2) vertex rings padded with NaN, or by repeating each ring's last
+        # vertex as FaceIndex.add_many takes them, plus the vertex count per face, of
+        # every face or the given face rows, built by stepping the cycles in lockstep
+        faces = np.arange(self.num_faces) if faces is None else np.asarray(faces, dtype=np.int64)
+        F = len(faces)
+        sizes = self.face_sizes()[faces]
+        maxN = int(sizes.max()) if F else 0
+        rings = np.full((F, maxN, 2), np.nan)
+        curr = self.face_edge[faces].copy()
+        for k in range(maxN):
+            live = k < sizes
+            rings[live, k] = self.positions[self.origin[curr[live]]]
+            curr = self.next[curr]
+        if repeat_last and F:
+            last = rings[np.arange(F), sizes - 1]
+            rings = np.where(np.isnan(rings), last[:, None], rings)
+        return rings, sizes
+
+    # -- integrity -- #
+    @perfStats.timed("diagram.validate")
+    def validate(self) -> dict[str, list[int]]:
+        # broken invariant -> face or vertex rows involved (see planigonData.meshProblems),
+        # plus "boundary" for faces whose open_edges entries disagree with twin; empty
+        # when the mesh is sound. Works on the columns in place, e.g. memory-mapped
+        columns = {name: getattr(self, name)[:getattr(self, count)] for name, count in self.columns.items()}
+        if self._vertex_index is not None:
+            cellSize = self._vertex_index.cell_size
+        else:
+            cellSize = self._index_cell_size if self._index_cell_size is not None else VertexIndex().cell_size
+        problems = {name: rows.tolist() for name, rows in meshProblems(columns, SNAP_CELL_FRACTION * cellSize).items()}
+        E = self.num_edges
+        listed = np.fromiter(self.open_edges.values(), dtype=np.int64, count=len(self.open_edges))
+        outside = (listed < 0) | (listed >= E)
+        wrong = [e for (a, b), e in self.open_edges.items()
+                 if 0 <= e < E and (self.twin[e] >= 0 or self.origin[e] != a or self.origin[self.next[e]] != b)]
+        unlisted = np.setdiff1d(np.nonzero(self.twin[:E] < 0)[0], listed)
+        faces = np.unique(self.face_of[np.concatenate((np.array(wrong, dtype=np.int64), unlisted))])
+        if len(faces) or outside.any():
+            problems["boundary"] = faces.tolist()
+        return problems
+
+    # -- merging -- #
+    def _has_edge(self, a: int, b: int) -> bool:
+        # is there a half-edge a -> b or b -> a, walking the fan of faces around a
+        start = int(self.vertex_outgoing[a])
+        if start < 0:
+            return False
+        e = start
+        while True:  # clockwise until back at start or out through an open edge
+            if self.origin[self.next[e]] == b or self.origin[self.prev[e]] == b:
+                return True
+            twin = self.twin[self.prev[e]]
+            if twin < 0 or twin == start:
+                break
+            e = twin
+        e = start
+        while self.twin[e] >= 0:  # counterclockwise from start
+            e = self.next[self.twin[e]]
+            if e == start:
+                break
+            if self.origin[self.next[e]] == b or self.origin[self.prev[e]] == b:
+                return True
+        return False
+
+    def _check_merge(self, other: 'ArrayDiagram', positions: np.ndarray, matrix, eps: float) -> np.ndarray:
+        # other vertex row -> the vertex row here it snaps to (-1 for none); only other's
+        # boundary vertices are looked up. Raises ValueError where merging would overlap
+        # faces or overfill a vertex
+        target = np.full(other.num_vertices, -1, dtype=np.int64)
+        if not self.num_faces:
+            return target
+        openEdges = np.fromiter(other.open_edges.values(), dtype=np.int64, count=len(other.open_edges))
+        corners = np.unique(other.origin[openEdges])
+        slots = self.vertex_index.find_near_slots(positions[corners], eps)
+        hit = slots >= 0
+        items = self.vertex_index.items
+        target[corners[hit]] = [items[slot] for slot in slots[hit].tolist()]
+        matched = target >= 0
+        if len(np.unique(target[matched])) < int(matched.sum()):
+            raise ValueError("several boundary vertices snap onto one vertex")
+        over = self.vertex_angle[target[matched]] + other.vertex_angle[:other.num_vertices][matched] > getCatalogue().fullTurn
+        if over.any():
+            raise ValueError(f"vertex at {tuple(positions[matched][over][0].tolist())} would hold more than a full turn")
+        for a, b in other.open_edges:
+            ta, tb = int(target[a]), int(target[b])
+            if ta < 0 or tb < 0 or (tb, ta) in self.open_edges:
+                continue
+            if (ta, tb) in self.open_edges or self._has_edge(ta, tb):
+                raise ValueError(f"edge {tuple(positions[a].tolist())} -> {tuple(positions[b].tolist())} is already used")
+        # the two boundaries against the other diagram's faces, both ways round
+        inverse = None if matrix is None else np.linalg.inv(np.vstack((matrix, (0.0, 0.0, 1.0))))[:2]
+        for source, dest, transform in ((other, self, matrix), (self, other, inverse)):
+            faces = np.unique(source.face_of[np.fromiter(source.open_edges.values(), dtype=np.int64)])
+            rings, sizes = source.face_rings(faces)
+            for ring, n in zip(applyAffine(rings, transform), sizes.tolist()):
+                if dest.face_index.intersects(ring[:n], eps):
+                    raise ValueError("the diagrams overlap")
+        return target
+
+    @perfStats.timed("diagram.merge")
+    def merge(self, other: 'ArrayDiagram', transform=None) -> list[FaceView]:
+        # appends a copy of every face of other, after the optional affine transform, and
+        # returns them. other's boundary vertices snap onto vertices here in one batch
+        # query and its open edges pair with open edges here; every column is copied
+        # across with its rows offset in one array op. Raises ValueError, changing
+        # nothing, if the faces would overlap.
+        matrix = None if transform is None else affineMatrix(transform)
+        V0, E0, F0 = self.num_vertices, self.num_edges, self.num_faces
+        V1, E1, F1 = other.num_vertices, other.num_edges, other.num_faces
+        if not F1:
+            return []
+        positions = applyAffine(other.positions[:V1], matrix)
+        otherCells = other._vertex_index.cell_size if other._vertex_index is not None else other._index_cell_size
+        if otherCells is not None:
+            if not V0:
+                self._index_cell_size = otherCells
+                self._vertex_index = None
+            elif otherCells < self.vertex_index.cell_size:
+                self.vertex_index.resize(otherCells)
+        target = self._check_merge(other, positions, matrix, self.snap_tolerance() if F0 else 0.0)
+
+        # vertex rows: snapped vertices map onto their target, the rest are appended
+        fresh = target < 0
+        V = int(fresh.sum())
+        vmap = target.copy()
+        vmap[fresh] = np.arange(V0, V0 + V)
+        self._reserve(V0 + V, E0 + E1, F0 + F1)
+        outgoing = other.vertex_outgoing[:V1][fresh]
+        self.positions[V0:V0 + V] = positions[fresh]
+        self.vertex_outgoing[V0:V0 + V] = np.where(outgoing < 0, -1, outgoing + E0)
+        self.vertex_angle[V0:V0 + V] = other.vertex_angle[:V1][fresh]
+        self.vertex_angle[target[~fresh]] += other.vertex_angle[:V1][~fresh]
+
+        # half-edge and face rows, references offset past the rows already here
+        self.origin[E0:E0 + E1] = vmap[other.origin[:E1]]
+        for name in ("twin", "next", "prev"):
+            column = getattr(other, name)[:E1]
+            getattr(self, name)[E0:E0 + E1] = np.where(column < 0, -1, column + E0)
+        self.face_of[E0:E0 + E1] = other.face_of[:E1] + F0
+        self.face_edge[F0:F0 + F1] = other.face_edge[:F1] + E0
+        self.face_type[F0:F0 + F1] = other.face_type[:F1]
+        self.face_edge_idx[F0:F0 + F1] = other.face_edge_idx[:F1]
+        self.face_names.update({F0 + f: name for f, name in other.face_names.items()})
+        self.num_vertices, self.num_edges, self.num_faces = V0 + V, E0 + E1, F0 + F1
+
+        # other's open edges pair up with open edges here
+        ends = vmap.tolist()
+        for (a, b), e in other.open_edges.items():
+            a, b, e = ends[a], ends[b], e + E0
+            twin = self.open_edges.pop((b, a), None)
+            if twin is None:
+                self.open_edges[(a, b)] = e
+            else:
+                self.twin[e] = twin
+                self.twin[twin] = e
+
+        if self._vertex_index is not None:
+            self._vertex_index.add_many(range(V0, V0 + V), positions[fresh])
+        faces = [FaceView(self, f) for f in range(F0, F0 + F1)]
+        if self._face_index is not None:
+            rings, _ = self.face_rings(range(F0, F0 + F1), repeat_last=True)
+            self._face_index.add_many(faces, rings)
+        return faces
@@ -0,0 +1,213 @@
+import math
+import os
+import sys
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+from include.growth import GrowthEngine, GrowthStats
+from include.meshArrays import ArrayDiagram
+from include.planigonData import Diagram, HalfEdge, VertexIndex, getCatalogue, iterate
+
+## --- Parallel growth --- ##
+# Grows the disk of radius max_radius that a serial GrowthEngine run would, split into
+# one angular wedge per worker process. The parent grows a small seed patch; every
+# worker replays it and grows only the open edges within WEDGE_MARGIN face extents of
+# its wedge, then sends back the faces whose centroid lies inside the wedge as
+# compact arrays (vertex positions, corner indexes, planigon, edge index). Merging
+# snaps the vertices near a wedge edge or the seed onto one another, keeps the rest
+# as they are, and pairs twin half-edges by their end vertices.
+#
+# Growing one planigon with an edge pairing, every open edge has exactly one
+# placement, so the tiling does not depend on the order edges are filled and the
+# merged faces are the serial run's faces. Without a pairing the result depends on
+# fill order and only the single-worker case matches a serial run.
+
+WEDGE_MARGIN = 3.0  # face extents grown past each side of a wedge
+WEDGE_OFFSET = 0.5  # radians, keeps wedge edges off the axes where faces line up
+
+def _rayDistance(point, angle: float) -> float:
+    # distance from point (relative to the centre) to the ray from the centre at angle
+    ux, uy = math.cos(angle), math.sin(angle)
+    if point[0] * ux + point[1] * uy <= 0:
+        return math.hypot(*point)
+    return abs(point[0] * uy - point[1] * ux)
+
+def _wedgeDistance(point, start: float, stop: float) -> float:
+    # distance from point (relative to the centre) to the wedge from angle start to stop
+    if stop - start >= 2 * math.pi or (math.atan2(point[1], point[0]) - start) % (2 * math.pi) <= stop - start:
+        return 0.0
+    return min(_rayDistance(point, start), _rayDistance(point, stop))
+
+class WedgeGrowthEngine(GrowthEngine):
+    # fills open edges no further than margin from the wedge between two angles
+    def __init__(self, start: float, stop: float, margin: float, **kwargs):
+        super().__init__(**kwargs)
+        self.wedge = (start, stop)
+        self.margin = margin
+
+    def fills(self, he: HalfEdge) -> bool:
+        a, b = he.origin.pos, he.next.origin.pos
+        midpoint = ((a[0] + b[0]) * 0.5 - self.center[0], (a[1] + b[1]) * 0.5 - self.center[1])
+        return _wedgeDistance(midpoint, *self.wedge) <= self.margin
+
+def _faceArrays(diagram: Diagram, faces, seam) -> dict:
+    # compact arrays for faces: positions of the vertices they use, corner indexes into
+    # them (-1 padded), and which vertices seam(position) says may be shared elsewhere
+    vertexRow = {}
+    positions = []
+    maxN = max((len(iterate(face.edge)) for face in faces), default=0)
+    corners = np.full((len(faces), maxN), -1, dtype=np.int32)
+    for f, face in enumerate(faces):
+        for k, he in enumerate(iterate(face.edge)):
+            row = vertexRow.get(he.origin.id)
+            if row is None:
+                row = vertexRow[he.origin.id] = len(positions)
+                positions.append(he.origin.pos)
+            corners[f, k] = row
+    positions = np.array(positions, dtype=np.float64).reshape(-1, 2)
+    return {"positions": positions, "corners": corners,
+            "sizes": (corners >= 0).sum(axis=1).astype(np.int32),
+            "types": np.array([face.planigon_type for face in faces], dtype=np.int32),
+            "edge_idxs": np.array([face.edge_idx for face in faces], dtype=np.int32),
+            "seam": np.array([seam(p) for p in positions.tolist()], dtype=bool)}
+
+def _growWedge(task: dict) -> tuple[dict, tuple]:
+    # worker: replay the seed, grow the wedge, return the faces it owns
+    engine = WedgeGrowthEngine(task["start"], task["stop"], task["margin"], planigon_types=(task["planigon"],),
+                               scale=task["scale"], max_faces=sys.maxsize, max_radius=task["max_radius"])
+    engine.center = np.array(task["center"])
+    for ring, edgeIdx, orientation in task["seed"]:
+        engine._commit(np.array(ring), task["planigon"], edgeIdx, orientation)
+    seedCount = len(task["seed"])
+    stats = engine.run()
+    cx, cy = task["center"]
+    start, stop = task["start"], task["stop"]
+    owned = []
+    for face in list(engine.diagram.faces.values())[seedCount:]:
+        ring = [he.origin.pos for he in iterate(face.edge)]
+        centroid = (sum(p[0] for p in ring) / len(ring) - cx, sum(p[1] for p in ring) / len(ring) - cy)
+        if _wedgeDistance(centroid, start, stop) == 0.0:
+            owned.append(face)
+    # vertices another wedge or the seed can share: near a wedge edge or inside the seed
+    near = task["near"]
+    seedRadius = task["seed_radius"]
+
+    def seam(p):
+        rel = (p[0] - cx, p[1] - cy)
+        return math.hypot(*rel) <= seedRadius or min(_rayDistance(rel, start), _rayDistance(rel, stop)) <= near
+
+    arrays = _faceArrays(engine.diagram, owned, seam)
+    return arrays, (stats.attempts, stats.rejected, stats.dead_edges)
+
+def mergeFaceArrays(parts: list[dict], cell_size: float, snap_eps: float) -> ArrayDiagram:
+    # one ArrayDiagram from _faceArrays parts: seam vertices closer than snap_eps become
+    # one vertex, half-edges a -> b and b -> a become twins
+    index = VertexIndex(cell_size)
+    positions = []  # blocks in vertex id order
+    origins = []
+    count = 0
+    for part in parts:
+        points, seam = part["positions"], part["seam"]
+        slots = np.full(len(points), -1, dtype=np.int64)
+        if seam.any():
+            slots[seam] = index.find_near_slots(points[seam], snap_eps)
+        known = slots >= 0
+        ids = np.empty(len(points), dtype=np.int64)
+        ids[known] = [index.items[slot] for slot in slots[known].tolist()]
+        fresh = ~known
+        ids[fresh] = np.arange(count, count + int(fresh.sum()))
+        count += int(fresh.sum())
+        positions.append(points[fresh])
+        index.add_many(ids[fresh & seam].tolist(), points[fresh & seam])
+        corners = part["corners"]
+        origins.append(ids[corners[np.arange(corners.shape[1]) < part["sizes"][:, None]]])
+
+    origin = np.concatenate(origins) if origins else np.zeros(0, dtype=np.int64)
+    sizes = np.concatenate([part["sizes"] for part in parts]).astype(np.int64)
+    types = np.concatenate([part["types"] for part in parts])
+    edgeIdxs = np.concatenate([part["edge_idxs"] for part in parts])
+    F, E, V = len(sizes), len(origin), count
+    face_edge = np.cumsum(sizes) - sizes
+    face_of = np.repeat(np.arange(F), sizes)
+    edges = np.arange(E)
+    corner = edges - face_edge[face_of]
+    nxt = edges + 1 - (corner + 1 == sizes[face_of]) * sizes[face_of]
+    prv = edges - 1 + (corner == 0) * sizes[face_of]
+    # the twin of a -> b is the half-edge b -> a
+    keys = origin * V + origin[nxt]
+    order = np.argsort(keys)
+    reverse = origin[nxt] * V + origin
+    at = np.minimum(np.searchsorted(keys, reverse, sorter=order), max(E - 1, 0))
+    twin = np.where(keys[order[at]] == reverse, order[at], -1) if E else edges
+    outgoing = np.full(V, -1, dtype=np.int32)
+    outgoing[origin] = edges
+    cat = getCatalogue()
+    units = cat.angleUnits[types[face_of], (edgeIdxs[face_of] + corner) % cat.sizes[types[face_of]]]
+    columns = {
+        "positions": np.concatenate(positions) if positions else np.zeros((0, 2)),
+        "vertex_outgoing": outgoing,
+        "vertex_angle": np.bincount(origin, units, minlength=V).astype(np.int32),
+        "origin": origin.astype(np.int32),
+        "twin": twin.astype(np.int32),
+        "next": nxt.astype(np.int32),
+        "prev": prv.astype(np.int32),
+        "face_of": face_of.astype(np.int32),
+        "face_edge": face_edge.astype(np.int32),
+        "face_type": types.astype(np.int32),
+        "face_edge_idx": edgeIdxs.astype(np.int32),
+    }
+    return ArrayDiagram.from_columns(columns, cell_size=cell_size)
+
+def radiusForFaces(planigonIdx: int, faces: int, scale: float = 1.0) -> float:
+    # max_radius of a disk holding about this many faces of the planigon
+    cat = getCatalogue()
+    n = cat.sizes[planigonIdx]
+    ring = cat.rings[planigonIdx, 0, :n] * scale * cat.lengths[planigonIdx, 0]
+    x, y = ring[:, 0], ring[:, 1]
+    area = 0.5 * abs(float(np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y)))
+    return math.sqrt(faces * area / math.pi)
+
+def growParallel(planigonIdx: int = 0, max_radius: float = 10.0, workers: Optional[int] = None,
+                 scale: float = 1.0) -> tuple[ArrayDiagram, GrowthStats]:
+    # the faces a serial GrowthEngine(planigon_types=(planigonIdx,), max_radius=max_radius)
+    # run grows, with one wedge per worker process (os.cpu_count() by default)
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    cat = getCatalogue()
+    extent = scale * float(np.nanmax(cat.lengths[planigonIdx]))
+    margin = WEDGE_MARGIN * extent
+    # the seed patch reaches past the margin, so every wedge starts from a full ring of it
+    seedRadius = min(2 * margin, max_radius)
+    seed = GrowthEngine(planigon_types=(planigonIdx,), scale=scale, max_faces=sys.maxsize, max_radius=seedRadius)
+    seed.run()
+    diagram = seed.diagram
+    faces = list(diagram.faces.values())
+    center = tuple(seed.center.tolist())
+    stats = GrowthStats(faces=len(faces), attempts=seed.stats.attempts, rejected=seed.stats.rejected,
+                        dead_edges=seed.stats.dead_edges)
+    parts = [_faceArrays(diagram, faces, lambda p: True)]
+    if max_radius > seedRadius:
+        replay = [([he.origin.pos for he in iterate(face.edge)], seed.layout[face.id][1], seed.orientation[face.id])
+                  for face in faces]
+        points = np.array([v.pos for v in diagram.vertices.values()])
+        reach = float(np.hypot(*(points - seed.center).T).max()) + diagram.snap_tolerance()
+        width = 2 * math.pi / workers
+        tasks = [{"planigon": planigonIdx, "scale": scale, "max_radius": max_radius, "center": center,
+                  "seed": replay, "seed_radius": reach, "margin": margin, "near": extent,
+                  "start": WEDGE_OFFSET + k * width, "stop": WEDGE_OFFSET + (k + 1) * width}
+                 for k in range(workers)]
+        if workers == 1:
+            results = [_growWedge(tasks[0])]
+        else:
+            with ProcessPoolExecutor(workers) as pool:
+                results = list(pool.map(_growWedge, tasks))
+        for arrays, (attempts, rejected, dead) in results:
+            parts.append(arrays)
+            stats.faces += len(arrays["sizes"])
+            stats.attempts += attempts
+            stats.rejected += rejected
+            stats.dead_edges += dead
+    mesh = mergeFaceArrays(parts, diagram.vertex_index.cell_size, diagram.snap_tolerance())
+    stats.seconds = time.perf_counter() - start
+    return mesh, stats
@@ -0,0 +1,93 @@
+import functools
+import time
+import numpy as np
+
+## --- Hot-path instrumentation --- ##
+# Named timers and counters, switched off by default. Functions are wrapped once at
+# import with @timed(name); while disabled the wrapper checks one module flag and
+# calls straight through. Blocks that aren't functions use `with section(name)`.
+# Every timer keeps its last RING_SIZE latencies in a ring buffer, so percentiles
+# describe what the editor is doing now rather than averaging the whole session.
+
+RING_SIZE = 512
+
+class LatencyRing:
+    __slots__ = ("samples", "count")
+
+    def __init__(self, size: int = RING_SIZE):
+        self.samples = np.zeros(size)  # seconds
+        self.count = 0  # samples ever recorded, the next one goes to count % size
+
+    def add(self, seconds: float):
+        self.samples[self.count % len(self.samples)] = seconds
+        self.count += 1
+
+    def recent(self) -> np.ndarray:
+        return self.samples[:min(self.count, len(self.samples))]
+
+    def last(self) -> float:
+        return float(self.samples[(self.count - 1) % len(self.samples)]) if self.count else 0.0
+
+_enabled = False
+timers = {}  # name -> LatencyRing
+counters = {}  # name -> int
+
+def enable(on: bool = True):
+    global _enabled
+    _enabled = on
+
+def isEnabled() -> bool:
+    return _enabled
+
+def reset():
+    timers.clear()
+    counters.clear()
+
+def record(name: str, seconds: float):
+    ring = timers.get(name)
+    if ring is None:
+        ring = timers[name] = LatencyRing()
+    ring.add(seconds)
+
+def count(name: str, n: int = 1):
+    if _enabled:
+        counters[name] = counters.get(name, 0) + n
+
+def timed(name: str):
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+class section:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter() if _enabled else None
+        return self
+
+    def __exit__(self, *exc):
+        if self.start is not None:
+            record(self.name, time.perf_counter() - self.start)
+        return False
+
+def snapshot() -> dict[str, dict]:
+    # per timer: calls ever recorded, and last / p50 / p99 of the recent ones in ms
+    result = {}
+    for name, ring in sorted(timers.items()):
+        recent = ring.recent() * 1e3
+        p50, p99 = np.percentile(recent, (50, 99)).tolist()
+        result[name] = {"count": ring.count, "last_ms": ring.last() * 1e3, "p50_ms": p50, "p99_ms": p99}
+    return result
@@ -0,0 +1,346 @@
+import numpy as np
+from typing import Optional
+from include.growth import GrowthEngine
+from include.meshArrays import ArrayDiagram
+from include.planigonData import Diagram, VertexIndex, fitVertexIndex, getCatalogue, iterate, pointInRings
+
+## --- Periodic tilings --- ##
+# Every tiling the catalogue grows is periodic: two lattice vectors a, b translate it
+# onto itself. PeriodicTiling keeps one period of it, the motif faces whose centroid
+# lies in the cell spanned by a and b, with their half-edge structure expressed as
+# (cell offset, motif row) pairs. Face (i, j, f) is motif face f moved by i*a + j*b,
+# vertex (i, j, v) likewise, so faces, vertices and neighbours anywhere in the plane
+# come from index arithmetic and memory does not depend on how much of it is used.
+#
+# The lattice is detected from a finite patch (Diagram) or given: translations between
+# faces of the same planigon and orientation are tried shortest first, and one that
+# maps every face well inside the patch onto another face is a period. Motif rings
+# start at planigon vertex 0, so motif face f's half-edge k is planigon edge k.
+# region() instances any rectangle as an ArrayDiagram without growing it face by face.
+
+LATTICE_TOL = 1e-6  # relative to the shortest period
+PATCH_FACES = (256, 1024, 4096)  # patch sizes periodicTiling grows until a period fits
+
+def _canonicalRing(face) -> np.ndarray:
+    # the face's ring rotated to start at planigon vertex 0
+    ring = np.array([he.origin.pos for he in iterate(face.edge)], dtype=np.float64)
+    return np.roll(ring, face.edge_idx, axis=0)
+
+def _cross(a, b) -> float:
+    # z of the 2D cross product, np.cross on 2-vectors is deprecated
+    return float(a[0] * b[1] - a[1] * b[0])
+
+def _ringArea(ring: np.ndarray) -> float:
+    x, y = ring[:, 0], ring[:, 1]
+    return 0.5 * abs(float(np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y)))
+
+def detectLattice(diagram: Diagram) -> np.ndarray:
+    # (2, 2) rows a, b: the shortest two independent periods of the patch, cross(a, b) > 0
+    faces = list(diagram.faces.values())
+    if any(face.planigon_type is None for face in faces):
+        raise ValueError("periodic tilings need every face to be a catalogue planigon")
+    rings = [_canonicalRing(face) for face in faces]
+    centroids = np.array([ring.mean(axis=0) for ring in rings])
+    headings = np.array([(ring[1] - ring[0]) / np.hypot(*(ring[1] - ring[0])) for ring in rings])
+    types = np.array([face.planigon_type for face in faces])
+    extent = max(float(np.ptp(ring, axis=0).max()) for ring in rings)
+
+    # faces further than inner from the centre could map outside the patch
+    center = centroids.mean(axis=0)
+    radius = np.hypot(*(centroids - center).T)
+    open_faces = [i for i, face in enumerate(faces) if diagram.face_open_edges(face)]
+    inner = float(radius[open_faces].min()) - extent if open_faces else float(radius.max())
+    ref = int(np.argmin(radius))
+    index = VertexIndex(diagram.vertex_index.cell_size)
+    index.add_many(range(len(faces)), centroids)
+    eps = diagram.snap_tolerance()
+
+    same = (types == types[ref]) & (np.hypot(*(headings - headings[ref]).T) < LATTICE_TOL)
+    same[ref] = False
+    candidates = centroids[same] - centroids[ref]
+    candidates = candidates[np.argsort(np.hypot(*candidates.T), kind="stable")]
+    periods = []
+    for shift in candidates:
+        length = float(np.hypot(*shift))
+        if periods and abs(_cross(periods[0], shift)) <= LATTICE_TOL * length * np.hypot(*periods[0]):
+            continue
+        deep = np.nonzero(radius + length < inner)[0]
+        if len(deep) == 0:
+            break
+        slots = index.find_near_slots(centroids[deep] + shift, eps)
+        if np.any(slots < 0):
+            continue
+        hits = np.array(index.items)[slots]
+        if np.all(types[hits] == types[deep]) and np.all(np.hypot(*(headings[hits] - headings[deep]).T) < LATTICE_TOL):
+            periods.append(shift)
+            if len(periods) == 2:
+                break
+    if len(periods) < 2:
+        raise ValueError("no two independent periods found, the patch is too small or not periodic")
+    a, b = periods
+    return np.array([a, b if _cross(a, b) > 0 else -b])
+
+class PeriodicTiling:
+    # motif arrays, padded to maxN corners by repeating the last one:
+    #   lattice      (2, 2)           rows a, b
+    #   origin       (2,)             position of cell (0, 0)
+    #   types, sizes (M,)             planigon and corner count per motif face
+    #   rings        (M, maxN, 2)     corners relative to the cell origin
+    #   corner_vertex, corner_cell    motif vertex at each corner, and the cell it is in
+    #   twin_face, twin_edge, twin_cell   the face across each edge, its edge, and its cell
+    #   vertex_positions (V, 2)       motif vertices relative to the cell origin
+    # cells are relative to the face they are read from
+    def __init__(self, lattice, origin, types, rings, sizes, corner_vertex, corner_cell,
+                 twin_face, twin_edge, twin_cell, vertex_positions):
+        self.lattice = np.asarray(lattice, dtype=np.float64)
+        self.origin = np.asarray(origin, dtype=np.float64)
+        self.types = types
+        self.rings = rings
+        self.sizes = sizes
+        self.corner_vertex = corner_vertex
+        self.corner_cell = corner_cell
+        self.twin_face = twin_face
+        self.twin_edge = twin_edge
+        self.twin_cell = twin_cell
+        self.vertex_positions = vertex_positions
+        self._inverse = np.linalg.inv(self.lattice)
+        self.boxes = np.concatenate((rings.min(axis=1), rings.max(axis=1)), axis=1)  # (M, 4) relative
+        # a Diagram holding these faces would size its vertex cells like this
+        index = VertexIndex()
+        fitVertexIndex(index, rings[0, :sizes[0]], int(types[0]))
+        self.cell_size = index.cell_size
+        # every face that can cover a point of cell (0, 0), relative to its origin, for face_at
+        corners = self.origin + np.array([[0, 0], [1, 0], [0, 1], [1, 1]]) @ self.lattice
+        margin = LATTICE_TOL * float(np.abs(self.lattice).max())
+        lo, hi = corners.min(axis=0) - margin, corners.max(axis=0) + margin
+        self._around = self.faces_in_rect(lo[0], lo[1], hi[0], hi[1])
+        self._around_rings = self.face_rings(self._around) - self.origin
+
+    @classmethod
+    def from_diagram(cls, diagram: Diagram, lattice=None) -> 'PeriodicTiling':
+        # the period of a grown patch around its most central face; lattice rows a, b
+        # skip detection but must still be periods of the patch
+        lattice = detectLattice(diagram) if lattice is None else np.asarray(lattice, dtype=np.float64)
+        if _cross(lattice[0], lattice[1]) < 0:
+            lattice = lattice[::-1].copy()
+        inverse = np.linalg.inv(lattice)
+        faces = list(diagram.faces.values())
+        rings = [_canonicalRing(face) for face in faces]
+        centroids = np.array([ring.mean(axis=0) for ring in rings])
+        origin = centroids[np.argmin(np.hypot(*(centroids - centroids.mean(axis=0)).T))]
+
+        def cellOf(points):
+            return np.floor((np.asarray(points) - origin) @ inverse + LATTICE_TOL).astype(np.int64)
+
+        cells = cellOf(centroids)
+        motif = np.nonzero(~cells.any(axis=1))[0]
+        cellArea = _cross(lattice[0], lattice[1])
+        if abs(sum(_ringArea(rings[i]) for i in motif) - cellArea) > LATTICE_TOL * cellArea * len(motif):
+            raise ValueError("the motif faces do not fill one lattice cell, the lattice is not a period of the patch")
+        index = VertexIndex(diagram.vertex_index.cell_size)
+        index.add_many(range(len(motif)), centroids[motif] - origin)
+        eps = diagram.snap_tolerance()
+
+        M = len(motif)
+        maxN = max(len(rings[i]) for i in motif)
+        shape = (M, maxN)
+        motifRings = np.zeros(shape + (2,))
+        corner_vertex = np.zeros(shape, dtype=np.int32)
+        corner_cell = np.zeros(shape + (2,), dtype=np.int32)
+        twin_face = np.zeros(shape, dtype=np.int32)
+        twin_edge = np.zeros(shape, dtype=np.int32)
+        twin_cell = np.zeros(shape + (2,), dtype=np.int32)
+        vertices = VertexIndex(diagram.vertex_index.cell_size)
+        for f, i in enumerate(motif):
+            face = faces[i]
+            ring = rings[i] - origin
+            n = len(ring)
+            motifRings[f, :n] = ring
+            motifRings[f, n:] = ring[-1]
+            # corners: reduced into cell (0, 0) and deduplicated
+            vcells = cellOf(rings[i])
+            reduced = ring - vcells @ lattice
+            for k in range(n):
+                # slots double as vertex ids, one face can meet the same motif vertex twice
+                slot = int(vertices.find_near_slots(reduced[k:k + 1], eps)[0])
+                corner_vertex[f, k] = slot if slot >= 0 else vertices.add(len(vertices), reduced[k])
+            corner_cell[f, :n] = vcells
+            corner_vertex[f, n:] = corner_vertex[f, n - 1]
+            corner_cell[f, n:] = corner_cell[f, n - 1]
+            # edges: the twin's face, reduced the same way, and its planigon edge
+            for k, he in enumerate(iterate(face.edge)):
+                edge = (face.edge_idx + k) % n
+                if he.twin is None:
+                    raise ValueError("the patch is too small to surround one lattice cell")
+                other = he.twin.face
+                otherRing = _canonicalRing(other)
+                ocell = cellOf(otherRing.mean(axis=0)[None])[0]
+                slot = index.find_near_slots((otherRing.mean(axis=0) - origin - ocell @ lattice)[None], eps)[0]
+                if slot < 0:
+                    raise ValueError("a face next to the motif is not a translate of a motif face")
+                twin_face[f, edge] = index.items[slot]
+                twin_edge[f, edge] = (other.edge_idx + iterate(other.edge).index(he.twin)) % len(otherRing)
+                twin_cell[f, edge] = ocell
+            twin_face[f, n:], twin_edge[f, n:], twin_cell[f, n:] = -1, -1, 0
+        vertex_positions = vertices.points[:len(vertices)].copy()
+        types = np.array([faces[i].planigon_type for i in motif], dtype=np.int32)
+        sizes = np.array([len(rings[i]) for i in motif], dtype=np.int32)
+        return cls(lattice, origin, types, motifRings, sizes, corner_vertex, corner_cell,
+                   twin_face, twin_edge, twin_cell, vertex_positions)
+
+    # -- lattice -- #
+    @property
+    def num_faces(self) -> int:
+        # faces per cell
+        return len(self.types)
+
+    @property
+    def cell_area(self) -> float:
+        return _cross(self.lattice[0], self.lattice[1])
+
+    def cell_of(self, points) -> np.ndarray:
+        # (K, 2) cell holding each point
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        return np.floor((points - self.origin) @ self._inverse + LATTICE_TOL).astype(np.int64)
+
+    def cell_origin(self, cells) -> np.ndarray:
+        return self.origin + np.asarray(cells).reshape(-1, 2) @ self.lattice
+
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.types, self.rings, self.sizes, self.corner_vertex, self.corner_cell,
+                                      self.twin_face, self.twin_edge, self.twin_cell, self.vertex_positions))
+
+    # -- faces -- #
+    def count_in_rect(self, xmin, ymin, xmax, ymax) -> float:
+        # about how many faces overlap the rect, without listing them
+        return (xmax - xmin) * (ymax - ymin) / self.cell_area * self.num_faces
+
+    def faces_in_rect(self, xmin, ymin, xmax, ymax) -> np.ndarray:
+        # (K, 3) face keys (i, j, f) whose boxes overlap the rect
+        lo, hi = self.boxes[:, :2].min(axis=0), self.boxes[:, 2:].max(axis=0)
+        # cell origins that could put a face box over the rect, in lattice coordinates
+        corners = np.array([[xmin, ymin], [xmax, ymin], [xmin, ymax], [xmax, ymax]]) - self.origin
+        corners = np.concatenate([corners - [hi[0], hi[1]], corners - [lo[0], lo[1]],
+                                  corners - [hi[0], lo[1]], corners - [lo[0], hi[1]]]) @ self._inverse
+        (imin, jmin), (imax, jmax) = np.floor(corners.min(axis=0)), np.ceil(corners.max(axis=0))
+        i, j = np.meshgrid(np.arange(imin, imax + 1, dtype=np.int64), np.arange(jmin, jmax + 1, dtype=np.int64))
+        cells = np.stack((i.ravel(), j.ravel()), axis=1)
+        offsets = self.cell_origin(cells)
+        boxes = self.boxes[None, :, :] + np.tile(offsets, 2)[:, None, :]
+        hit = (boxes[..., 0] <= xmax) & (boxes[..., 2] >= xmin) & (boxes[..., 1] <= ymax) & (boxes[..., 3] >= ymin)
+        c, f = np.nonzero(hit)
+        return np.column_stack((cells[c], f))
+
+    def face_rings(self, keys) -> np.ndarray:
+        # (K, maxN, 2) rings of face keys, padded by repeating the last corner
+        keys = np.asarray(keys, dtype=np.int64).reshape(-1, 3)
+        return self.rings[keys[:, 2]] + self.cell_origin(keys[:, :2])[:, None, :]
+
+    def face_at(self, pos) -> Optional[tuple[int, int, int]]:
+        cell = self.cell_of(pos)[0]
+        inside = np.nonzero(pointInRings(np.asarray(pos) - self.cell_origin(cell)[0], self._around_rings))[0]
+        if len(inside) == 0:
+            return None
+        i, j, f = self._around[inside[0]].tolist()
+        return (i + int(cell[0]), j + int(cell[1]), f)
+
+    def neighbors(self, key) -> list[tuple[int, int, int]]:
+        # the face across each edge, in planigon edge order
+        i, j, f = key
+        n = self.sizes[f]
+        cells = self.twin_cell[f, :n] + (i, j)
+        return [(ci, cj, g) for (ci, cj), g in zip(cells.tolist(), self.twin_face[f, :n].tolist())]
+
+    # -- vertices -- #
+    def face_vertices(self, key) -> list[tuple[int, int, int]]:
+        # vertex keys (i, j, v) of the face's corners, in planigon vertex order
+        i, j, f = key
+        n = self.sizes[f]
+        cells = self.corner_cell[f, :n] + (i, j)
+        return [(ci, cj, v) for (ci, cj), v in zip(cells.tolist(), self.corner_vertex[f, :n].tolist())]
+
+    def vertex_position(self, key) -> tuple[float, float]:
+        i, j, v = key
+        return tuple((self.vertex_positions[v] + self.cell_origin((i, j))[0]).tolist())
+
+    def vertex_faces(self, key) -> list[tuple[int, int, int, int]]:
+        # (i, j, f, corner) of every face corner at the vertex
+        i, j, v = key
+        f, k = np.nonzero(self.corner_vertex == v)
+        # padding repeats a face's last corner, count each corner once
+        real = k < self.sizes[f]
+        f, k = f[real], k[real]
+        cells = (i, j) - self.corner_cell[f, k]
+        return [(ci, cj, g, c) for (ci, cj), g, c in zip(cells.tolist(), f.tolist(), k.tolist())]
+
+    # -- instancing -- #
+    def region(self, xmin, ymin, xmax, ymax) -> ArrayDiagram:
+        # the faces overlapping the rect as an ArrayDiagram, built column by column;
+        # vertices shared between faces are shared rows and edges between them twins
+        keys = self.faces_in_rect(xmin, ymin, xmax, ymax)
+        F = len(keys)
+        f = keys[:, 2]
+        sizes = self.sizes[f].astype(np.int64)
+        face_edge = np.cumsum(sizes) - sizes
+        E = int(sizes.sum())
+        face_of = np.repeat(np.arange(F), sizes)
+        edges = np.arange(E)
+        corner = edges - face_edge[face_of]
+        slot = f[face_of] * self.rings.shape[1] + corner  # into the flattened corner arrays
+        # cells in play numbered row by row, with a margin wide enough that a corner's or
+        # twin's cell offset never leaves the grid: dense lookup tables, no sorting
+        M, V = self.num_faces, len(self.vertex_positions)
+        pad = int(max(np.abs(self.corner_cell).max(), np.abs(self.twin_cell).max()))
+        base = keys[:, :2].min(axis=0) - pad if F else np.zeros(2, dtype=np.int64)
+        span = keys[:, :2].max(axis=0) - base + pad + 1 if F else np.ones(2, dtype=np.int64)
+        cells = int(span[0] * span[1])
+        face_cell = ((keys[:, 0] - base[0]) * span[1] + keys[:, 1] - base[1])[face_of]
+
+        # vertices: every (cell, motif vertex) a corner lands on, numbered in key order
+        offsets = (self.corner_cell[..., 0] * span[1] + self.corner_cell[..., 1]).ravel()
+        vkeys = (face_cell + offsets[slot]) * V + self.corner_vertex.ravel()[slot]
+        used = np.zeros(cells * V, dtype=bool)
+        used[vkeys] = True
+        unique = np.nonzero(used)[0]
+        origin = (np.cumsum(used, dtype=np.int32) - 1)[vkeys]
+        ucell = np.stack(divmod(unique // V, span[1]), axis=1) + base
+        positions = self.vertex_positions[unique % V] + self.cell_origin(ucell)
+
+        # twins: the neighbour face's row, -1 outside the rect
+        row = np.full(cells * M, -1, dtype=np.int64)
+        row[((keys[:, 0] - base[0]) * span[1] + keys[:, 1] - base[1]) * M + f] = np.arange(F)
+        offsets = (self.twin_cell[..., 0] * span[1] + self.twin_cell[..., 1]).ravel()
+        trow = row[(face_cell + offsets[slot]) * M + self.twin_face.ravel()[slot]]
+        twin = np.where(trow >= 0, face_edge[trow] + self.twin_edge.ravel()[slot], -1)
+
+        last = corner + 1 == sizes[face_of]
+        first = corner == 0
+        outgoing = np.full(len(unique), -1, dtype=np.int32)
+        outgoing[origin] = edges
+        units = getCatalogue().angleUnits[self.types.repeat(self.rings.shape[1]), np.tile(np.arange(self.rings.shape[1]), M)]
+        columns = {
+            "positions": positions,
+            "vertex_outgoing": outgoing,
+            "vertex_angle": np.bincount(origin, units[slot], minlength=len(unique)).astype(np.int32),
+            "origin": origin.astype(np.int32),
+            "twin": twin.astype(np.int32),
+            "next": (edges + 1 - last * sizes[face_of]).astype(np.int32),
+            "prev": (edges - 1 + first * sizes[face_of]).astype(np.int32),
+            "face_of": face_of.astype(np.int32),
+            "face_edge": face_edge.astype(np.int32),
+            "face_type": self.types[f].astype(np.int32),
+            "face_edge_idx": np.zeros(F, dtype=np.int32),
+        }
+        return ArrayDiagram.from_columns(columns, cell_size=self.cell_size)
+
+def periodicTiling(planigonIdx: int, scale: float = 1.0) -> PeriodicTiling:
+    # grows ever larger patches of the planigon until one holds a full period
+    error = None
+    for faces in PATCH_FACES:
+        engine = GrowthEngine(planigon_types=(planigonIdx,), scale=scale, max_faces=faces)
+        engine.run()
+        try:
+            return PeriodicTiling.from_diagram(engine.diagram)
+        except ValueError as exc:
+            error = exc
+    raise ValueError(f"planigon {planigonIdx} gave no periodic tiling: {error}")
@@ -1,10 +1,15 @@
 from typing import Self
 from math import tan, pi, sqrt, cos, sin
 import numpy as np
-from shapely.geometry import Point, Polygon
 from dataclasses import dataclass
 from typing import Optional
 import math
+import os
+from collections import deque
+import logging
+from include import perfStats
+
+log = logging.getLogger(__name__)
 
 # side length functions
 def r(n): 
@@ -36,10 +41,15 @@ class planigon:
 
     def __init__(self, angles: list[float], lengths = [], lengthParms = []):
         self.angles = angles
-        if len(lengths) <= 0:
-            self.lengths = planigon_sides_from_vertex_config(lengthParms)
-        else:
-            self.lengths = lengths
+        self.lengthParms = lengthParms
+        self._lengths = lengths if len(lengths) > 0 else None
+
+    # derived lengths are only evaluated when first needed, not at import
+    @property
+    def lengths(self) -> list[float]:
+        if self._lengths is None:
+            self._lengths = planigon_sides_from_vertex_config(self.lengthParms)
+        return self._lengths
 
 ## --- Planigon layouts --- ##
 # List of planigon names
@@ -132,6 +142,66 @@ def getPositionOfNextCoord(hostEdge : tuple[tuple[float, float], tuple[float, fl
     newPos = hostEdge[1] + (newEdgeLength * edgeDirection)
     return newPos
 
+def ringsOverlap(ring, others, tol: float = 1e-9) -> np.ndarray:
+    # separating-axis test of one convex ring (n, 2) against convex rings (M, m, 2)
+    # padded by repeating their last vertex; True where the interiors intersect by
+    # more than tol, so faces that only share edges or corners do not count
+    ring = np.asarray(ring, dtype=np.float64)
+    others = np.asarray(others, dtype=np.float64).reshape(-1, *np.shape(others)[-2:])
+    ringEdges = np.roll(ring, -1, axis=0) - ring
+    otherEdges = np.roll(others, -1, axis=1) - others
+    normals = np.concatenate((np.broadcast_to(ringEdges, (len(others),) + ringEdges.shape), otherEdges), axis=1)
+    normals = np.stack((-normals[..., 1], normals[..., 0]), axis=-1)
+    norms = np.hypot(normals[..., 0], normals[..., 1])
+    degenerate = norms == 0
+    normals = normals / np.where(degenerate, 1.0, norms)[..., None]
+    projRing = np.einsum("kad,nd->kan", normals, ring)
+    projOther = np.einsum("kad,knd->kan", normals, others)
+    depth = np.minimum(projRing.max(axis=2), projOther.max(axis=2)) - np.maximum(projRing.min(axis=2), projOther.min(axis=2))
+    depth[degenerate] = np.inf
+    return np.all(depth > tol, axis=1)
+
+def pointsOnRingEdges(points, rings, tol: float = 1e-9) -> np.ndarray:
+    # True for every point lying inside an edge of one of the rings (M, m, 2), away from
+    # its endpoints; such a point would be a T-junction in the mesh
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    rings = np.asarray(rings, dtype=np.float64).reshape(-1, *np.shape(rings)[-2:])
+    starts = rings.reshape(-1, 2)
+    edges = (np.roll(rings, -1, axis=1) - rings).reshape(-1, 2)
+    lengths2 = np.einsum("ed,ed->e", edges, edges)
+    valid = lengths2 > 0
+    starts, edges, lengths2 = starts[valid], edges[valid], lengths2[valid]
+    rel = points[:, None, :] - starts[None, :, :]
+    t = np.einsum("ped,ed->pe", rel, edges) / lengths2
+    offset = rel - t[..., None] * edges
+    distance = np.hypot(offset[..., 0], offset[..., 1])
+    margin = tol / np.sqrt(lengths2)
+    return np.any((distance <= tol) & (t > margin) & (t < 1.0 - margin), axis=1)
+
+def pointInRings(point, rings) -> np.ndarray:
+    # even-odd test of one point against rings (M, m, 2) padded by repeating their last
+    # vertex (the padding edges have zero length and never cross)
+    x, y = point
+    rings = np.asarray(rings, dtype=np.float64).reshape(-1, *np.shape(rings)[-2:])
+    a = rings
+    b = np.roll(rings, -1, axis=1)
+    straddles = (a[..., 1] > y) != (b[..., 1] > y)
+    dy = np.where(straddles, b[..., 1] - a[..., 1], 1.0)
+    crossX = a[..., 0] + (y - a[..., 1]) * (b[..., 0] - a[..., 0]) / dy
+    return (np.count_nonzero(straddles & (x < crossX), axis=1) % 2) == 1
+
+def affineMatrix(transform) -> np.ndarray:
+    # (2, 3) matrix [[a, b, tx], [c, d, ty]] from a 2x3 or 3x3 affine transform; faces
+    # keep their clockwise winding only if it does not mirror
+    matrix = np.asarray(transform, dtype=np.float64)[:2]
+    if matrix.shape != (2, 3) or np.linalg.det(matrix[:, :2]) <= 0:
+        raise ValueError("expected a 2x3 or 3x3 affine transform that does not mirror or collapse the plane")
+    return matrix
+
+def applyAffine(points, matrix: Optional[np.ndarray]) -> np.ndarray:
+    points = np.asarray(points, dtype=np.float64)
+    return points if matrix is None else points @ matrix[:, :2].T + matrix[:, 2]
+
 ## --- Planigon components --- ##
 
 class Singleton(type):
@@ -163,12 +233,14 @@ class nodeTracker:
                 return self.nodeRefs.index(n)
         return -1
     
-@dataclass
+# mesh elements compare by identity, field-wise equality would recurse through the mesh
+@dataclass(eq=False)
 class Vertex:
     pos: tuple[float, float]
     outgoing: Optional['HalfEdge'] = None
+    id: int = -1  # stable id assigned by the owning Diagram
 
-@dataclass
+@dataclass(eq=False)
 class HalfEdge:
     origin: 'Vertex'
     twin: Optional['HalfEdge'] = None
@@ -181,78 +253,700 @@ def iterate(he: HalfEdge) -> list[HalfEdge]:
     results = []
     results.append(he)
     curr = he.next
-    while curr is not None and curr is not he:
+    while curr is not None and curr != he:
         results.append(curr)
         curr = curr.next
     return results
 
 
-@dataclass
+@dataclass(eq=False)
 class Face:
     edge: Optional['HalfEdge'] = None
     planigon_type: Optional[int] = None
+    edge_idx: int = 0  # planigon vertex at the origin of the face's first half-edge
+    id: int = -1  # stable id assigned by the owning Diagram
+    name: str = ""
+
 
 
+# cells are addressed by a single int64 key so lookups can be built with array ops
+_CELL_KEY_SHIFT = 1 << 32
+
+# default snap distance as a fraction of the vertex index cell size
+SNAP_CELL_FRACTION = 1e-3
 
 class VertexIndex:
-    def __init__(self, cell_size=1e-3):
+    # uniform grid hash over vertex positions
+    # positions, chain links and liveness are flat arrays indexed by slot, each grid cell
+    # only stores the slot at the head of its chain (cell key -> slot)
+    def __init__(self, cell_size=1e-3, capacity=64):
         self.cell_size = cell_size
-        self.grid = {}  # dict[(ix, iy)] -> list[Vertex]
+        self.items = []  # slot -> stored object (None once removed)
+        self.points = np.empty((capacity, 2), dtype=np.float64)
+        self.link = np.full(capacity, -1, dtype=np.int64)  # slot -> next slot in the same cell
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.heads = {}  # dict[cell key] -> first slot
+        self.count = 0
+
+    def __len__(self):
+        return self.count
 
     def _cell_coords(self, pos):
         return (math.floor(pos[0] / self.cell_size),
                 math.floor(pos[1] / self.cell_size))
 
-    def find_near(self, pos, eps):
+    def _cell_key(self, pos):
         ix, iy = self._cell_coords(pos)
-        for dx in (-1, 0, 1):
-            for dy in (-1, 0, 1):
-                for v in self.grid.get((ix+dx, iy+dy), []):
-                    if ((v.pos[0]-pos[0])**2 + (v.pos[1]-pos[1])**2) <= eps**2:
-                        return v
+        return ix * _CELL_KEY_SHIFT + iy
+
+    def _cell_keys(self, points):
+        cells = np.floor(points / self.cell_size).astype(np.int64)
+        return cells[:, 0] * _CELL_KEY_SHIFT + cells[:, 1]
+
+    def _reserve(self, extra):
+        needed = len(self.items) + extra
+        capacity = len(self.link)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        points = np.empty((capacity, 2), dtype=np.float64)
+        points[:len(self.items)] = self.points[:len(self.items)]
+        link = np.full(capacity, -1, dtype=np.int64)
+        link[:len(self.items)] = self.link[:len(self.items)]
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:len(self.items)] = self.alive[:len(self.items)]
+        self.points, self.link, self.alive = points, link, alive
+
+    def _link_slots(self, slots, keys):
+        heads = self.heads
+        link = self.link
+        for slot, key in zip(slots, keys):
+            link[slot] = heads.get(key, -1)
+            heads[key] = slot
+
+    def add(self, v, pos=None) -> int:
+        pos = v.pos if pos is None else pos
+        self._reserve(1)
+        slot = len(self.items)
+        self.items.append(v)
+        self.points[slot] = pos
+        self.alive[slot] = True
+        key = self._cell_key(pos)
+        self.link[slot] = self.heads.get(key, -1)
+        self.heads[key] = slot
+        self.count += 1
+        return slot
+
+    def add_many(self, items, points=None) -> np.ndarray:
+        items = list(items)
+        if points is None:
+            points = [v.pos for v in items]
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        self._reserve(len(items))
+        start = len(self.items)
+        slots = np.arange(start, start + len(items))
+        self.items.extend(items)
+        self.points[slots] = points
+        self.alive[slots] = True
+        self._link_slots(slots.tolist(), self._cell_keys(points).tolist())
+        self.count += len(items)
+        return slots
+
+    def remove(self, v, pos=None) -> bool:
+        # unlinks the stored object from its cell chain, its slot is not reused
+        pos = v.pos if pos is None else pos
+        slot = self.heads.get(self._cell_key(pos), -1)
+        while slot >= 0:
+            if self.items[slot] is v:
+                self.remove_slot(slot)
+                return True
+            slot = self.link[slot]
+        return False
+
+    def remove_slot(self, slot):
+        key = self._cell_key(self.points[slot])
+        prev, curr = -1, self.heads.get(key, -1)
+        while curr >= 0 and curr != slot:
+            prev, curr = curr, self.link[curr]
+        if curr < 0:
+            return
+        if prev < 0:
+            if self.link[slot] >= 0:
+                self.heads[key] = self.link[slot]
+            else:
+                del self.heads[key]
+        else:
+            self.link[prev] = self.link[slot]
+        self.link[slot] = -1
+        self.alive[slot] = False
+        self.items[slot] = None
+        self.count -= 1
+
+    def resize(self, cell_size):
+        # rehash every live slot into cells of the new size, slots stay the same
+        self.cell_size = cell_size
+        self.heads = {}
+        slots = np.nonzero(self.alive[:len(self.items)])[0]
+        self.link[:len(self.items)] = -1
+        self._link_slots(slots.tolist(), self._cell_keys(self.points[slots]).tolist())
+
+    def find_near(self, pos, eps):
+        x, y = pos[0], pos[1]
+        eps2 = eps * eps
+        ix0, iy0 = self._cell_coords((x - eps, y - eps))
+        ix1, iy1 = self._cell_coords((x + eps, y + eps))
+        for ix in range(ix0, ix1 + 1):
+            for iy in range(iy0, iy1 + 1):
+                slot = self.heads.get(ix * _CELL_KEY_SHIFT + iy, -1)
+                while slot >= 0:
+                    px, py = self.points[slot]
+                    if (px - x) ** 2 + (py - y) ** 2 <= eps2:
+                        return self.items[slot]
+                    slot = self.link[slot]
         return None
 
-    def add(self, v: Vertex):
-        cell = self._cell_coords(v.pos)
-        self.grid.setdefault(cell, []).append(v)
+    @perfStats.timed("vertex_index.find_near_slots")
+    def find_near_slots(self, points, eps) -> np.ndarray:
+        # slot of the nearest stored point within eps for every query point, -1 if none
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        result = np.full(len(points), -1, dtype=np.int64)
+        if self.count == 0 or len(points) == 0:
+            return result
+        best = np.full(len(points), np.inf)
+        eps2 = eps * eps
+        lo = np.floor((points - eps) / self.cell_size).astype(np.int64)
+        hi = np.floor((points + eps) / self.cell_size).astype(np.int64)
+        span = (hi - lo).max(axis=0)
+        heads = self.heads
+        for dx in range(span[0] + 1):
+            for dy in range(span[1] + 1):
+                cx, cy = lo[:, 0] + dx, lo[:, 1] + dy
+                query = np.nonzero((cx <= hi[:, 0]) & (cy <= hi[:, 1]))[0]
+                keys = (cx[query] * _CELL_KEY_SHIFT + cy[query]).tolist()
+                slot = np.fromiter((heads.get(k, -1) for k in keys), dtype=np.int64, count=len(keys))
+                # walk all chains in lockstep
+                while len(query):
+                    found = slot >= 0
+                    query, slot = query[found], slot[found]
+                    d2 = ((self.points[slot] - points[query]) ** 2).sum(axis=1)
+                    hit = (d2 <= eps2) & (d2 < best[query])
+                    best[query[hit]] = d2[hit]
+                    result[query[hit]] = slot[hit]
+                    slot = self.link[slot]
+        return result
+
+    def find_near_many(self, points, eps) -> list:
+        return [self.items[slot] if slot >= 0 else None for slot in self.find_near_slots(points, eps).tolist()]
+
+    def rect_slots(self, xmin, ymin, xmax, ymax) -> np.ndarray:
+        ix0, iy0 = self._cell_coords((xmin, ymin))
+        ix1, iy1 = self._cell_coords((xmax, ymax))
+        size = len(self.items)
+        if (ix1 - ix0 + 1) * (iy1 - iy0 + 1) < self.count:
+            # few cells, walk all their chains in lockstep
+            ix, iy = np.meshgrid(np.arange(ix0, ix1 + 1), np.arange(iy0, iy1 + 1), indexing="ij")
+            keys = (ix * _CELL_KEY_SHIFT + iy).ravel().tolist()
+            heads = self.heads
+            slot = np.fromiter((heads.get(k, -1) for k in keys), dtype=np.int64, count=len(keys))
+            found = []
+            slot = slot[slot >= 0]
+            while len(slot):
+                found.append(slot)
+                slot = self.link[slot]
+                slot = slot[slot >= 0]
+            candidates = np.concatenate(found) if found else np.zeros(0, dtype=np.int64)
+        else:
+            # large window, one pass over the position array is cheaper
+            candidates = np.nonzero(self.alive[:size])[0]
+        p = self.points[candidates]
+        inside = (p[:, 0] >= xmin) & (p[:, 0] <= xmax) & (p[:, 1] >= ymin) & (p[:, 1] <= ymax)
+        return candidates[inside]
+
+    def query_rect(self, xmin, ymin, xmax, ymax) -> list:
+        return [self.items[slot] for slot in self.rect_slots(xmin, ymin, xmax, ymax).tolist()]
+
+    def query_radius(self, center, radius) -> list:
+        cx, cy = center
+        slots = self.rect_slots(cx - radius, cy - radius, cx + radius, cy + radius)
+        d2 = ((self.points[slots] - (cx, cy)) ** 2).sum(axis=1)
+        return [self.items[slot] for slot in slots[d2 <= radius * radius].tolist()]
+
+class FaceIndex:
+    # uniform grid over face bounding boxes; a face is listed in every cell its box
+    # touches, and rings are kept in one padded (capacity, m, 2) array so the faces
+    # near a query are tested in a single batch
+    def __init__(self, cell_size=None, capacity=64, max_vertices=6):
+        self.cell_size = cell_size  # None until the first face picks one
+        self.items = [None] * capacity
+        self.rings = np.zeros((capacity, max_vertices, 2), dtype=np.float64)
+        self.boxes = np.zeros((capacity, 4), dtype=np.float64)  # xmin, ymin, xmax, ymax
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.cells = {}  # cell key -> slots whose box touches the cell
+        self.slots = {}  # item -> slot
+        self.free = []  # released slots, reused before the arrays grow
+        self.size = 0  # slots handed out so far
+        self.count = 0
+        self.bounds = None  # (xmin, ymin, xmax, ymax) of every face added, never shrinks
+
+    def __len__(self):
+        return self.count
+
+    def _cell_keys(self, box) -> list[int]:
+        xmin, ymin, xmax, ymax = box
+        c = self.cell_size
+        ix0, iy0 = math.floor(xmin / c), math.floor(ymin / c)
+        ix1, iy1 = math.floor(xmax / c), math.floor(ymax / c)
+        return [ix * _CELL_KEY_SHIFT + iy for ix in range(ix0, ix1 + 1) for iy in range(iy0, iy1 + 1)]
+
+    def _reserve(self, size: int, vertices: int):
+        capacity = len(self.alive)
+        if size > capacity:
+            while capacity < size:
+                capacity *= 2
+            grow = capacity - len(self.alive)
+            self.items.extend([None] * grow)
+            self.rings = np.concatenate((self.rings, np.zeros((grow,) + self.rings.shape[1:])))
+            self.boxes = np.concatenate((self.boxes, np.zeros((grow, 4))))
+            self.alive = np.concatenate((self.alive, np.zeros(grow, dtype=bool)))
+        m = self.rings.shape[1]
+        if vertices > m:
+            # pad every stored ring by repeating its last vertex
+            pad = np.repeat(self.rings[:, -1:], vertices - m, axis=1)
+            self.rings = np.concatenate((self.rings, pad), axis=1)
 
-edge_map = {}  # dict[(vx_id, vy_id)] -> HalfEdge
+    def add(self, item, ring) -> int:
+        ring = np.asarray(ring, dtype=np.float64).reshape(-1, 2)
+        box = (*ring.min(axis=0).tolist(), *ring.max(axis=0).tolist())
+        extent = max(box[2] - box[0], box[3] - box[1])
+        if self.cell_size is None:
+            self.cell_size = extent if extent > 0 else 1.0
+        elif extent > 4.0 * self.cell_size:
+            self.resize(extent)
+        self._reserve(self.size + 1, len(ring))
+        slot = self.free.pop() if self.free else self.size
+        if slot == self.size:
+            self.size += 1
+        self.rings[slot, :len(ring)] = ring
+        self.rings[slot, len(ring):] = ring[-1]
+        self.boxes[slot] = box
+        self.alive[slot] = True
+        self.items[slot] = item
+        b = self.bounds
+        self.bounds = box if b is None else (min(b[0], box[0]), min(b[1], box[1]), max(b[2], box[2]), max(b[3], box[3]))
+        self.slots[item] = slot
+        self.count += 1
+        for key in self._cell_keys(box):
+            self.cells.setdefault(key, []).append(slot)
+        return slot
+
+    def add_many(self, items, rings) -> np.ndarray:
+        # rings (K, m, 2), shorter rings padded by repeating their last vertex; slots
+        # are appended rather than taken from the free list
+        items = list(items)
+        if not items:
+            return np.zeros(0, dtype=np.int64)
+        rings = np.asarray(rings, dtype=np.float64).reshape(len(items), -1, 2)
+        boxes = np.concatenate((rings.min(axis=1), rings.max(axis=1)), axis=1)
+        extent = float(np.max(boxes[:, 2:] - boxes[:, :2]))
+        if self.cell_size is None:
+            self.cell_size = extent if extent > 0 else 1.0
+        elif extent > 4.0 * self.cell_size:
+            self.resize(extent)
+        self._reserve(self.size + len(items), rings.shape[1])
+        m = self.rings.shape[1]
+        if rings.shape[1] < m:
+            rings = np.concatenate((rings, np.repeat(rings[:, -1:], m - rings.shape[1], axis=1)), axis=1)
+        slots = np.arange(self.size, self.size + len(items))
+        self.size += len(items)
+        self.rings[slots] = rings
+        self.boxes[slots] = boxes
+        self.alive[slots] = True
+        self.items[slots[0]:slots[-1] + 1] = items
+        box = (*boxes[:, :2].min(axis=0).tolist(), *boxes[:, 2:].max(axis=0).tolist())
+        b = self.bounds
+        self.bounds = box if b is None else (min(b[0], box[0]), min(b[1], box[1]), max(b[2], box[2]), max(b[3], box[3]))
+        self.slots.update(zip(items, slots.tolist()))
+        self.count += len(items)
+        # every (cell, slot) pair, grouped by cell
+        low = np.floor(boxes[:, :2] / self.cell_size).astype(np.int64)
+        high = np.floor(boxes[:, 2:] / self.cell_size).astype(np.int64)
+        span = (high - low).max(axis=0)
+        keys, owners = [], []
+        for dx in range(int(span[0]) + 1):
+            for dy in range(int(span[1]) + 1):
+                inside = (low[:, 0] + dx <= high[:, 0]) & (low[:, 1] + dy <= high[:, 1])
+                keys.append((low[inside, 0] + dx) * _CELL_KEY_SHIFT + low[inside, 1] + dy)
+                owners.append(slots[inside])
+        keys, owners = np.concatenate(keys), np.concatenate(owners)
+        order = np.argsort(keys, kind="stable")
+        keys, owners = keys[order], owners[order]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        owners, bounds = owners.tolist(), starts.tolist() + [len(keys)]
+        cells = self.cells
+        for key, a, b in zip(keys[starts].tolist(), bounds, bounds[1:]):
+            cells.setdefault(key, []).extend(owners[a:b])
+        return slots
+
+    def remove(self, item):
+        slot = self.slots.pop(item)
+        for key in self._cell_keys(self.boxes[slot].tolist()):
+            chain = self.cells[key]
+            chain.remove(slot)
+            if not chain:
+                del self.cells[key]
+        self.alive[slot] = False
+        self.items[slot] = None
+        self.free.append(slot)
+        self.count -= 1
+
+    def resize(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}
+        for slot in np.nonzero(self.alive[:self.size])[0].tolist():
+            for key in self._cell_keys(self.boxes[slot].tolist()):
+                self.cells.setdefault(key, []).append(slot)
+
+    def rect_slots(self, xmin, ymin, xmax, ymax) -> np.ndarray:
+        # slots of faces whose bounding box meets the rectangle
+        if self.count == 0:
+            return np.zeros(0, dtype=np.int64)
+        c = self.cell_size
+        window = (math.floor(xmax / c) - math.floor(xmin / c) + 1) * (math.floor(ymax / c) - math.floor(ymin / c) + 1)
+        # walking chains costs a Python step per face, scanning a numpy step per face
+        if window * 32 < len(self.cells):
+            found = set()
+            cells = self.cells
+            for key in self._cell_keys((xmin, ymin, xmax, ymax)):
+                chain = cells.get(key)
+                if chain is not None:
+                    found.update(chain)
+            candidates = np.fromiter(found, dtype=np.int64, count=len(found))
+        else:
+            # large window, one pass over the box array is cheaper
+            candidates = np.nonzero(self.alive[:self.size])[0]
+        b = self.boxes[candidates]
+        inside = (b[:, 0] <= xmax) & (b[:, 2] >= xmin) & (b[:, 1] <= ymax) & (b[:, 3] >= ymin)
+        return candidates[inside]
+
+    def query_rect(self, xmin, ymin, xmax, ymax) -> list:
+        return [self.items[slot] for slot in self.rect_slots(xmin, ymin, xmax, ymax).tolist()]
+
+    def find_containing(self, pos):
+        # item whose face contains pos, or None
+        x, y = pos
+        slots = self.rect_slots(x, y, x, y)
+        if len(slots) == 0:
+            return None
+        inside = slots[pointInRings((x, y), self.rings[slots])]
+        return self.items[int(inside[0])] if len(inside) else None
+
+    def intersects(self, ring, tol: float = 1e-9) -> bool:
+        # True if ring overlaps an indexed face or meets one in a T-junction; faces that
+        # only share whole edges or corners with it do not count
+        ring = np.asarray(ring, dtype=np.float64).reshape(-1, 2)
+        (xmin, ymin), (xmax, ymax) = ring.min(axis=0), ring.max(axis=0)
+        slots = self.rect_slots(xmin - tol, ymin - tol, xmax + tol, ymax + tol)
+        if len(slots) == 0:
+            return False
+        others = self.rings[slots]
+        return bool(pointsOnRingEdges(ring, others, tol).any()
+                    or pointsOnRingEdges(others.reshape(-1, 2), ring, tol).any()
+                    or ringsOverlap(ring, others, tol).any())
+
+def fitVertexIndex(index: VertexIndex, ring: np.ndarray, planigon_type: Optional[int]):
+    # keep cells around half the shortest edge the tiling can have at this ring's
+    # scale, so a cell holds O(1) vertices whatever units the scene uses
+    sides = np.empty_like(ring)
+    sides[:-1] = ring[1:] - ring[:-1]
+    sides[-1] = ring[0] - ring[-1]
+    sideLengths = np.hypot(sides[:, 0], sides[:, 1])
+    if planigon_type is not None:
+        cat = getCatalogue()
+        target = 0.5 * sideLengths.sum() / cat.perimeters[planigon_type] * cat.minLength
+    else:
+        target = 0.5 * sideLengths.min()
+    if target > 0 and (len(index) == 0 or target < 0.5 * index.cell_size):
+        index.resize(target)
+
+## --- Integrity checks --- ##
+# meshProblems checks a mesh given as ArrayDiagram-style columns in a few whole-array
+# passes, whichever backend it came from. It maps each broken invariant to the rows
+# of the faces or vertices involved:
+#   twin         twins that don't point back or run the other way, repeated edges (faces)
+#   cycle        next / prev not inverse, leaving the face or not closing (faces)
+#   orientation  faces not wound clockwise like the catalogue rings, or flat (faces)
+#   outgoing     vertex_outgoing set to a half-edge leaving another vertex (vertices)
+#   orphan       vertices no half-edge starts at
+#   angle        stored angle sum differs from the corners there, is over a full turn,
+#                or a vertex with no open edge is short of one (vertices)
+#   duplicate    vertices within snap_eps of another vertex (vertices)
+# References that are out of range (or -2, "not a live element") count as broken.
+
+FACE_CHECKS = ("twin", "cycle", "orientation")
+VERTEX_CHECKS = ("outgoing", "orphan", "angle", "duplicate")
+
+def nearPairs(points: np.ndarray, eps: float) -> tuple[np.ndarray, np.ndarray]:
+    # (i, j) with i < j for every two points at most eps apart, bucketed on an eps grid
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if eps <= 0 or len(points) < 2:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    cells = np.floor(points / eps).astype(np.int64)
+    keys = cells[:, 0] * _CELL_KEY_SHIFT + cells[:, 1]
+    order = np.argsort(keys)
+    sortedKeys = keys[order]
+    rows = np.arange(len(points))
+    firsts, seconds = [], []
+    # half of the 3x3 neighbourhood finds each pair once; queries go in sorted order,
+    # which keeps searchsorted in cache
+    for dx, dy in ((0, 0), (0, 1), (1, -1), (1, 0), (1, 1)):
+        near = sortedKeys + (dx * _CELL_KEY_SHIFT + dy)
+        lo = np.searchsorted(sortedKeys, near, "left")
+        counts = np.searchsorted(sortedKeys, near, "right") - lo
+        first = np.repeat(rows, counts)
+        second = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(lo, counts)
+        keep = first < second if dx == dy == 0 else slice(None)
+        firsts.append(order[first[keep]])
+        seconds.append(order[second[keep]])
+    first, second = np.concatenate(firsts), np.concatenate(seconds)
+    close = np.hypot(*(points[first] - points[second]).T) <= eps
+    return np.minimum(first[close], second[close]), np.maximum(first[close], second[close])
+
+def meshProblems(columns: dict[str, np.ndarray], snap_eps: float) -> dict[str, np.ndarray]:
+    # invariant name -> sorted face or vertex rows breaking it, only for broken ones
+    positions = np.asarray(columns["positions"], dtype=np.float64).reshape(-1, 2)
+    origin, twin, nxt, prv, face_of, face_edge, face_type, face_edge_idx, outgoing, angles = (
+        np.asarray(columns[name], dtype=np.int64) for name in
+        ("origin", "twin", "next", "prev", "face_of", "face_edge", "face_type", "face_edge_idx",
+         "vertex_outgoing", "vertex_angle"))
+    V, E, F = len(positions), len(origin), len(face_edge)
+    problems = {}
+
+    def report(name, rows):
+        rows = np.unique(rows)
+        if len(rows):
+            problems[name] = rows
+
+    edges = np.arange(E)
+    vertices = np.arange(V)
+    # every reference clipped into range, rows whose references were not are broken
+    brokenRef = ((origin < 0) | (origin >= V) | (nxt < 0) | (nxt >= E) | (prv < 0) | (prv >= E)
+                 | (face_of < 0) | (face_of >= F) | (twin < -1) | (twin >= E))
+    org = np.clip(origin, 0, max(V - 1, 0))
+    nx, pv, tw = (np.clip(column, 0, max(E - 1, 0)) for column in (nxt, prv, twin))
+    fo = np.clip(face_of, 0, max(F - 1, 0))
+    fe = np.clip(face_edge, 0, max(E - 1, 0))
+    brokenFace = (face_edge < 0) | (face_edge >= E)
+    dest = org[nx] if E else org
+
+    # twins: symmetric, distinct, reversed; no directed edge twice
+    hasTwin = twin >= 0
+    badTwin = hasTwin & ((tw[tw] != edges) | (tw == edges) | (org[tw] != dest) | (dest[tw] != org))
+    keys = org * max(V, 1) + dest
+    order = np.argsort(keys, kind="stable")
+    sortedKeys = keys[order]
+    repeated = np.zeros(E, dtype=bool)
+    if E > 1:
+        same = sortedKeys[1:] == sortedKeys[:-1]
+        repeated[order[1:][same]] = True
+        repeated[order[:-1][same]] = True
+    report("twin", fo[brokenRef | badTwin | repeated])
+
+    # cycles: next and prev inverse within one face, closing after its half-edge count
+    badLink = brokenRef | (pv[nx] != edges) | (nx[pv] != edges) | (fo[nx] != fo)
+    sizes = np.bincount(fo[~brokenRef], minlength=F)
+    corner = np.full(E, -1, dtype=np.int64)  # position of each half-edge in its face's cycle
+    walking = ~brokenFace
+    steps = np.zeros(F, dtype=np.int64)
+    curr = fe.copy()
+    for k in range(int(sizes.max()) + 1 if F else 0):
+        rows = np.nonzero(walking)[0]
+        corner[curr[rows]] = k
+        curr[rows] = nx[curr[rows]]
+        closed = walking & (curr == fe)
+        steps[closed] = k + 1
+        walking &= ~closed
+    badFace = brokenFace | walking | (steps != sizes) | (fo[fe] != np.arange(F))
+    report("cycle", np.concatenate((fo[badLink], np.nonzero(badFace)[0])))
+
+    # winding: shoelace area from every half-edge's cross term, negative is clockwise
+    p, q = positions[org], positions[dest]
+    area = np.bincount(fo, 0.5 * (p[:, 0] * q[:, 1] - q[:, 0] * p[:, 1]), minlength=F)
+    report("orientation", np.nonzero(area >= 0)[0])
+
+    # vertices
+    used = np.bincount(org[~brokenRef], minlength=V) > 0
+    out = np.clip(outgoing, 0, max(E - 1, 0))
+    report("outgoing", vertices[(outgoing < -1) | (outgoing >= E) | ((outgoing >= 0) & (org[out] != vertices))])
+    report("orphan", vertices[~used])
+    cat = getCatalogue()
+    types = face_type[fo]
+    counted = (types >= 0) & (corner >= 0) & ~brokenRef
+    safeTypes = np.where(counted, types, 0)
+    units = np.where(counted, cat.angleUnits[safeTypes, (face_edge_idx[fo] + corner) % cat.sizes[safeTypes]], 0)
+    summed = np.bincount(org, units, minlength=V).astype(np.int64)
+    openEdges = ~hasTwin
+    onBoundary = (np.bincount(org[openEdges], minlength=V) + np.bincount(dest[openEdges], minlength=V)) > 0
+    untyped = np.bincount(org[types < 0], minlength=V) > 0
+    short = used & ~onBoundary & ~untyped & (summed != cat.fullTurn)
+    report("angle", vertices[(angles != summed) | (summed > cat.fullTurn) | short])
+    first, second = nearPairs(positions, snap_eps)
+    report("duplicate", np.concatenate((first, second)))
+    return problems
+
+def describeProblems(problems: dict[str, list[int]], limit: int = 5) -> str:
+    # "twin: 2 (faces 4, 9); angle: 1 (vertices 17)", empty for a sound mesh
+    parts = []
+    for name, ids in problems.items():
+        kind = "vertices" if name in VERTEX_CHECKS or name in ("vertex_ids", "degree", "vertex_index") else "faces"
+        shown = ", ".join(str(int(i)) for i in list(ids)[:limit])
+        parts.append(f"{name}: {len(ids)} ({kind} {shown}{', ...' if len(ids) > limit else ''})")
+    return "; ".join(parts)
 
 class Diagram:
-    edges: Optional[list['HalfEdge']] = None
-    faces: Optional[list['Face']] = None
-    vertices: Optional[list['Vertex']] = None
+    vertices: dict[int, 'Vertex']  # vertex id -> Vertex
+    faces: dict[int, 'Face']  # face id -> Face
+    edge_map: dict[tuple[int, int], 'HalfEdge']  # (origin id, destination id) -> HalfEdge
+    boundary: dict['HalfEdge', None]  # twinless half-edges, used as an insertion-ordered set
+    vertex_angle: dict[int, int]  # vertex id -> catalogue angle units used around the vertex
     vertex_index: VertexIndex
-    edge_map = {}  # dict[(vx_id, vy_id)] -> HalfEdge
+    face_index: FaceIndex
+    snap_eps: Optional[float]  # absolute snap distance, None to follow the index cell size
 
-    def __init__(self):
+    def __init__(self, snap_eps: Optional[float] = None):
         self.vertex_index = VertexIndex()
+        self.face_index = FaceIndex()
+        self.vertices = {}
+        self.faces = {}
+        self.edge_map = {}
+        self.boundary = {}
+        self.vertex_angle = {}
+        self.snap_eps = snap_eps
+        self._vertex_degree = {}  # vertex id -> number of faces using the vertex
+        self._next_vertex_id = 0
+        self._next_face_id = 0
 
-    def add_planigon(self, vertices_pos: list[tuple[float, float]]) -> Face:
-        verts = []
-        for p in vertices_pos:
-            v = self.vertex_index.find_near(p, eps=1e-5)
-            if not v:
-                v = Vertex(p)
-                self.vertex_index.add(v)
-            verts.append(v)
+    @property
+    def edges(self) -> list['HalfEdge']:
+        return list(self.edge_map.values())
+
+    def boundary_edges(self) -> list['HalfEdge']:
+        return list(self.boundary)
+
+    def face_open_edges(self, face: 'Face') -> list['HalfEdge']:
+        return [he for he in iterate(face.edge) if he in self.boundary]
+
+    def snap_tolerance(self) -> float:
+        # cells track the shortest edge in play, so a fraction of one scales with the scene
+        return self.snap_eps if self.snap_eps is not None else SNAP_CELL_FRACTION * self.vertex_index.cell_size
+
+    @perfStats.timed("diagram.intersects_existing")
+    def intersects_existing(self, vertices_pos) -> bool:
+        # would a face with this ring overlap or T-junction the faces already placed
+        return self.face_index.intersects(vertices_pos, self.snap_tolerance())
+
+    def face_at(self, pos) -> Optional['Face']:
+        return self.face_index.find_containing(pos)
+
+    def bounding_box(self) -> Optional[tuple[float, float, float, float]]:
+        # (xmin, ymin, xmax, ymax) covering every face placed so far
+        return self.face_index.bounds
+
+    def remaining_angle(self, v: 'Vertex') -> int:
+        # catalogue angle units still free around v, exact
+        return getCatalogue().fullTurn - self.vertex_angle.get(v.id, 0)
+
+    def fitting_corners(self, v: 'Vertex', planigon_types=None) -> list[tuple[int, int]]:
+        # (planigon, corner) pairs that can go at v and still leave a fillable gap
+        return getCatalogue().fittingCorners(self.remaining_angle(v), planigon_types)
+
+    def edge_corner(self, he: 'HalfEdge') -> Optional[tuple[int, int]]:
+        # (planigon, edgeIdx) that he was placed as, None for untyped faces
+        face = he.face
+        if face is None or face.planigon_type is None:
+            return None
+        k = 0
+        curr = face.edge
+        while curr is not he:
+            curr = curr.next
+            k += 1
+        n = int(getCatalogue().sizes[face.planigon_type])
+        return face.planigon_type, (face.edge_idx + k) % n
+
+    def fitting_placements(self, he: 'HalfEdge', planigon_types=None) -> list[tuple[int, int]]:
+        # (planigon, edgeIdx) pairs that can be attached on the open side of he; the new
+        # face's edge edgeIdx runs from he's destination back to its origin
+        cat = getCatalogue()
+        corner = self.edge_corner(he)
+        lengthClass = None if corner is None else int(cat.lengthClass[corner])
+        return cat.attachments(lengthClass, self.remaining_angle(he.next.origin),
+                               self.remaining_angle(he.origin), planigon_types)
+
+    def frontier_placements(self, planigon_types=None) -> dict['HalfEdge', list[tuple[int, int]]]:
+        return {he: self.fitting_placements(he, planigon_types) for he in self.boundary}
+
+    def _count_corners(self, face: 'Face', halfedges: list['HalfEdge'], sign: int):
+        if face.planigon_type is None:
+            return
+        cat = getCatalogue()
+        units = cat.angleUnits[face.planigon_type]
+        n = int(cat.sizes[face.planigon_type])
+        angles = self.vertex_angle
+        for k, he in enumerate(halfedges):
+            vid = he.origin.id
+            angles[vid] = angles.get(vid, 0) + sign * int(units[(face.edge_idx + k) % n])
+
+    def _new_vertex(self, pos) -> 'Vertex':
+        v = Vertex(pos, id=self._next_vertex_id)
+        self._next_vertex_id += 1
+        self.vertices[v.id] = v
+        self.vertex_index.add(v)
+        return v
+
+    def _register_edge(self, he: 'HalfEdge', a: 'Vertex', b: 'Vertex'):
+        # pairs he with the registered reverse edge, or leaves it on the boundary
+        self.edge_map[(a.id, b.id)] = he
+        twin = self.edge_map.get((b.id, a.id))
+        if twin is None:
+            self.boundary[he] = None
+            he.boundary = True
+        else:
+            he.twin = twin
+            twin.twin = he
+            self.boundary.pop(twin, None)
+            twin.boundary = False
+
+    def _unregister_edge(self, he: 'HalfEdge'):
+        # drops he from the registry, its twin (if any) goes back on the boundary
+        key = (he.origin.id, he.next.origin.id)
+        if self.edge_map.get(key) is he:
+            del self.edge_map[key]
+        self.boundary.pop(he, None)
+        twin = he.twin
+        if twin is not None:
+            twin.twin = None
+            twin.boundary = True
+            self.boundary[twin] = None
+            he.twin = None
+
+    @perfStats.timed("diagram.add_planigon")
+    def add_planigon(self, vertices_pos: list[tuple[float, float]], planigon_type: Optional[int] = None,
+                     edge_idx: int = 0) -> Face:
+        # vertices_pos[k] is planigon vertex (edge_idx + k) of planigon_type
+        ring = np.asarray(vertices_pos, dtype=np.float64)
+        fitVertexIndex(self.vertex_index, ring, planigon_type)
+        verts = self.vertex_index.find_near_many(ring, eps=self.snap_tolerance())
+        for i, v in enumerate(verts):
+            if v is None:
+                verts[i] = self._new_vertex(tuple(vertices_pos[i]))
 
         halfedges = []
         n = len(verts)
         for i in range(n):
-            a, b = verts[i], verts[(i+1) % n]
-            he = HalfEdge(origin=a)
+            he = HalfEdge(origin=verts[i])
             halfedges.append(he)
-            a.outgoing = he
-            key = (id(a), id(b))
-            rev_key = (id(b), id(a))
-            if rev_key in edge_map:
-                twin = edge_map[rev_key]
-                he.twin = twin
-                twin.twin = he
-                del edge_map[rev_key]
-            else:
-                edge_map[key] = he
+            verts[i].outgoing = he
+            self._vertex_degree[verts[i].id] = self._vertex_degree.get(verts[i].id, 0) + 1
 
         # link the cycle
         for i in range(n):
@@ -260,12 +954,341 @@ class Diagram:
             halfedges[i].prev = halfedges[(i-1) % n]
 
         # create face
-        f = Face(edge=halfedges[0])
-        for he in halfedges:
+        f = Face(edge=halfedges[0], planigon_type=planigon_type, edge_idx=edge_idx, id=self._next_face_id)
+        self._next_face_id += 1
+        self.faces[f.id] = f
+        for i, he in enumerate(halfedges):
             he.face = f
+            self._register_edge(he, verts[i], verts[(i+1) % n])
+        self._count_corners(f, halfedges, 1)
+        self.face_index.add(f, ring)
 
         return f
 
+    @perfStats.timed("diagram.remove_face")
+    def remove_face(self, face: Face) -> Face:
+        # only the face's own half-edges, their twins and orphaned vertices are touched;
+        # the removed objects keep their links so restore_face can put them back
+        halfedges = iterate(face.edge)
+        self._count_corners(face, halfedges, -1)
+        self.face_index.remove(face)
+        for he in halfedges:
+            v = he.origin
+            self._vertex_degree[v.id] -= 1
+            if self._vertex_degree[v.id] == 0:
+                del self._vertex_degree[v.id]
+                self.vertex_angle.pop(v.id, None)
+                del self.vertices[v.id]
+                self.vertex_index.remove(v)
+            elif v.outgoing is he:
+                # another half-edge leaving v, through a neighbouring face
+                if he.twin is not None:
+                    v.outgoing = he.twin.next
+                elif he.prev.twin is not None:
+                    v.outgoing = he.prev.twin
+                else:
+                    v.outgoing = None
+        for he in halfedges:
+            self._unregister_edge(he)
+        del self.faces[face.id]
+        return face
+
+    def restore_face(self, face: Face) -> Face:
+        # re-inserts a face removed by remove_face, keeping its ids and objects
+        halfedges = iterate(face.edge)
+        for he in halfedges:
+            v = he.origin
+            if v.id not in self.vertices:
+                self.vertices[v.id] = v
+                self.vertex_index.add(v)
+            self._vertex_degree[v.id] = self._vertex_degree.get(v.id, 0) + 1
+            if v.outgoing is None:
+                v.outgoing = he
+        self.faces[face.id] = face
+        for he in halfedges:
+            self._register_edge(he, he.origin, he.next.origin)
+        self._count_corners(face, halfedges, 1)
+        self.face_index.add(face, [he.origin.pos for he in halfedges])
+        return face
+
+    def _check_merge(self, other: 'Diagram', matrix, eps: float) -> dict[int, 'Vertex']:
+        # other's boundary vertex id -> the vertex here it snaps to; raises ValueError
+        # where merging would overlap faces or overfill a vertex
+        open_edges = list(other.boundary)
+        corners = list({he.origin.id: he.origin for he in open_edges}.values())
+        match = {}
+        if corners and self.vertices:
+            slots = self.vertex_index.find_near_slots(applyAffine([v.pos for v in corners], matrix), eps).tolist()
+            items = self.vertex_index.items
+            match = {v.id: items[slot] for v, slot in zip(corners, slots) if slot >= 0}
+        if len({v.id for v in match.values()}) < len(match):
+            raise ValueError("several boundary vertices snap onto one vertex")
+        fullTurn = getCatalogue().fullTurn
+        for vid, target in match.items():
+            if self.vertex_angle.get(target.id, 0) + other.vertex_angle.get(vid, 0) > fullTurn:
+                raise ValueError(f"vertex at {target.pos} would hold more than a full turn")
+        for he in open_edges:
+            a, b = match.get(he.origin.id), match.get(he.next.origin.id)
+            if a is None or b is None:
+                continue
+            twin = self.edge_map.get((b.id, a.id))
+            if (a.id, b.id) in self.edge_map or (twin is not None and twin not in self.boundary):
+                raise ValueError(f"edge {a.pos} -> {b.pos} is already used")
+        # the two boundaries against the other diagram's faces, both ways round
+        inverse = None if matrix is None else np.linalg.inv(np.vstack((matrix, (0.0, 0.0, 1.0))))[:2]
+        for source, target, transform in ((other, self, matrix), (self, other, inverse)):
+            if not target.faces:
+                continue
+            for face in {he.face for he in source.boundary}:
+                ring = applyAffine([he.origin.pos for he in iterate(face.edge)], transform)
+                if target.face_index.intersects(ring, eps):
+                    raise ValueError("the diagrams overlap")
+        return match
+
+    @perfStats.timed("diagram.merge")
+    def merge(self, other: 'Diagram', transform=None) -> list[Face]:
+        # moves every face of other into this diagram, after the optional affine transform,
+        # and returns them; other is left empty. Only the boundaries are matched: other's
+        # boundary vertices snap onto vertices here in one batch query and its open edges
+        # pair with open edges here. Everything else keeps its objects and links and is
+        # renumbered, never reinserted face by face. Raises ValueError, changing neither
+        # diagram, if the faces would overlap.
+        matrix = None if transform is None else affineMatrix(transform)
+        if not other.faces:
+            return []
+        cellSize = min(self.vertex_index.cell_size, other.vertex_index.cell_size) if self.vertices else other.vertex_index.cell_size
+        if cellSize < self.vertex_index.cell_size:
+            self.vertex_index.resize(cellSize)
+        match = self._check_merge(other, matrix, self.snap_tolerance())
+
+        # vertices: snapped ones hand their half-edges over, the rest get new ids
+        for he in other.edge_map.values():
+            target = match.get(he.origin.id)
+            if target is not None:
+                he.origin = target
+        moved = [v for vid, v in other.vertices.items() if vid not in match]
+        points = applyAffine(np.array([v.pos for v in moved], dtype=np.float64).reshape(-1, 2), matrix)
+        if matrix is not None:
+            for v, pos in zip(moved, points.tolist()):
+                v.pos = tuple(pos)
+        degree, angles = other._vertex_degree, other.vertex_angle
+        for v in moved:
+            oldId = v.id
+            v.id = self._next_vertex_id
+            self._next_vertex_id += 1
+            self.vertices[v.id] = v
+            self._vertex_degree[v.id] = degree[oldId]
+            if oldId in angles:
+                self.vertex_angle[v.id] = angles[oldId]
+        for oldId, target in match.items():
+            self._vertex_degree[target.id] += degree[oldId]
+            self.vertex_angle[target.id] = self.vertex_angle.get(target.id, 0) + angles.get(oldId, 0)
+        self.vertex_index.add_many(moved, points)
+
+        # faces and edges: new ids, then other's open edges pair up with open edges here
+        faces = list(other.faces.values())
+        slots = [other.face_index.slots[face] for face in faces]
+        for face in faces:
+            face.id = self._next_face_id
+            self._next_face_id += 1
+            self.faces[face.id] = face
+        self.face_index.add_many(faces, applyAffine(other.face_index.rings[slots], matrix))
+        self.edge_map.update({(he.origin.id, he.next.origin.id): he for he in other.edge_map.values()})
+        for he in other.boundary:
+            twin = self.edge_map.get((he.next.origin.id, he.origin.id))
+            if twin is None or twin not in self.boundary:
+                self.boundary[he] = None
+            else:
+                del self.boundary[twin]
+                he.twin, twin.twin = twin, he
+                he.boundary = twin.boundary = False
+        other.__init__(snap_eps=other.snap_eps)
+        return faces
+
+    @perfStats.timed("diagram.validate")
+    def validate(self) -> dict[str, list[int]]:
+        # broken invariant -> ids of the faces or vertices involved, empty when the mesh
+        # is sound: meshProblems over the mesh as columns, plus the registries only this
+        # backend keeps (edge_map, boundary, vertex ids and degrees, the spatial indexes).
+        # Gathering the columns is the one pass over the objects
+        problems = {}
+        faces = list(self.faces.values())
+        faceIds = np.array([face.id for face in faces], dtype=np.int64)
+        vertexIds = np.array(list(self.vertices), dtype=np.int64)
+        vertexRow = {vid: i for i, vid in enumerate(self.vertices)}
+        limit = max(64, 2 * int(getCatalogue().sizes.max()))  # a cycle that long never closes
+        halfedges, face_edge = [], []
+        for face in faces:
+            face_edge.append(len(halfedges))
+            he, n = face.edge, 0
+            while he is not None and n < limit:
+                halfedges.append(he)
+                n += 1
+                he = he.next
+                if he is face.edge:
+                    break
+        edgeRow = {he: i for i, he in enumerate(halfedges)}
+        faceRow = {face: f for f, face in enumerate(faces)}
+        vertices = list(self.vertices.values())
+        columns = {
+            "positions": np.array([v.pos for v in vertices], dtype=np.float64).reshape(-1, 2),
+            "vertex_outgoing": np.array([-1 if v.outgoing is None else edgeRow.get(v.outgoing, -2) for v in vertices], dtype=np.int64),
+            "vertex_angle": np.array([self.vertex_angle.get(vid, 0) for vid in self.vertices], dtype=np.int64),
+            "origin": np.array([vertexRow.get(he.origin.id, -1) if self.vertices.get(he.origin.id) is he.origin else -1
+                                for he in halfedges], dtype=np.int64),
+            "twin": np.array([-1 if he.twin is None else edgeRow.get(he.twin, -2) for he in halfedges], dtype=np.int64),
+            "next": np.array([edgeRow.get(he.next, -1) for he in halfedges], dtype=np.int64),
+            "prev": np.array([edgeRow.get(he.prev, -1) for he in halfedges], dtype=np.int64),
+            "face_of": np.array([faceRow.get(he.face, -1) for he in halfedges], dtype=np.int64),
+            "face_edge": np.array(face_edge, dtype=np.int64),
+            "face_type": np.array([-1 if f.planigon_type is None else f.planigon_type for f in faces], dtype=np.int64),
+            "face_edge_idx": np.array([f.edge_idx for f in faces], dtype=np.int64),
+        }
+        for name, rows in meshProblems(columns, self.snap_tolerance()).items():
+            problems[name] = (vertexIds if name in VERTEX_CHECKS else faceIds)[rows].tolist()
+
+        def faceIdsOf(halfedgeList):
+            return sorted({he.face.id for he in halfedgeList if he.face is not None})
+
+        # registries: every half-edge under its current key, the boundary its twinless ones
+        stale = [he for key, he in self.edge_map.items()
+                 if he not in edgeRow or key != (he.origin.id, he.next.origin.id)]
+        missing = [he for he in halfedges if self.edge_map.get((he.origin.id, he.next.origin.id)) is not he]
+        if stale or missing:
+            problems["edge_map"] = faceIdsOf(stale + missing)
+        wrong = [he for he in halfedges if (he in self.boundary) != (he.twin is None) or he.boundary != (he.twin is None)]
+        wrong += [he for he in self.boundary if he not in edgeRow]
+        if wrong:
+            problems["boundary"] = faceIdsOf(wrong)
+        badIds = {vid for vid, v in self.vertices.items() if v.id != vid}
+        badIds.update(he.origin.id for he in halfedges if self.vertices.get(he.origin.id) is not he.origin)
+        if badIds:
+            problems["vertex_ids"] = sorted(badIds)
+        origin = columns["origin"]
+        uses = np.bincount(origin[origin >= 0], minlength=len(vertexIds))
+        degree = np.array([self._vertex_degree.get(vid, 0) for vid in self.vertices], dtype=np.int64)
+        if len(degree) and (degree != uses).any():
+            problems["degree"] = vertexIds[degree != uses].tolist()
+        # spatial indexes: each vertex found at its own position, each face listed
+        if vertices:
+            slots = self.vertex_index.find_near_slots(columns["positions"], self.snap_tolerance()).tolist()
+            items = self.vertex_index.items
+            lost = [v.id for v, slot in zip(vertices, slots) if slot < 0 or items[slot] is not v]
+            if lost:
+                problems["vertex_index"] = lost
+        unindexed = [face.id for face in faces if face not in self.face_index.slots]
+        if unindexed:
+            problems["face_index"] = unindexed
+        return problems
+
+## --- Undo / redo --- ##
+
+class AddFaceCommand:
+    def __init__(self, vertices_pos: list[tuple[float, float]], planigon_type: Optional[int] = None,
+                 edge_idx: int = 0):
+        self.vertices_pos = vertices_pos
+        self.planigon_type = planigon_type
+        self.edge_idx = edge_idx
+        self.face = None
+
+    def do(self, diagram: Diagram) -> tuple[list[Face], list[Face]]:
+        if self.face is None:
+            self.face = diagram.add_planigon(self.vertices_pos, self.planigon_type, self.edge_idx)
+        else:
+            diagram.restore_face(self.face)
+        return [self.face], []
+
+    def undo(self, diagram: Diagram) -> tuple[list[Face], list[Face]]:
+        diagram.remove_face(self.face)
+        return [], [self.face]
+
+class RemoveFaceCommand:
+    def __init__(self, face: Face):
+        self.face = face
+
+    def do(self, diagram: Diagram) -> tuple[list[Face], list[Face]]:
+        diagram.remove_face(self.face)
+        return [], [self.face]
+
+    def undo(self, diagram: Diagram) -> tuple[list[Face], list[Face]]:
+        diagram.restore_face(self.face)
+        return [self.face], []
+
+class MergeCommand:
+    # a whole diagram merged in at once, see Diagram.merge; undone and redone face by face
+    def __init__(self, other: Diagram, transform=None):
+        self.other = other
+        self.transform = transform
+        self.faces = None
+
+    def do(self, diagram: Diagram) -> tuple[list[Face], list[Face]]:
+        if self.faces is None:
+            self.faces = diagram.merge(self.other, self.transform)
+            self.other = None
+        else:
+            for face in self.faces:
+                diagram.restore_face(face)
+        return self.faces, []
+
+    def undo(self, diagram: Diagram) -> tuple[list[Face], list[Face]]:
+        for face in reversed(self.faces):
+            diagram.remove_face(face)
+        return [], self.faces
+
+class DiagramHistory:
+    # command log over a Diagram, every step returns (added faces, removed faces)
+    # so callers can update their own state for just those faces
+    def __init__(self, diagram: Diagram, limit: Optional[int] = None):
+        self.diagram = diagram
+        self.undo_stack = deque(maxlen=limit)
+        self.redo_stack = []
+
+    def execute(self, command) -> tuple[list[Face], list[Face]]:
+        change = command.do(self.diagram)
+        self.undo_stack.append(command)
+        self.redo_stack.clear()
+        return change
+
+    def add_face(self, vertices_pos: list[tuple[float, float]], planigon_type: Optional[int] = None,
+                 edge_idx: int = 0) -> Face:
+        command = AddFaceCommand(vertices_pos, planigon_type, edge_idx)
+        self.execute(command)
+        return command.face
+
+    def remove_face(self, face: Face) -> Face:
+        self.execute(RemoveFaceCommand(face))
+        return face
+
+    def merge(self, other: Diagram, transform=None) -> list[Face]:
+        command = MergeCommand(other, transform)
+        self.execute(command)
+        return command.faces
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+
+    def can_undo(self) -> bool:
+        return len(self.undo_stack) > 0
+
+    def can_redo(self) -> bool:
+        return len(self.redo_stack) > 0
+
+    def undo(self) -> tuple[list[Face], list[Face]]:
+        if not self.undo_stack:
+            return [], []
+        command = self.undo_stack.pop()
+        self.redo_stack.append(command)
+        return command.undo(self.diagram)
+
+    def redo(self) -> tuple[list[Face], list[Face]]:
+        if not self.redo_stack:
+            return [], []
+        command = self.redo_stack.pop()
+        self.undo_stack.append(command)
+        return command.do(self.diagram)
+
+@perfStats.timed("geometry.getPlanigonVertices")
 def getPlanigonVertices(in_origin, in_destination, edgeIdx, edgeLengths, Angles) -> list[Vertex]:
     results = [in_origin, in_destination]
     # base vector (direction from origin to destination)
@@ -284,10 +1307,8 @@ def getPlanigonVertices(in_origin, in_destination, edgeIdx, edgeLengths, Angles)
     for step in range(1, len(edgeLengths) - 1):
         curr_edge_idx = (edgeIdx + step) % len(edgeLengths)
         curr_angle_idx = (edgeIdx + step) % len(Angles)
-        print("edgeIdx:", edgeIdx)
-        print("sequence:", [(curr_edge_idx, curr_angle_idx) 
-                        for step in range(1, len(edgeLengths)-1)])
-        
+        log.debug("edgeIdx: %d, edge %d, angle %d", edgeIdx, curr_edge_idx, curr_angle_idx)
+
         # turn to next edge direction
         n = rotate2D(n, -(pi - np.radians(Angles[curr_angle_idx])))
 
@@ -301,3 +1322,251 @@ def getPlanigonVertices(in_origin, in_destination, edgeIdx, edgeLengths, Angles)
     return results
 
 
+## --- Planigon catalogue --- ##
+
+CATALOGUE_VERSION = 2
+
+def _catalogueCachePath() -> Optional[str]:
+    # PLANIGON_CACHE_DIR overrides the directory and an empty value turns the cache off;
+    # by default it is the user cache (XDG_CACHE_HOME, %LOCALAPPDATA% or ~/.cache), never
+    # the package directory, which may be read-only or shared
+    directory = os.environ.get("PLANIGON_CACHE_DIR")
+    if directory is None:
+        base = os.environ.get("XDG_CACHE_HOME") or (os.environ.get("LOCALAPPDATA") if os.name == "nt" else None)
+        directory = os.path.join(base or os.path.join(os.path.expanduser("~"), ".cache"), "planigon")
+    return os.path.join(directory, f"catalogue-v{CATALOGUE_VERSION}.npz") if directory else None
+
+CATALOGUE_CACHE = _catalogueCachePath()  # read once, at import
+
+def _lengthClasses(lengths: np.ndarray, sizes: np.ndarray, tol: float = 1e-6) -> tuple[np.ndarray, np.ndarray]:
+    # groups equal edge lengths (relative tol) into integer classes, -1 in padding
+    lengthClass = np.full(lengths.shape, -1, dtype=np.int64)
+    mask = np.arange(lengths.shape[1])[None, :] < sizes[:, None]
+    values = lengths[mask]
+    order = np.argsort(values, kind="stable")
+    classes = np.empty(len(values), dtype=np.int64)
+    classLengths = []
+    for i in order.tolist():
+        if not classLengths or values[i] - classLengths[-1] > tol * classLengths[-1]:
+            classLengths.append(float(values[i]))
+        classes[i] = len(classLengths) - 1
+    lengthClass[mask] = classes
+    return lengthClass, np.array(classLengths)
+
+def _catalogueKey(planigonList) -> str:
+    # identifies the raw definitions so a stale cache file is rebuilt
+    import hashlib  # deferred with the other catalogue-only imports, see build
+    raw = repr([(p.angles, p._lengths, p.lengthParms) for p in planigonList])
+    return hashlib.sha1(f"{CATALOGUE_VERSION}:{raw}".encode()).hexdigest()
+
+class PlanigonCatalogue:
+    # compiled, read-only tables for every planigon, padded to maxN vertices:
+    #   sizes          (P,)              vertex count per planigon
+    #   angles         (P, maxN)         interior angles in degrees
+    #   lengths        (P, maxN)         edge lengths, edge i runs from vertex i to i+1
+    #   exteriorAngles (P, maxN)         clockwise turn in radians taken at each vertex
+    #   rings          (P, maxN, maxN, 2) vertex ring for every starting edge, in the
+    #                                    frame where that edge runs from (0, 0) to (1, 0)
+    #   angleUnits     (P, maxN)         interior angles as exact integer counts of
+    #                                    360 / fullTurn degrees, -1 in padding
+    # ring order matches getPlanigonVertices: host origin, host destination, then the rest
+    _arrayNames = ("sizes", "angles", "lengths", "exteriorAngles", "rings", "angleUnits", "fullTurn")
+
+    def __init__(self, sizes, angles, lengths, exteriorAngles, rings, angleUnits, fullTurn, key=""):
+        self.sizes = sizes
+        self.angles = angles
+        self.lengths = lengths
+        self.exteriorAngles = exteriorAngles
+        self.rings = rings
+        self.angleUnits = angleUnits
+        self.fullTurn = int(np.asarray(fullTurn).item())
+        self.key = key
+        self.maxN = rings.shape[1]
+        self.perimeters = np.nansum(lengths, axis=1)
+        self.minLength = float(np.nanmin(lengths))
+        # complex view of the rings used by the similarity transforms, no copy
+        self._complexRings = rings.view(np.complex128)[..., 0]
+        self.lengthClass, self.classLengths = _lengthClasses(lengths, sizes)
+        # length class -> (planigon, edgeIdx) arrays of every edge in that class
+        flat = np.argwhere(self.lengthClass >= 0)
+        classes = self.lengthClass[flat[:, 0], flat[:, 1]]
+        self._classEdges = [flat[classes == c].T.copy() for c in range(len(self.classLengths))]
+        self._attachments = {}  # (subset, length class, remaining units at both ends) -> placements
+        self._fillable = {}  # planigon subset -> fillable table
+        self._cornerFits = {}  # planigon subset -> corner fit table
+        self._cornerFitLists = {}  # (planigon subset, remaining units) -> [(planigon, corner)]
+
+    def __len__(self):
+        return len(self.sizes)
+
+    @classmethod
+    def build(cls, planigonList) -> Self:
+        maxN = max(len(p.angles) for p in planigonList)
+        count = len(planigonList)
+        sizes = np.zeros(count, dtype=np.int64)
+        angles = np.full((count, maxN), np.nan)
+        lengths = np.full((count, maxN), np.nan)
+        exteriorAngles = np.full((count, maxN), np.nan)
+        rings = np.full((count, maxN, maxN), np.nan, dtype=np.complex128)
+        for pIdx, p in enumerate(planigonList):
+            n = len(p.angles)
+            sizes[pIdx] = n
+            angles[pIdx, :n] = p.angles
+            lengths[pIdx, :n] = p.lengths
+            exteriorAngles[pIdx, :n] = pi - np.radians(angles[pIdx, :n])
+            for edgeIdx in range(n):
+                order = (edgeIdx + np.arange(1, n - 1)) % n
+                # cumulative turn at every new vertex, same sequence as getPlanigonVertices
+                cumTurn = np.cumsum(-exteriorAngles[pIdx, order])
+                steps = lengths[pIdx, order] / lengths[pIdx, edgeIdx] * np.exp(1j * cumTurn)
+                rings[pIdx, edgeIdx, 0] = 0.0
+                rings[pIdx, edgeIdx, 1] = 1.0
+                rings[pIdx, edgeIdx, 2:n] = 1.0 + np.cumsum(steps)
+        ringsXY = np.ascontiguousarray(np.stack((rings.real, rings.imag), axis=-1))
+        # every planigon angle is 360 / k for a whole k, so a turn split into lcm(k) units
+        # represents all of them exactly
+        from fractions import Fraction  # only needed on a cache miss, kept off the import path
+        turnFractions = [[Fraction(a / 360.0).limit_denominator(10000) for a in p.angles] for p in planigonList]
+        fullTurn = math.lcm(*(f.denominator for row in turnFractions for f in row))
+        angleUnits = np.full((count, maxN), -1, dtype=np.int64)
+        for pIdx, row in enumerate(turnFractions):
+            angleUnits[pIdx, :len(row)] = [f.numerator * fullTurn // f.denominator for f in row]
+        return cls(sizes, angles, lengths, exteriorAngles, ringsXY, angleUnits, np.int64(fullTurn), _catalogueKey(planigonList))
+
+    def save(self, path: str):
+        # written aside and renamed, so readers (e.g. parallel growth workers) never see
+        # a partial file
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmpPath = f"{path}.{os.getpid()}.tmp.npz"
+        try:
+            np.savez(tmpPath, key=np.array(self.key), **{name: getattr(self, name) for name in self._arrayNames})
+            os.replace(tmpPath, path)
+        finally:
+            if os.path.exists(tmpPath):
+                os.remove(tmpPath)
+
+    @classmethod
+    def load(cls, path: str) -> Self:
+        with np.load(path) as data:
+            arrays = {name: np.ascontiguousarray(data[name]) for name in cls._arrayNames}
+            return cls(**arrays, key=str(data["key"]))
+
+    @classmethod
+    def loadOrBuild(cls, planigonList, path: Optional[str] = CATALOGUE_CACHE) -> Self:
+        key = _catalogueKey(planigonList)
+        # the cache is best effort: a missing, stale, corrupt or unwritable file only
+        # means building the tables again
+        if path is not None and os.path.exists(path):
+            try:
+                cat = cls.load(path)
+                if cat.key == key:
+                    return cat
+            except Exception:
+                pass
+        cat = cls.build(planigonList)
+        if path is not None:
+            try:
+                cat.save(path)
+            except Exception:
+                pass
+        return cat
+
+    # -- exact angle tables -- #
+    def _subset(self, planigonIdxs) -> tuple[int, ...]:
+        return tuple(range(len(self))) if planigonIdxs is None else tuple(sorted(set(int(p) for p in planigonIdxs)))
+
+    def fillableTable(self, planigonIdxs=None) -> np.ndarray:
+        # fillable[r] is True when r angle units can be made of corners of these planigons
+        key = self._subset(planigonIdxs)
+        if key not in self._fillable:
+            units = sorted({int(u) for p in key for u in self.angleUnits[p, :self.sizes[p]]})
+            fillable = np.zeros(self.fullTurn + 1, dtype=bool)
+            fillable[0] = True
+            for r in range(1, self.fullTurn + 1):
+                fillable[r] = any(u <= r and fillable[r - u] for u in units)
+            self._fillable[key] = fillable
+        return self._fillable[key]
+
+    def cornerFitTable(self, planigonIdxs=None) -> np.ndarray:
+        # fits[r, p, k] is True when corner k of planigon p can go at a vertex with r units
+        # free and leave a remainder other corners can still fill
+        key = self._subset(planigonIdxs)
+        if key not in self._cornerFits:
+            fillable = self.fillableTable(key)
+            remaining = np.arange(self.fullTurn + 1)[:, None, None]
+            units = self.angleUnits[None, :, :]
+            rest = remaining - units
+            fits = (units > 0) & (rest >= 0) & fillable[np.clip(rest, 0, self.fullTurn)]
+            selected = np.zeros(len(self), dtype=bool)
+            selected[list(key)] = True
+            self._cornerFits[key] = fits & selected[None, :, None]
+        return self._cornerFits[key]
+
+    def fittingCorners(self, remaining: int, planigonIdxs=None) -> list[tuple[int, int]]:
+        # (planigon, corner) pairs that fit a vertex with `remaining` units free
+        key = (self._subset(planigonIdxs), int(remaining))
+        if key not in self._cornerFitLists:
+            fits = self.cornerFitTable(key[0])[key[1]]
+            self._cornerFitLists[key] = [(int(p), int(k)) for p, k in np.argwhere(fits)]
+        return self._cornerFitLists[key]
+
+    def attachments(self, lengthClass: Optional[int], remainingStart: int, remainingEnd: int,
+                    planigonIdxs=None) -> list[tuple[int, int]]:
+        # (planigon, edgeIdx) placements whose edge edgeIdx has the given length class (None for
+        # any) and whose corners at both ends of it fit the angle left at those vertices;
+        # edge edgeIdx runs from the vertex with remainingStart free to the one with remainingEnd
+        subset = self._subset(planigonIdxs)
+        key = (subset, lengthClass, int(remainingStart), int(remainingEnd))
+        placements = self._attachments.get(key)
+        if placements is None:
+            if lengthClass is None:
+                ps, es = np.nonzero(self.lengthClass >= 0)
+            else:
+                ps, es = self._classEdges[lengthClass]
+            fits = self.cornerFitTable(subset)
+            ok = fits[key[2], ps, es] & fits[key[3], ps, (es + 1) % self.sizes[ps]]
+            placements = list(zip(ps[ok].tolist(), es[ok].tolist()))
+            self._attachments[key] = placements
+        return placements
+
+    def ring(self, planigonIdx: int, edgeIdx: int) -> np.ndarray:
+        n = self.sizes[planigonIdx]
+        return self.rings[planigonIdx, edgeIdx % n, :n]
+
+    @perfStats.timed("geometry.place")
+    def place(self, hostEdge, planigonIdx: int, edgeIdx: int) -> np.ndarray:
+        # hostEdge: (origin, destination), returns the (n, 2) vertex ring
+        n = self.sizes[planigonIdx]
+        (ox, oy), (dx, dy) = hostEdge
+        origin = complex(ox, oy)
+        ring = origin + (complex(dx, dy) - origin) * self._complexRings[planigonIdx, edgeIdx % n, :n]
+        return np.stack((ring.real, ring.imag), axis=-1)
+
+    @perfStats.timed("geometry.placeBatch")
+    def placeBatch(self, hostEdges, planigonIdxs, edgeIdxs) -> np.ndarray:
+        # hostEdges: (M, 2, 2) array of (origin, destination) positions
+        # returns (M, maxN, 2) vertex rings, rows of smaller planigons padded with NaN
+        hostEdges = np.asarray(hostEdges, dtype=np.float64).reshape(-1, 2, 2)
+        planigonIdxs = np.asarray(planigonIdxs, dtype=np.int64)
+        edgeIdxs = np.asarray(edgeIdxs, dtype=np.int64) % self.sizes[planigonIdxs]
+        origin = hostEdges[:, 0, 0] + 1j * hostEdges[:, 0, 1]
+        base = (hostEdges[:, 1, 0] + 1j * hostEdges[:, 1, 1]) - origin
+        ring = origin[:, None] + base[:, None] * self._complexRings[planigonIdxs, edgeIdxs]
+        return np.stack((ring.real, ring.imag), axis=-1)
+
+_catalogue = None
+
+def getCatalogue() -> PlanigonCatalogue:
+    global _catalogue
+    if _catalogue is None:
+        _catalogue = PlanigonCatalogue.loadOrBuild(planigons)
+    return _catalogue
+
+def getPlanigonVerticesBatch(hostEdges, planigonIdxs, edgeIdxs) -> np.ndarray:
+    # hostEdges: (M, 2, 2) array of (origin, destination) positions
+    # returns (M, maxN, 2) float64 vertex rings in the same order as getPlanigonVertices,
+    # rows of planigons with fewer than maxN vertices are padded with NaN
+    return getCatalogue().placeBatch(hostEdges, planigonIdxs, edgeIdxs)
+
+def planigonVertexCounts(planigonIdxs) -> np.ndarray:
+    return getCatalogue().sizes[np.asarray(planigonIdxs, dtype=np.int64)]
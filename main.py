@@ -1,10 +1,23 @@
-from PySide6.QtWidgets import QApplication, QWidget, QDockWidget, QHBoxLayout, QMainWindow, QGraphicsView, QGraphicsScene, QGraphicsPolygonItem, QPushButton, QGraphicsLineItem, QVBoxLayout, QLineEdit, QLabel
-from PySide6.QtGui import QPolygonF, QPen, QBrush
-from PySide6.QtCore import Qt, QPointF, Signal, QObject, Slot
+from PySide6.QtWidgets import QApplication, QWidget, QDockWidget, QHBoxLayout, QMainWindow, QGraphicsView, QGraphicsScene, QGraphicsItem, QGraphicsPolygonItem, QPushButton, QGraphicsLineItem, QVBoxLayout, QLineEdit, QLabel, QStyleOptionGraphicsItem, QFileDialog, QCheckBox, QGraphicsPathItem, QProgressBar, QSpinBox
+from PySide6.QtGui import QPolygonF, QPen, QBrush, QColor, QPainter, QPainterPath, QImage, QFontDatabase
+from PySide6.QtCore import Qt, QPointF, QRectF, Signal, QObject, Slot, QTimer, QRunnable, QThreadPool
+import argparse
+import functools
+import logging
+import math
 import sys
+import threading
+from contextlib import contextmanager
+import numpy as np
+from collections import OrderedDict, deque
+from typing import Optional
 from enum import Enum, auto
 from dataclasses import dataclass
-from include import planigonData
+# growth, periodic, meshArrays and diagramFile are imported where they are used, so
+# the window opens without loading them (see include/cli.py)
+from include import planigonData, perfStats
+
+log = logging.getLogger(__name__)
 
 ## --- Editor --- ##
 
@@ -20,6 +33,45 @@ class EditorState:
     selected_polygon = None
     selected_edge = None
 
+class ChangeSet:
+    # faces added to and removed from a diagram since the last diagramUpdated, net of
+    # each other (a face added and removed again is in neither); reset means listeners
+    # should re-read the whole diagram
+    def __init__(self, diagram, reset: bool = False):
+        self.diagram = diagram
+        self.added = {}  # faces, used as an insertion-ordered set
+        self.removed = {}
+        self.reset = reset
+
+    def __bool__(self):
+        return self.reset or bool(self.added) or bool(self.removed)
+
+    def record(self, added=(), removed=()):
+        for face in removed:
+            if self.added.pop(face, False) is False:
+                self.removed[face] = None
+        for face in added:
+            if self.removed.pop(face, False) is False:
+                self.added[face] = None
+
+    def edges(self) -> list:
+        # half-edges whose twin or boundary status the change can have altered: those
+        # of the added faces and their twins, and the live twins of removed faces' edges
+        result = {}
+        for face in self.added:
+            for he in planigonData.iterate(face.edge):
+                result[he] = None
+                if he.twin is not None:
+                    result[he.twin] = None
+        edge_map = getattr(self.diagram, "edge_map", None)
+        if edge_map is not None:
+            for face in self.removed:
+                for he in planigonData.iterate(face.edge):
+                    twin = edge_map.get((he.next.origin.id, he.origin.id))
+                    if twin is not None:
+                        result[twin] = None
+        return list(result)
+
 ## --- UI --- ##
 
 class GraphicsView(QGraphicsView):
@@ -53,10 +105,22 @@ class GraphicsView(QGraphicsView):
             pass
         # Delete selected polygon
         elif event.key() == Qt.Key_Backspace and self.controller.state.mode == Mode.POLYGON_SELECTED:
-            pass
+            self.controller.removeSelectedFace()
+        # Undo / redo
+        elif event.key() == Qt.Key_Z and event.modifiers() & Qt.ControlModifier:
+            if event.modifiers() & Qt.ShiftModifier:
+                self.controller.redo()
+            else:
+                self.controller.undo()
+        elif event.key() == Qt.Key_Y and event.modifiers() & Qt.ControlModifier:
+            self.controller.redo()
         else:
             super().keyPressEvent(event)
 
+    def paintEvent(self, event):
+        with perfStats.section("view.frame"):
+            super().paintEvent(event)
+
     def wheelEvent(self, event):
         factor = self.zoom_factor if event.angleDelta().y() > 0 else 1 / self.zoom_factor
         self.scale(factor, factor)
@@ -74,6 +138,11 @@ class GraphicsView(QGraphicsView):
             # RMB deselects
             self.controller.on_deselect_all()
             
+            event.accept()
+        elif (event.button() == Qt.LeftButton and self.controller.face_layer is not None
+              and not isinstance(self.itemAt(event.position().toPoint()), SelectableEdge)
+              and self.controller.pickFaceAt(self.mapToScene(event.position().toPoint()))):
+            # batched faces have no items of their own, picking goes through the face index
             event.accept()
         else:
             super().mousePressEvent(event)
@@ -107,10 +176,11 @@ class GraphicsView(QGraphicsView):
 class SelectableEdge(QGraphicsLineItem, QObject):
     edgeSelected = Signal(object)
 
-    def __init__(self, start, end, parent_polygon, size=5, parent=None):
+    def __init__(self, start, end, parent_polygon, size=5, parent=None, half_edge=None):
         QGraphicsLineItem.__init__(self, start.x(), start.y(), end.x(), end.y())
         QObject.__init__(self, parent)
         self.parent_polygon = parent_polygon
+        self.half_edge = half_edge  # open half-edge the line stands for, end -> start
         self.start = start
         self.end = end
         self.size = size
@@ -158,6 +228,395 @@ class previewPoly(QGraphicsPolygonItem, QObject):
         self.setBrush(QBrush(Qt.green))
         self.setZValue(0)
 
+## --- Chunked rendering --- ##
+# Optional mode for large tilings: faces are drawn by one FaceChunkItem per square chunk
+# of the plane instead of one SelectablePolygon each. A chunk reads its rings from the
+# diagram's face index and caches them as a QPainterPath for outlined drawing, and as a
+# small filled image for zoom levels where outlines would not be visible anyway.
+
+CHUNK_FACES = 16  # chunk side, in face extents
+LOD_OUTLINE_PX = 4.0  # faces smaller than this on screen are drawn from the fill image
+
+class FaceChunkItem(QGraphicsItem):
+    def __init__(self, layer: 'ChunkedFaceLayer'):
+        super().__init__()
+        self.layer = layer
+        self.faces = set()  # face index items drawn by this chunk
+        self._path = None
+        self._image = None
+        self._rect = QRectF()
+        self.setAcceptedMouseButtons(Qt.NoButton)
+        self.setZValue(0)
+
+    def _invalidate(self):
+        self._path = None
+        self._image = None
+        self.update()
+
+    def add(self, face, box):
+        rect = QRectF(box[0] - 1, box[1] - 1, box[2] - box[0] + 2, box[3] - box[1] + 2)  # room for the pen
+        if not self._rect.contains(rect):
+            self.prepareGeometryChange()
+            self._rect = rect if self._rect.isNull() else self._rect.united(rect)
+        self.faces.add(face)
+        self._invalidate()
+
+    def discard(self, face):
+        self.faces.discard(face)
+        self._invalidate()
+
+    def facePath(self) -> QPainterPath:
+        if self._path is None:
+            index = self.layer.diagram.face_index
+            path = QPainterPath()
+            # moveTo/lineTo is several times cheaper than building a QPolygonF per face
+            for face in self.faces:
+                ring = index.rings[index.slots[face]].tolist()
+                path.moveTo(*ring[0])
+                for x, y in ring[1:]:
+                    path.lineTo(x, y)
+                path.closeSubpath()
+            self._path = path
+        return self._path
+
+    def fillImage(self) -> QImage:
+        # the chunk's faces filled at LOD_OUTLINE_PX pixels per face, scaled down when drawn
+        if self._image is None:
+            scale = LOD_OUTLINE_PX / self.layer.face_extent
+            width = max(1, math.ceil(self._rect.width() * scale))
+            height = max(1, math.ceil(self._rect.height() * scale))
+            image = QImage(width, height, QImage.Format_ARGB32_Premultiplied)
+            image.fill(Qt.transparent)
+            painter = QPainter(image)
+            painter.scale(width / self._rect.width(), height / self._rect.height())
+            painter.translate(-self._rect.x(), -self._rect.y())
+            painter.fillPath(self.facePath(), QBrush(Qt.lightGray))
+            painter.end()
+            self._image = image
+        return self._image
+
+    def boundingRect(self) -> QRectF:
+        return self._rect
+
+    def paint(self, painter, option, widget=None):
+        if not self.faces:
+            return
+        pixels = QStyleOptionGraphicsItem.levelOfDetailFromTransform(painter.worldTransform()) * self.layer.face_extent
+        if pixels < LOD_OUTLINE_PX:
+            painter.drawImage(self._rect, self.fillImage())
+        else:
+            # cosmetic hairline, a scaled pen makes the raster engine stroke every face
+            painter.setPen(QPen(Qt.black, 0))
+            painter.setBrush(QBrush(Qt.lightGray))
+            painter.drawPath(self.facePath())
+
+class ChunkedFaceLayer:
+    def __init__(self, scene, diagram):
+        self.scene = scene
+        self.diagram = diagram
+        self.chunks = {}  # (chunk x, chunk y) -> FaceChunkItem
+        self.chunk_of = {}  # face -> chunk key
+        self.face_extent = None  # side of the first face's box, sets the chunk size
+        self.chunk_size = None
+
+    def add_face(self, face):
+        index = self.diagram.face_index
+        box = index.boxes[index.slots[face]].tolist()
+        if self.chunk_size is None:
+            self.face_extent = max(box[2] - box[0], box[3] - box[1]) or 1.0
+            self.chunk_size = CHUNK_FACES * self.face_extent
+        key = (math.floor((box[0] + box[2]) * 0.5 / self.chunk_size),
+               math.floor((box[1] + box[3]) * 0.5 / self.chunk_size))
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            chunk = FaceChunkItem(self)
+            self.chunks[key] = chunk
+            self.scene.addItem(chunk)
+        chunk.add(face, box)
+        self.chunk_of[face] = key
+
+    def remove_face(self, face):
+        key = self.chunk_of.pop(face, None)
+        if key is not None:
+            self.chunks[key].discard(face)
+
+    def clear(self):
+        for chunk in self.chunks.values():
+            self.scene.removeItem(chunk)
+        self.chunks = {}
+        self.chunk_of = {}
+
+# Culled mode goes further: a single ViewportFaceItem spans the tiling and every paint
+# asks the face index for just the faces inside the exposed rect. Zoomed out, or with
+# too many faces in view to outline, it rasterises their boxes into a coverage image.
+
+CULL_OUTLINE_FACES = 5000  # most faces outlined in one paint
+
+def _coverageImage(boxes: np.ndarray, rect: QRectF, scale: float) -> QImage:
+    # pixels of rect (at scale pixels per unit) covered by any box, in the face colour;
+    # each box is marked in a 2D difference array and the prefix sums fill it in
+    width = max(1, math.ceil(rect.width() * scale))
+    height = max(1, math.ceil(rect.height() * scale))
+    x = np.clip(((boxes[:, [0, 2]] - rect.left()) * scale).round().astype(np.int64), 0, width)
+    y = np.clip(((boxes[:, [1, 3]] - rect.top()) * scale).round().astype(np.int64), 0, height)
+    x[:, 1] = np.maximum(x[:, 1], np.minimum(x[:, 0] + 1, width))  # at least a pixel each
+    y[:, 1] = np.maximum(y[:, 1], np.minimum(y[:, 0] + 1, height))
+    stride = width + 1
+    corners = np.concatenate((y[:, 0] * stride + x[:, 0], y[:, 1] * stride + x[:, 1],
+                              y[:, 0] * stride + x[:, 1], y[:, 1] * stride + x[:, 0]))
+    weights = np.repeat(np.array([1, 1, -1, -1], dtype=np.int32), len(boxes))
+    diff = np.bincount(corners, weights, minlength=(height + 1) * stride).astype(np.int32).reshape(height + 1, stride)
+    covered = diff.cumsum(axis=0).cumsum(axis=1)[:height, :width] > 0
+    pixels = np.where(covered, np.uint32(QColor(Qt.lightGray).rgba()), np.uint32(0))
+    return QImage(pixels.tobytes(), width, height, 4 * width, QImage.Format_ARGB32_Premultiplied).copy()
+
+def _ringsPath(rings) -> QPainterPath:
+    # rings as nested lists; repeated padding vertices only add empty segments
+    path = QPainterPath()
+    for ring in rings:
+        path.moveTo(*ring[0])
+        for x, y in ring[1:]:
+            path.lineTo(x, y)
+        path.closeSubpath()
+    return path
+
+class ViewportFaceItem(QGraphicsItem):
+    def __init__(self, layer: 'CulledFaceLayer'):
+        super().__init__()
+        self.layer = layer
+        self._rect = QRectF()
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption, True)  # fills option.exposedRect
+        self.setAcceptedMouseButtons(Qt.NoButton)
+        self.setZValue(0)
+
+    def grow(self, box):
+        rect = QRectF(box[0] - 1, box[1] - 1, box[2] - box[0] + 2, box[3] - box[1] + 2)
+        if not self._rect.contains(rect):
+            self.prepareGeometryChange()
+            self._rect = rect if self._rect.isNull() else self._rect.united(rect)
+        self.update(rect)
+
+    def boundingRect(self) -> QRectF:
+        return self._rect
+
+    def paint(self, painter, option, widget=None):
+        index = self.layer.diagram.face_index
+        # exposedRect can run past the device when rendering offscreen, clip it to what is shown
+        inverse, _ = painter.worldTransform().inverted()
+        exposed = option.exposedRect.intersected(inverse.mapRect(QRectF(painter.viewport())))
+        if exposed.isEmpty():
+            return
+        slots = index.rect_slots(exposed.left(), exposed.top(), exposed.right(), exposed.bottom())
+        if len(slots) == 0:
+            return
+        lod = QStyleOptionGraphicsItem.levelOfDetailFromTransform(painter.worldTransform())
+        if lod * self.layer.face_extent < LOD_OUTLINE_PX or len(slots) > CULL_OUTLINE_FACES:
+            painter.drawImage(exposed, _coverageImage(index.boxes[slots], exposed, lod))
+            return
+        painter.setPen(QPen(Qt.black, 0))
+        painter.setBrush(QBrush(Qt.lightGray))
+        painter.drawPath(_ringsPath(index.rings[slots].tolist()))
+
+class CulledFaceLayer:
+    def __init__(self, scene, diagram):
+        self.scene = scene
+        self.diagram = diagram
+        self.face_extent = None  # side of the first face's box
+        self.item = ViewportFaceItem(self)
+        scene.addItem(self.item)
+
+    def add_face(self, face):
+        index = self.diagram.face_index
+        box = index.boxes[index.slots[face]].tolist()
+        if self.face_extent is None:
+            self.face_extent = max(box[2] - box[0], box[3] - box[1]) or 1.0
+        self.item.grow(box)
+
+    def remove_face(self, face):
+        # the face has usually left the index already, repaint everything
+        self.item.update()
+
+    def clear(self):
+        self.scene.removeItem(self.item)
+
+# A periodic tiling (include.periodic) has no face list at all: PeriodicFaceItem asks
+# the lattice for the faces over each exposed rect as it paints, so the plane it can
+# show costs no memory. It lies under the editor's own faces as a read-only backdrop.
+
+PERIODIC_EXTENT = 1e6  # half side of the square the item claims
+
+class PeriodicFaceItem(QGraphicsItem):
+    def __init__(self, tiling):
+        super().__init__()
+        self.tiling = tiling
+        boxes = tiling.boxes
+        self.face_extent = float(np.max(boxes[:, 2:] - boxes[:, :2]))
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption, True)
+        self.setAcceptedMouseButtons(Qt.NoButton)
+        self.setZValue(-1)
+
+    def boundingRect(self) -> QRectF:
+        return QRectF(-PERIODIC_EXTENT, -PERIODIC_EXTENT, 2 * PERIODIC_EXTENT, 2 * PERIODIC_EXTENT)
+
+    @perfStats.timed("view.periodic_paint")
+    def paint(self, painter, option, widget=None):
+        inverse, _ = painter.worldTransform().inverted()
+        exposed = option.exposedRect.intersected(inverse.mapRect(QRectF(painter.viewport())))
+        if exposed.isEmpty():
+            return
+        rect = (exposed.left(), exposed.top(), exposed.right(), exposed.bottom())
+        lod = QStyleOptionGraphicsItem.levelOfDetailFromTransform(painter.worldTransform())
+        if lod * self.face_extent < LOD_OUTLINE_PX or self.tiling.count_in_rect(*rect) > CULL_OUTLINE_FACES:
+            # the tiling covers the plane, so its coverage image is the whole rect
+            painter.fillRect(exposed, QColor(Qt.lightGray))
+            return
+        keys = self.tiling.faces_in_rect(*rect)
+        painter.setPen(QPen(Qt.darkGray, 0))
+        painter.setBrush(QBrush(Qt.lightGray))
+        painter.drawPath(_ringsPath(self.tiling.face_rings(keys).tolist()))
+
+# face layers by EditorController render mode, "items" gives every face its own item
+FACE_LAYERS = {"chunked": ChunkedFaceLayer, "culled": CulledFaceLayer}
+
+## --- Background jobs --- ##
+# Long operations (growing many faces, reading a file) run on QThreadPool threads
+# against data of their own: a snapshot of the faces they build on, or the file. They
+# never touch the live diagram. Progress and batches of finished faces come back over
+# signals, which Qt queues onto the GUI thread; the result is merged in there with
+# Diagram.merge, whose cost follows the patch boundary, and its face items join the
+# scene SCENE_CHUNK_FACES per event-loop tick.
+
+JOB_BATCH_FACES = 500  # faces a job streams back at a time
+SCENE_CHUNK_FACES = 1000  # face items added to the scene per tick
+
+class JobCancelled(Exception):
+    pass
+
+class JobSignals(QObject):
+    progress = Signal(int, int)  # done, total (0 while unknown)
+    batch = Signal(object)  # list of vertex rings, faces to show before the job is done
+    finished = Signal(object)  # what work returned
+    failed = Signal(str)
+    cancelled = Signal()
+
+class DiagramJob(QRunnable):
+    # runs work(job) on a pool thread; work reports through job.signals and calls
+    # job.check() often enough to notice cancel()
+    def __init__(self, name: str, work):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.name = name
+        self.work = work
+        self.signals = JobSignals()
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def check(self):
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def run(self):
+        try:
+            result = self.work(self)
+        except JobCancelled:
+            self.signals.cancelled.emit()
+        except Exception as exc:
+            log.exception("job %s failed", self.name)
+            self.signals.failed.emit(str(exc))
+        else:
+            self.signals.finished.emit(result)
+
+@functools.cache
+def _jobGrowthEngine():
+    # the JobGrowthEngine class, defined on first use so growth loads with the first job
+    from include.growth import GrowthEngine
+
+    class JobGrowthEngine(GrowthEngine):
+        # streams its new faces to a job every JOB_BATCH_FACES and stops once it is cancelled
+        def __init__(self, job: DiagramJob, **kwargs):
+            super().__init__(**kwargs)
+            self.job = job
+            self.grown = []  # faces placed by run(), not adopted
+            self._sent = 0
+
+        def _commit(self, ring, planigonIdx, edgeIdx, orientation):
+            face = super()._commit(ring, planigonIdx, edgeIdx, orientation)
+            self.grown.append(face)
+            if len(self.grown) - self._sent >= JOB_BATCH_FACES:
+                self.flush()
+            return face
+
+        def flush(self):
+            faces = self.grown[self._sent:]
+            self._sent = len(self.grown)
+            self.job.signals.batch.emit([[he.origin.pos for he in planigonData.iterate(f.edge)] for f in faces])
+            self.job.signals.progress.emit(self._sent, self.max_faces)
+
+        def fills(self, he) -> bool:
+            self.job.check()
+            return True
+
+    return JobGrowthEngine
+
+def growWork(snapshot, planigonIdx: int, count: int, objects: bool = True):
+    # job work: grows count faces of planigonIdx outward from snapshot, a list of
+    # (ring, planigon, edgeIdx, open edge positions) covering the frontier, and returns
+    # them as a new Diagram, or as an ArrayDiagram if objects is False
+    def work(job: DiagramJob):
+        engine = _jobGrowthEngine()(job, planigon_types=(planigonIdx,), max_faces=count)
+        for ring, planigonType, edgeIdx, openEdges in snapshot:
+            engine.adopt(ring, planigonType, edgeIdx, openEdges)
+        if snapshot:
+            engine.center = np.mean([np.mean(ring, axis=0) for ring, _, _, _ in snapshot], axis=0)
+        engine.run()
+        engine.flush()
+        patch = planigonData.Diagram()
+        for face in engine.grown:
+            job.check()
+            patch.add_planigon([he.origin.pos for he in planigonData.iterate(face.edge)], face.planigon_type, face.edge_idx)
+        # cheap next to growing it, and a broken patch must not reach the live diagram
+        problems = patch.validate()
+        if problems:
+            raise ValueError(f"grown faces failed validation: {planigonData.describeProblems(problems)}")
+        if objects:
+            return patch
+        from include.diagramFile import toArrays
+        return toArrays(patch)
+    return work
+
+def convertWork(columns, names, cell_size):
+    # job work: an object Diagram of a copy of an ArrayDiagram's columns
+    def work(job: DiagramJob) -> planigonData.Diagram:
+        from include.diagramFile import toDiagram
+        from include.meshArrays import ArrayDiagram
+        job.signals.progress.emit(0, 0)
+        return toDiagram(ArrayDiagram.from_columns(columns, names, cell_size))
+    return work
+
+def loadWork(path: str, objects: bool = True):
+    # job work: reads a diagram file, as an object Diagram unless objects is False
+    def work(job: DiagramJob):
+        from include.diagramFile import loadDiagram, toDiagram
+        job.signals.progress.emit(0, 0)
+        mesh = loadDiagram(path)
+        job.check()
+        return toDiagram(mesh) if objects else mesh
+    return work
+
+PLACEMENT_CACHE_SIZE = 64  # preview rings kept by EditorController
+
+_UNSET = object()
+
+def batched(method):
+    # runs an EditorController method inside self.batch()
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.batch():
+            return method(self, *args, **kwargs)
+    return wrapper
+
 class EditorController(QObject):
     # -- Signals -- #
     # - transforms
@@ -166,150 +625,570 @@ class EditorController(QObject):
     previewRemoved = Signal()
     previewUpdated = Signal(list[planigonData.Vertex])
     # - state changes
+    # one of each per action at most, see batch()
     stateChanged = Signal(EditorState)
-    diagramUpdated = Signal(planigonData.Diagram)
+    diagramUpdated = Signal(object)  # ChangeSet
     # - requests
     bakeTransforms = Signal()
+    # - background jobs
+    jobStarted = Signal(str)
+    jobProgress = Signal(int, int)
+    jobEnded = Signal(str)  # status message
 
     # -- Preview indexes -- #
     planigonIdx = 0
     edgeIdx = 0
     selected_edge = tuple[planigonData.Vertex, planigonData.Vertex]
 
-    def __init__(self, scene):
+    def __init__(self, scene, diagram=None, render_mode: str = "items"):
         super().__init__()
         self.scene_ref = scene
         self.state = EditorState()
-        self.diagram = planigonData.Diagram()
+        # any backend with the Diagram API works, e.g. meshArrays.ArrayDiagram
+        self.diagram = planigonData.Diagram() if diagram is None else diagram
+        # open batch() blocks, and what they have changed so far
+        self._batch_depth = 0
+        self._state_dirty = False
+        self._changes = ChangeSet(self.diagram)
+        self.catalogue = planigonData.getCatalogue()
+        self.history = planigonData.DiagramHistory(self.diagram)
+        # items the controller put in the scene, so handlers never scan scene.items()
+        self.polygon_items = {}  # face id -> SelectablePolygon
+        # batched modes draw faces through a face layer, the selected one is shown by a
+        # single reusable SelectablePolygon
+        self.face_layer = None if render_mode == "items" else FACE_LAYERS[render_mode](scene, self.diagram)
+        self.selection_item = None
+        if self.face_layer is not None:
+            self.selection_item = SelectablePolygon(QPolygonF(), None)
+            self.selection_item.setZValue(0.5)  # above the batched faces
+            self.selection_item.setVisible(False)
+            self.scene_ref.addItem(self.selection_item)
+        self.edge_items = []  # live SelectableEdges of the selected polygon
+        # edge items are pooled and connected once: PySide's connect/disconnect bookkeeping
+        # grows with every live connection, so per-click items would cost O(scene)
+        self.edge_pool = []
+        # one long-lived preview, reshaped in place and hidden when unused
+        self.preview_item = previewPoly(QPolygonF())
+        self.preview_item.setZValue(1)  # above faces, below edges
+        self.preview_item.setVisible(False)
+        self.scene_ref.addItem(self.preview_item)
+        # index changes only restart this timer, so a burst of them costs one recompute
+        # on the next event-loop tick
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(0)
+        self.preview_timer.timeout.connect(self.refreshPreviewPoly)
+        self.placement_cache = OrderedDict()  # (host edge, planigon, edge) -> ring, LRU
         self.selected_edge = SelectableEdge(QPointF(0,0), QPointF(0,10), None)
+        # face items waiting to join the scene, a chunk per tick
+        self.item_queue = deque()
+        self.item_timer = QTimer(self)
+        self.item_timer.setInterval(0)
+        self.item_timer.timeout.connect(self.drainFaceItems)
+        self.job = None  # the running DiagramJob
+        self.job_done = None  # called with its result on the GUI thread
+        self.job_items = []  # path items showing the faces it has streamed so far
+        # a diagram passed in (e.g. opened from a file) may already have faces
+        faces = self.diagram.faces
+        self.queueFaceItems(faces.values() if isinstance(faces, dict) else faces)
 
     def set_plan_Idx(self, idx: int):
         self.planigonIdx = (idx + len(planigonData.planigons)) % len(planigonData.planigons)
         self.edgeIdx = 0
-        print(self.planigonIdx)
+        log.debug("planigon index %d", self.planigonIdx)
         self.updatePreviewPoly()
 
     def set_edge_Idx(self, idx: int):
-        self.edgeIdx = (idx + len(planigonData.planigons[self.planigonIdx].lengths)) % len(planigonData.planigons[self.planigonIdx].lengths)
+        edgeCount = int(self.catalogue.sizes[self.planigonIdx])
+        self.edgeIdx = (idx + edgeCount) % edgeCount
+        self.updatePreviewPoly()
+
+    def fittingPlacements(self) -> list[tuple[int, int]]:
+        # (planigon, edge) choices that fit the selected boundary edge
+        he = getattr(self.selected_edge, "half_edge", None)
+        return [] if he is None else self.diagram.fitting_placements(he)
+
+    def cycleSelectedPlanigon(self, step: int):
+        placements = self.fittingPlacements()
+        planigons = sorted({p for p, _ in placements})
+        if not planigons:
+            self.set_plan_Idx(self.planigonIdx + step)
+            return
+        if self.planigonIdx in planigons:
+            i = planigons.index(self.planigonIdx) + step
+        else:
+            i = 0 if step > 0 else -1
+        self.planigonIdx = planigons[i % len(planigons)]
+        self.edgeIdx = next(e for p, e in placements if p == self.planigonIdx)
+        self.updatePreviewPoly()
+
+    def cycleSelectedEdge(self, step: int):
+        edges = [e for p, e in self.fittingPlacements() if p == self.planigonIdx]
+        if not edges:
+            self.set_edge_Idx(self.edgeIdx + step)
+            return
+        if self.edgeIdx in edges:
+            i = edges.index(self.edgeIdx) + step
+        else:
+            i = 0 if step > 0 else -1
+        self.edgeIdx = edges[i % len(edges)]
         self.updatePreviewPoly()
 
     def set_selected_edge(self, edge: QGraphicsLineItem):
         self.selected_edge = edge
 
+    def placeSelectedPlanigon(self):
+        # vertex ring of the current planigon/edge choice attached to the selected edge,
+        # memoised so cycling back and forth does not redo the placement
+        key = ((self.selected_edge.start.x(), self.selected_edge.start.y()),
+               (self.selected_edge.end.x(), self.selected_edge.end.y()),
+               self.planigonIdx,
+               self.edgeIdx)
+        ring = self.placement_cache.get(key)
+        perfStats.count("controller.placement_cache." + ("miss" if ring is None else "hit"))
+        if ring is None:
+            ring = self.catalogue.place(key[:2], self.planigonIdx, self.edgeIdx)
+            ring.setflags(write=False)
+            self.placement_cache[key] = ring
+            if len(self.placement_cache) > PLACEMENT_CACHE_SIZE:
+                self.placement_cache.popitem(last=False)
+        else:
+            self.placement_cache.move_to_end(key)
+        return ring
+
     def removePreviewPoly(self):
-        for item in self.scene_ref.items():
-            if isinstance(item, previewPoly):
-                self.scene_ref.removeItem(item)
+        self.preview_timer.stop()
+        self.preview_item.setVisible(False)
 
     def updatePreviewPoly(self):
-        # remove previews
-        self.removePreviewPoly()
+        # coalesced, see refreshPreviewPoly
+        self.preview_timer.start()
+
+    @perfStats.timed("controller.preview")
+    def refreshPreviewPoly(self):
         if self.state.mode is Mode.EDGE_SELECTED or self.state.mode is Mode.EMPTY:
-            points = planigonData.getPlanigonVertices(
-                planigonData.Vertex([self.selected_edge.start.x(), self.selected_edge.start.y()]), 
-                planigonData.Vertex([self.selected_edge.end.x(), self.selected_edge.end.y()]), 
-                self.edgeIdx,
-                planigonData.planigons[self.planigonIdx].lengths,
-                planigonData.planigons[self.planigonIdx].angles)
-            polyPoints = [QPointF(point.pos[0], point.pos[1]) for point in points]
-            preview = previewPoly(QPolygonF(polyPoints))
-            self.scene_ref.addItem(preview)
+            points = self.placeSelectedPlanigon()
+            self.preview_item.setPolygon(QPolygonF([QPointF(x, y) for x, y in points.tolist()]))
+            self.preview_item.setBrush(QBrush(Qt.red if self.diagram.intersects_existing(points) else Qt.green))
+            self.preview_item.setVisible(True)
+        else:
+            self.preview_item.setVisible(False)
     
-    def addFace(self):
+    @perfStats.timed("controller.add_face")
+    def addFace(self, name: str = "") -> Optional[planigonData.Face]:
         if self.state.mode is Mode.EDGE_SELECTED or self.state.mode is Mode.EMPTY:
+            points = self.placeSelectedPlanigon()
+            if self.diagram.intersects_existing(points):
+                # keep the (red) preview up, the face would overlap existing ones
+                return None
             self.removePreviewPoly()
-            points = planigonData.getPlanigonVertices(
-                planigonData.Vertex([self.selected_edge.start.x(), self.selected_edge.start.y()]), 
-                planigonData.Vertex([self.selected_edge.end.x(), self.selected_edge.end.y()]), 
-                self.edgeIdx,
-                planigonData.planigons[self.planigonIdx].lengths,
-                planigonData.planigons[self.planigonIdx].angles)
-            vert_pos = [point.pos for point in points]
-            newFace = self.diagram.add_planigon(vert_pos)
-            polyPoints = [QPointF(point.pos[0], point.pos[1]) for point in points]
-            newPoly = SelectablePolygon(QPolygonF(polyPoints), newFace)
-            self.scene_ref.addItem(newPoly)
-            newPoly.polySelected.connect(self.on_polygon_selected)
-            self.set_state(
-                mode=Mode.IDLE,
-                selected_polygon=None,
-                selected_edge=None
-            )
+            vert_pos = [(x, y) for x, y in points.tolist()]
+            with self.batch():
+                newFace = self.history.add_face(vert_pos, self.planigonIdx, self.edgeIdx)
+                newFace.name = name
+                self.recordFaces([newFace])
+                self.addFaceItem(newFace)
+                self.on_deselect_all()
+            return newFace
+        return None
+
+    def saveDiagram(self, path: str):
+        from include.diagramFile import saveDiagram
+        saveDiagram(self.diagram, path)
+
+
+    def addFaceItem(self, face: planigonData.Face):
+        self.growSceneRect()
+        if self.face_layer is not None:
+            self.face_layer.add_face(face)
+            return
+        polyPoints = [QPointF(he.origin.pos[0], he.origin.pos[1]) for he in planigonData.iterate(face.edge)]
+        newPoly = SelectablePolygon(QPolygonF(polyPoints), face)
+        self.scene_ref.addItem(newPoly)
+        newPoly.polySelected.connect(self.on_polygon_selected)
+        self.polygon_items[face.id] = newPoly
+
+    def removeFaceItem(self, face: planigonData.Face):
+        if self.face_layer is not None:
+            self.face_layer.remove_face(face)
+            return
+        item = self.polygon_items.pop(face.id, None)
+        if item is not None:
+            try:
+                item.polySelected.disconnect()
+            except (TypeError, RuntimeError):
+                pass
+            self.scene_ref.removeItem(item)
+
+    def applyFaceChange(self, change: tuple[list[planigonData.Face], list[planigonData.Face]]):
+        added, removed = change
+        with self.batch():
+            self.recordFaces(added, removed)
+            for face in removed:
+                self.removeFaceItem(face)
+            if len(added) > SCENE_CHUNK_FACES:
+                self.queueFaceItems(added)
+            else:
+                for face in added:
+                    self.addFaceItem(face)
+            if added or removed:
+                self.on_deselect_all()
+
+    def queueFaceItems(self, faces):
+        self.item_queue.extend(faces)
+        if self.item_queue:
+            self.item_timer.start()
+
+    @perfStats.timed("controller.drain_items")
+    def drainFaceItems(self, limit: Optional[int] = SCENE_CHUNK_FACES):
+        # adds up to limit queued face items (all of them for None), skipping faces
+        # removed in the meantime
+        live = self.diagram.faces if isinstance(self.diagram, planigonData.Diagram) else None
+        queue = self.item_queue
+        for _ in range(len(queue) if limit is None else min(limit, len(queue))):
+            face = queue.popleft()
+            if live is None or live.get(face.id) is face:
+                self.addFaceItem(face)
+        if not queue:
+            self.item_timer.stop()
+
+    def flushFaceItems(self):
+        self.drainFaceItems(None)
+
+    # -- background jobs -- #
+    def startJob(self, job: DiagramJob, done) -> bool:
+        # one job at a time; done(result) runs on the GUI thread when it finishes
+        if self.job is not None:
+            return False
+        self.job, self.job_done = job, done
+        job.signals.progress.connect(self.on_job_progress)
+        job.signals.batch.connect(self.on_job_batch)
+        job.signals.finished.connect(self.on_job_finished)
+        job.signals.failed.connect(self.on_job_failed)
+        job.signals.cancelled.connect(self.on_job_cancelled)
+        self.jobStarted.emit(job.name)
+        QThreadPool.globalInstance().start(job)
+        return True
+
+    def cancelJob(self):
+        if self.job is not None:
+            self.job.cancel()
+
+    def frontierSnapshot(self) -> list[tuple[list, Optional[int], int, list[int]]]:
+        # (ring, planigon, edgeIdx, ring positions of its open edges) of every face
+        # touching a boundary vertex: all a growth job needs to extend the diagram
+        # without overlapping it
+        diagram = self.diagram
+        if not isinstance(diagram, planigonData.Diagram):
+            rings, sizes = diagram.face_rings()
+            types = diagram.face_type[:diagram.num_faces].tolist()
+            edgeIdxs = diagram.face_edge_idx[:diagram.num_faces].tolist()
+            opened = {}
+            for e in diagram.open_edges.values():
+                f = int(diagram.face_of[e])
+                opened.setdefault(f, []).append(int(e - diagram.face_edge[f]))
+            return [(rings[f, :n].tolist(), None if types[f] < 0 else types[f], edgeIdxs[f], opened.get(f, []))
+                    for f, n in enumerate(sizes.tolist())]
+        faces = {}
+        for start in diagram.boundary:
+            he = start
+            while he is not None and he.face.id not in faces:
+                faces[he.face.id] = he.face
+                he = he.prev.twin
+        boundary = diagram.boundary
+        return [([he.origin.pos for he in planigonData.iterate(f.edge)], f.planigon_type, f.edge_idx,
+                 [k for k, he in enumerate(planigonData.iterate(f.edge)) if he in boundary])
+                for f in faces.values()]
+
+    def generateFaces(self, count: int) -> bool:
+        # grows count faces of the selected planigon around the diagram in the background
+        snapshot = self.frontierSnapshot()
+        objects = isinstance(self.diagram, planigonData.Diagram)
+        job = DiagramJob(f"Growing {count} faces", growWork(snapshot, self.planigonIdx, count, objects))
+        return self.startJob(job, self.mergeDiagram)
+
+    def importDiagram(self, path: str) -> bool:
+        # reads a diagram file in the background and merges its faces in
+        objects = isinstance(self.diagram, planigonData.Diagram)
+        name = f"Loading {path}" + (" and building its objects" if objects else "")
+        return self.startJob(DiagramJob(name, loadWork(path, objects)), self.mergeDiagram)
+
+    def makeEditable(self) -> bool:
+        # converts an array diagram (e.g. opened for viewing) to an object Diagram in the
+        # background, so faces can be removed and edits undone; the job reads a copy of
+        # the columns and faces added meanwhile make it start over
+        mesh = self.diagram
+        if isinstance(mesh, planigonData.Diagram):
+            return False
+        from include.diagramFile import _meshColumns
+        columns, names = _meshColumns(mesh)
+        columns = {name: column.copy() for name, column in columns.items()}
+        count = mesh.num_faces
+
+        def done(diagram) -> str:
+            if self.diagram is not mesh or mesh.num_faces != count:
+                return "Not converted: the diagram changed meanwhile, try again."
+            self.setDiagram(diagram)
+            return f"Converted {count} faces, they can now be removed and undone."
+        job = DiagramJob(f"Converting {count} faces for editing", convertWork(columns, names, mesh.index_cell_size))
+        return self.startJob(job, done)
+
+    def setDiagram(self, diagram):
+        # replaces the diagram and with it the history and every face item
+        with self.batch():
             self.on_deselect_all()
-
+            self.item_queue.clear()
+            for item in list(self.polygon_items.values()):
+                self.removeFaceItem(item.face_ref)
+            if self.face_layer is not None:
+                self.face_layer.clear()
+                self.face_layer = type(self.face_layer)(self.scene_ref, diagram)
+            self.placement_cache.clear()
+            self.diagram = diagram
+            self.history = planigonData.DiagramHistory(diagram)
+            self._changes = ChangeSet(diagram, reset=True)
+            faces = diagram.faces
+            self.queueFaceItems(faces.values() if isinstance(faces, dict) else faces)
+
+    def mergeDiagram(self, other) -> str:
+        note = ""
+        if isinstance(self.diagram, planigonData.Diagram):
+            faces = self.history.merge(other)
+        else:
+            # array diagrams cannot remove faces, so the merge cannot be undone and
+            # nothing recorded before it could be undone correctly either
+            if isinstance(other, planigonData.Diagram):
+                from include.diagramFile import toArrays
+                other = toArrays(other)
+            faces = self.diagram.merge(other)
+            self.history.clear()
+            note = " Undo history cleared: merges into an array diagram cannot be undone."
+        with self.batch():
+            self.recordFaces(faces)
+            self.queueFaceItems(faces)
+            self.on_deselect_all()
+        return f"Added {len(faces)} faces.{note}"
+
+    def _isCurrentJob(self) -> bool:
+        # signals queued by a job that has since ended are dropped
+        return self.job is not None and self.sender() is self.job.signals
+
+    def _endJob(self, message: str):
+        for item in self.job_items:
+            self.scene_ref.removeItem(item)
+        self.job_items = []
+        self.job = self.job_done = None
+        self.jobEnded.emit(message)
+
+    def on_job_progress(self, done: int, total: int):
+        if self._isCurrentJob():
+            self.jobProgress.emit(done, total)
+
+    def on_job_batch(self, rings):
+        if not self._isCurrentJob():
+            return
+        item = QGraphicsPathItem(_ringsPath(rings))
+        item.setPen(QPen(Qt.darkGreen, 0))
+        item.setBrush(QBrush(QColor(0, 160, 0, 60)))
+        item.setZValue(0.25)  # over the faces, under the selection
+        self.scene_ref.addItem(item)
+        self.job_items.append(item)
+
+    def on_job_finished(self, result):
+        if not self._isCurrentJob():
+            return
+        done = self.job_done
+        message = "Done."
+        try:
+            message = done(result)
+        except ValueError as exc:
+            message = f"Not added: {exc}."
+        except Exception as exc:
+            log.exception("finishing job %s failed", self.job.name)
+            message = f"Failed: {exc}"
+        finally:
+            # whatever happened, the job is over and the panel must be usable again
+            self._endJob(message)
+
+    def on_job_failed(self, error: str):
+        if self._isCurrentJob():
+            self._endJob(f"Failed: {error}")
+
+    def on_job_cancelled(self):
+        if self._isCurrentJob():
+            self._endJob("Cancelled.")
+
+    def growSceneRect(self):
+        # widens the scene rect to the diagram's bounding box plus a quarter on every
+        # side, so a growing tiling resizes (and reindexes) the scene O(log n) times
+        box = self.diagram.bounding_box()
+        if box is None:
+            return
+        bounds = QRectF(box[0], box[1], box[2] - box[0], box[3] - box[1])
+        rect = self.scene_ref.sceneRect()
+        if not rect.contains(bounds):
+            rect = rect.united(bounds)
+            margin = 0.25 * max(rect.width(), rect.height())
+            self.scene_ref.setSceneRect(rect.adjusted(-margin, -margin, margin, margin))
+
+    @perfStats.timed("controller.pick_face")
+    def pickFaceAt(self, pos: QPointF) -> bool:
+        # batched modes: selects the face under pos, if any
+        if self.state.mode is Mode.EDGE_SELECTED:
+            return False
+        face = self.diagram.face_at((pos.x(), pos.y()))
+        if face is None:
+            return False
+        item = self.selection_item
+        item.face_ref = face
+        item.setPolygon(QPolygonF([QPointF(he.origin.pos[0], he.origin.pos[1]) for he in planigonData.iterate(face.edge)]))
+        item.setVisible(True)
+        self.on_polygon_selected(item)
+        return True
+
+    def releasePolygonItem(self, item: SelectablePolygon):
+        # returns a previously selected polygon item to its idle look
+        if item is self.selection_item:
+            item.setVisible(False)
+        elif self.polygon_items.get(item.face_ref.id) is item:
+            item.deselect_polygon()
+
+    def removeSelectedFace(self):
+        # array diagrams only grow, makeEditable converts them first
+        if not isinstance(self.diagram, planigonData.Diagram):
+            return
+        if self.state.mode is Mode.POLYGON_SELECTED and self.state.selected_polygon is not None:
+            face = self.state.selected_polygon.face_ref
+            with self.batch():
+                self.removeFaceItem(face)
+                self.history.remove_face(face)
+                self.recordFaces(removed=[face])
+                self.on_deselect_all()
+
+    def undo(self):
+        if isinstance(self.diagram, planigonData.Diagram):
+            self.applyFaceChange(self.history.undo())
+
+    def redo(self):
+        if isinstance(self.diagram, planigonData.Diagram):
+            self.applyFaceChange(self.history.redo())
 
     def request_update_diagram(self):
-        self.diagramUpdated.emit(self.diagram)
+        # listeners re-read everything
+        with self.batch():
+            self._changes.reset = True
+
+    # -- state updates -- #
+    @contextmanager
+    def batch(self):
+        # state and diagram changes made inside (nested blocks included) are announced
+        # once on leaving the outermost block: one diagramUpdated with their ChangeSet,
+        # then one stateChanged, each only if something changed
+        self._batch_depth += 1
+        try:
+            yield self._changes
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._emitChanges()
+
+    def _emitChanges(self):
+        changes, dirty = self._changes, self._state_dirty
+        self._changes = ChangeSet(self.diagram)
+        self._state_dirty = False
+        if changes:
+            perfStats.count("controller.diagram_updated")
+            self.diagramUpdated.emit(changes)
+        if dirty:
+            perfStats.count("controller.state_changed")
+            self.stateChanged.emit(self.state)
+
+    def recordFaces(self, added=(), removed=()):
+        with self.batch():
+            self._changes.record(added, removed)
 
     def set_state(self, **kwargs):
-        for k, v in kwargs.items():
-            setattr(self.state, k, v)
-        self.stateChanged.emit(self.state)
-
+        with self.batch():
+            for k, v in kwargs.items():
+                if getattr(self.state, k, _UNSET) is not v:
+                    setattr(self.state, k, v)
+                    self._state_dirty = True
+
+    def showEdgeItems(self, halfedges):
+        # one pooled SelectableEdge per open half-edge, drawn from destination to origin
+        while len(self.edge_pool) < len(halfedges):
+            item = SelectableEdge(QPointF(0,0), QPointF(0,0), None, 5)
+            item.edgeSelected.connect(self.on_edge_selected)
+            item.setVisible(False)
+            self.scene_ref.addItem(item)
+            self.edge_pool.append(item)
+        for item, edge in zip(self.edge_pool, halfedges):
+            item.start = QPointF(edge.next.origin.pos[0], edge.next.origin.pos[1])
+            item.end = QPointF(edge.origin.pos[0], edge.origin.pos[1])
+            item.setLine(item.start.x(), item.start.y(), item.end.x(), item.end.y())
+            item.half_edge = edge
+            item.setAcceptedMouseButtons(Qt.LeftButton)
+            item.setVisible(True)
+        self.edge_items = self.edge_pool[:len(halfedges)]
+        perfStats.count("controller.edge_items_shown", len(halfedges))
+
+    def clearEdgeItems(self, keep=None):
+        # hides every live SelectableEdge except keep
+        for item in self.edge_items:
+            if item is not keep:
+                item.setVisible(False)
+                item.half_edge = None
+        self.edge_items = [] if keep is None else [keep]
+
+    @perfStats.timed("controller.deselect_all")
+    @batched
     def on_deselect_all(self):
+        previous = self.state.selected_polygon
         self.set_state(
             mode=Mode.IDLE,
             selected_polygon=None,
             selected_edge=None
         )
         # remove all edges
-        for item in self.scene_ref.items():
-            if isinstance(item, SelectableEdge):
-                try:
-                    item.edgeSelected.disconnect()
-                except (TypeError, RuntimeError):
-                    pass
-                self.scene_ref.removeItem(item)
+        self.clearEdgeItems()
         
         # remove preview poly
         self.removePreviewPoly()
 
-        # enable all polygons & deselect
-        for item in self.scene_ref.items():
-            if isinstance(item, SelectablePolygon):
-                item.deselect_polygon()
-                item.setAcceptedMouseButtons(Qt.LeftButton)
+        # re-enable the polygon that was selected
+        if previous is not None:
+            self.releasePolygonItem(previous)
 
+    @perfStats.timed("controller.select_polygon")
+    @batched
     def on_polygon_selected(self, polygon_item:SelectablePolygon):
+        # polygons stay clickable while an edge is picked, clicks are ignored here instead
+        if self.state.mode is Mode.EDGE_SELECTED:
+            return
+        previous = self.state.selected_polygon
         self.set_state(
             mode=Mode.POLYGON_SELECTED,
             selected_polygon=polygon_item,
             selected_edge=None
         )
         # remove all edges
-        for item in self.scene_ref.items():
-            if isinstance(item, SelectableEdge):
-                try:
-                    item.edgeSelected.disconnect()
-                except (TypeError, RuntimeError):
-                    pass
-                self.scene_ref.removeItem(item)
-                del item
-
-        # disable all polygons
-        for item in self.scene_ref.items():
-            if isinstance(item, SelectablePolygon) and item != polygon_item:
-                item.deselect_polygon()
+        self.clearEdgeItems()
+
+        # deselect the previous polygon
+        if previous is not None and previous is not polygon_item:
+            self.releasePolygonItem(previous)
 
         # set values for marked polygon
         polygon_item.setAcceptedMouseButtons(Qt.NoButton)
         polygon_item.setBrush(QBrush(Qt.red))
 
-        # create new edges to select
+        # show edges to select
         #print(polygon_item.face_ref)
-        for edge in planigonData.iterate(polygon_item.face_ref.edge):
-            if edge.twin is None:
-                # add selectable edge
-                #print("coord:", edge.origin.pos[0], edge.origin.pos[1])
-                newEdge = SelectableEdge(
-                    QPointF(edge.next.origin.pos[0], edge.next.origin.pos[1]), 
-                    QPointF(edge.origin.pos[0], edge.origin.pos[1]), 
-                    None, 
-                    5)
-                newEdge.edgeSelected.connect(self.on_edge_selected)
-                self.scene_ref.addItem(newEdge)
+        self.showEdgeItems(self.diagram.face_open_edges(polygon_item.face_ref))
 
 
+    @perfStats.timed("controller.select_edge")
+    @batched
     def on_edge_selected(self, edge):
         self.set_state(
             mode=Mode.EDGE_SELECTED,
@@ -317,19 +1196,8 @@ class EditorController(QObject):
         )
         self.selected_edge = edge
         # remove all non-selected edges
-        newList = [edge]
-        for item in self.scene_ref.items():
-            if isinstance(item, SelectableEdge) and item != edge:
-                try:
-                    item.edgeSelected.disconnect()
-                except (TypeError, RuntimeError):
-                    pass
-                self.scene_ref.removeItem(item)
+        self.clearEdgeItems(keep=edge)
         edge.setAcceptedMouseButtons(Qt.NoButton)
-        # disable all polygons
-        for item in self.scene_ref.items():
-            if isinstance(item, SelectablePolygon):
-                item.setAcceptedMouseButtons(Qt.NoButton)
         # create a planigon preview
         self.updatePreviewPoly()
 
@@ -433,10 +1301,44 @@ class MenuPanel(QWidget):
 
         # Controller buttons
         add_face_btn = QPushButton("Add Face")
-        add_face_btn.clicked.connect(self.controller.addFace)
+        add_face_btn.clicked.connect(self.on_add_face)
         layout.addWidget(add_face_btn)
+        save_btn = QPushButton("Save...")
+        save_btn.clicked.connect(self.on_save)
+        layout.addWidget(save_btn)
+        self.import_btn = QPushButton("Import...")
+        self.import_btn.clicked.connect(self.on_import)
+        layout.addWidget(self.import_btn)
+        # array diagrams (files opened for viewing) need converting before faces can be removed
+        viewing = not isinstance(self.controller.diagram, planigonData.Diagram)
+        self.edit_btn = QPushButton("Make Editable")
+        self.edit_btn.setVisible(viewing)
+        self.edit_btn.clicked.connect(self.controller.makeEditable)
+        layout.addWidget(self.edit_btn)
+
+        # Background jobs
+        grow_row = QHBoxLayout()
+        self.grow_count = QSpinBox()
+        self.grow_count.setRange(1, 10_000_000)
+        self.grow_count.setValue(1000)
+        grow_row.addWidget(self.grow_count)
+        self.grow_btn = QPushButton("Grow")
+        self.grow_btn.clicked.connect(self.on_grow)
+        grow_row.addWidget(self.grow_btn)
+        layout.addLayout(grow_row)
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setVisible(False)
+        layout.addWidget(self.progress_bar)
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.setVisible(False)
+        self.cancel_btn.clicked.connect(self.controller.cancelJob)
+        layout.addWidget(self.cancel_btn)
 
         self.status_label = QLabel("Ready.")
+        if viewing:
+            self.status_label.setText(f"Viewing {self.controller.diagram.num_faces} faces. Make Editable builds "
+                                      "their objects for removal and undo, which takes a while on large files.")
+        self.status_label.setWordWrap(True)
         layout.addWidget(self.status_label)
 
         layout.addStretch()
@@ -445,6 +1347,9 @@ class MenuPanel(QWidget):
         #self.controller.previewUpdated.connect(self.scene.on_preview_updated)
         self.planigonIdxSelector.indexChanged.connect(self.on_planigon_index_changed)
         self.edgeIdxSelector.indexChanged.connect(self.on_edge_index_changed)
+        self.controller.jobStarted.connect(self.on_job_started)
+        self.controller.jobProgress.connect(self.on_job_progress)
+        self.controller.jobEnded.connect(self.on_job_ended)
         
     def on_edge_index_changed(self, new_idx):
         # tell controller about edge index change
@@ -455,26 +1360,113 @@ class MenuPanel(QWidget):
 
     def on_add_face(self):
         name = self.face_name_input.text().strip()
-        if name:
-            self.controller.addFace(name)
-        else:
-            self.status_label.setText("Enter a face name first.")
+        face = self.controller.addFace(name)
+        if face is not None:
+            self.on_face_added(name or f"#{face.id}")
 
     def on_face_added(self, name):
         self.status_label.setText(f"Face '{name}' added!")
 
+    def on_save(self):
+        from include.diagramFile import DIAGRAM_EXTENSION
+        path, _ = QFileDialog.getSaveFileName(self, "Save Diagram", "", f"Planigon diagrams (*{DIAGRAM_EXTENSION})")
+        if path:
+            self.controller.saveDiagram(path)
+            self.status_label.setText(f"Saved {len(self.controller.diagram.faces)} faces.")
+
+    def on_import(self):
+        from include.diagramFile import DIAGRAM_EXTENSION
+        path, _ = QFileDialog.getOpenFileName(self, "Import Diagram", "", f"Planigon diagrams (*{DIAGRAM_EXTENSION})")
+        if path:
+            self.controller.importDiagram(path)
+
+    def on_grow(self):
+        self.controller.generateFaces(self.grow_count.value())
+
+    def on_job_started(self, name):
+        self.status_label.setText(f"{name}...")
+        self.progress_bar.setRange(0, 0)  # busy until the first progress report
+        self.progress_bar.setVisible(True)
+        self.cancel_btn.setVisible(True)
+        self.grow_btn.setEnabled(False)
+        self.import_btn.setEnabled(False)
+        self.edit_btn.setEnabled(False)
+
+    def on_job_progress(self, done, total):
+        self.progress_bar.setRange(0, total)
+        self.progress_bar.setValue(done)
+
+    def on_job_ended(self, message):
+        self.status_label.setText(message)
+        self.progress_bar.setVisible(False)
+        self.cancel_btn.setVisible(False)
+        self.grow_btn.setEnabled(True)
+        self.import_btn.setEnabled(True)
+        self.edit_btn.setEnabled(True)
+        self.edit_btn.setVisible(not isinstance(self.controller.diagram, planigonData.Diagram))
+
+# ---- Dockable performance panel ----
+STATS_REFRESH_MS = 500
+
+class StatsPanel(QWidget):
+    # p50/p99 of the recent calls to every instrumented operation, frames included
+    def __init__(self):
+        super().__init__()
+        layout = QVBoxLayout(self)
+
+        self.enable_box = QCheckBox("Record timings")
+        self.enable_box.setChecked(perfStats.isEnabled())
+        self.enable_box.toggled.connect(perfStats.enable)
+        layout.addWidget(self.enable_box)
+
+        self.table = QLabel()
+        self.table.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        self.table.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        layout.addWidget(self.table)
+
+        reset_btn = QPushButton("Reset")
+        reset_btn.clicked.connect(self.on_reset)
+        layout.addWidget(reset_btn)
+        layout.addStretch()
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(STATS_REFRESH_MS)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start()
+        self.refresh(force=True)
+
+    def refresh(self, force: bool = False):
+        if not force and (not perfStats.isEnabled() or not self.isVisible()):
+            return
+        rows = [f"{'operation':<34}{'calls':>8}{'p50 ms':>9}{'p99 ms':>9}"]
+        for name, row in perfStats.snapshot().items():
+            rows.append(f"{name:<34}{row['count']:>8}{row['p50_ms']:>9.3f}{row['p99_ms']:>9.3f}")
+        for name, value in sorted(perfStats.counters.items()):
+            rows.append(f"{name:<34}{value:>8}")
+        self.table.setText("\n".join(rows))
+
+    def on_reset(self):
+        perfStats.reset()
+        self.refresh(force=True)
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, render_mode: str = "items", bsp_depth: Optional[int] = None, diagram=None, tiling=None):
         super().__init__()
 
         # Set up graphics scene
         self.scene = QGraphicsScene()
-        self.scene.setSceneRect(-500, -500, 1000, 1000)  # centered around origin
+        self.scene.setSceneRect(-500, -500, 1000, 1000)  # starting area, grows with the diagram
+        if bsp_depth is not None:
+            self.scene.setBspTreeDepth(bsp_depth)
+        elif render_mode != "items":
+            # a handful of batched items, Qt's BSP index costs more than it saves
+            self.scene.setItemIndexMethod(QGraphicsScene.NoIndex)
         #self.scene.addRect(-100, -100, 200, 200, QPen(Qt.blue, 5), QBrush(Qt.red)) # test rect
+        if tiling is not None:
+            self.scene.addItem(PeriodicFaceItem(tiling))
 
         # Set up controller
-        self.controller = EditorController(self.scene)
+        self.controller = EditorController(self.scene, diagram, render_mode=render_mode)
 
         # Set up view
         self.view = GraphicsView(self.scene, self.controller)
@@ -486,21 +1478,46 @@ class MainWindow(QMainWindow):
         self.view.show()
         
         # Set up menu dock
-        print("central:", self.centralWidget().size())
+        log.debug("central: %s", self.centralWidget().size())
         menu_dock = QDockWidget("Editor Menu", self)
         menu_dock.setAllowedAreas(Qt.LeftDockWidgetArea | Qt.RightDockWidgetArea)
         menu_panel = MenuPanel(self.controller)
         menu_dock.setWidget(menu_panel)
         self.addDockWidget(Qt.RightDockWidgetArea, menu_dock)
 
+        stats_dock = QDockWidget("Performance", self)
+        stats_dock.setAllowedAreas(Qt.LeftDockWidgetArea | Qt.RightDockWidgetArea)
+        stats_dock.setWidget(StatsPanel())
+        self.addDockWidget(Qt.RightDockWidgetArea, stats_dock)
+
         self.setWindowTitle("Planigon Editor Prototype")
         self.resize(1000, 600)
-        print("central:", self.centralWidget().size())
+        log.debug("central: %s", self.centralWidget().size())
 
         # Create bindings
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
-    win = MainWindow()
+    parser = argparse.ArgumentParser(description="Planigon editor")
+    parser.add_argument("--render", choices=("items", "chunked", "culled"), default="items",
+                        help="chunked and culled batch face drawing, for very large tilings")
+    parser.add_argument("--bsp-depth", type=int, default=None, help="fixed BSP tree depth for the scene index")
+    parser.add_argument("--open", default=None, help="diagram file to view and extend, Make Editable to remove faces")
+    parser.add_argument("--periodic", type=int, default=None, metavar="PLANIGON",
+                        help="draw this planigon's periodic tiling under the editor, instanced as it is painted")
+    parser.add_argument("--stats", action="store_true", help="record hot-path timings from the start")
+    parser.add_argument("--log-level", default="WARNING", choices=("DEBUG", "INFO", "WARNING", "ERROR"))
+    args, _ = parser.parse_known_args(app.arguments()[1:])
+    logging.basicConfig(level=args.log_level, format="%(levelname)s %(name)s: %(message)s")
+    perfStats.enable(args.stats)
+    tiling = diagram = None
+    if args.periodic is not None:
+        from include.periodic import periodicTiling
+        tiling = periodicTiling(args.periodic)
+    if args.open is not None:
+        # the file is viewed as its memory-mapped columns, Make Editable converts it
+        from include.diagramFile import loadDiagram
+        diagram = loadDiagram(args.open)
+    win = MainWindow(render_mode=args.render, bsp_depth=args.bsp_depth, diagram=diagram, tiling=tiling)
     win.show()
     sys.exit(app.exec())
\ No newline at end of file